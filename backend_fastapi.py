@@ -1,15 +1,31 @@
-from fastapi import FastAPI, HTTPException
+import asyncio, hmac, time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from algosdk import encoding
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from algosdk.v2client import indexer
-import os, logging, time
+import os, sys, logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from ratelimit import RetryPolicy
+from async_indexer import AsyncIndexerClient
+from deposit_store import DepositStore, DepositSyncer, LATEST_KEEP, MAX_PAGE, DEFAULT_SYNC_INTERVAL, encode_cursor, decode_cursor
+from response_cache import RoundCache
+from deposit_stream import DepositHub, sse_events
+from response_format import JSON, MSGPACK, negotiate, render
+from metrics import REGISTRY, counter, gauge, histogram
 
-app = FastAPI(title="Algorand Launchpad Backend - Deposit Indexer")
 logging.basicConfig(level=logging.INFO)
 
 # Required environment values
 INDEXER_ADDRESS = os.getenv("INDEXER_ADDRESS")
 INDEXER_TOKEN = os.getenv("INDEXER_TOKEN")
 ESCROW_ADDRESS = os.getenv("ESCROW_ADDRESS")
+# further escrows tracked from startup, comma separated; more can be added at runtime via /escrows
+ESCROW_ADDRESSES = [a.strip() for a in os.getenv("ESCROW_ADDRESSES", "").split(",") if a.strip()]
+# required by the endpoints that change the tracked escrows; they are disabled without it
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
 
 if not INDEXER_ADDRESS or not INDEXER_TOKEN or not ESCROW_ADDRESS:
     logging.error("Missing one or more required env vars: INDEXER_ADDRESS, INDEXER_TOKEN, ESCROW_ADDRESS")
@@ -17,7 +33,95 @@ if not INDEXER_ADDRESS or not INDEXER_TOKEN or not ESCROW_ADDRESS:
     raise RuntimeError("Set INDEXER_ADDRESS, INDEXER_TOKEN, and ESCROW_ADDRESS environment variables")
 
 HEADERS = {"X-API-Key": INDEXER_TOKEN}
-indexer_client = indexer.IndexerClient(INDEXER_TOKEN, INDEXER_ADDRESS, headers=HEADERS, timeout=30)
+# pooled keep-alive connections; shared limiter per indexer host, jittered async retries, 429s honour Retry-After
+indexer_client = AsyncIndexerClient(INDEXER_TOKEN, INDEXER_ADDRESS, headers=HEADERS, policy=RetryPolicy(max_retries=3))
+
+# deposits are synced in the background and served from a local store
+DEPOSIT_DB = os.getenv("DEPOSIT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "deposits.sqlite"))
+SYNC_INTERVAL = float(os.getenv("DEPOSIT_SYNC_INTERVAL", DEFAULT_SYNC_INTERVAL))
+deposit_store = DepositStore(DEPOSIT_DB)
+# one follower serves every tracked escrow and feeds every stream subscriber
+deposit_hub = DepositHub()
+deposit_syncer = DepositSyncer(indexer_client, deposit_store, [ESCROW_ADDRESS, *ESCROW_ADDRESSES], interval=SYNC_INTERVAL, hub=deposit_hub)
+# /ready fails once the slowest synced escrow is this many rounds behind the indexer, or the last good sync is this old
+READY_MAX_LAG = int(os.getenv("READY_MAX_LAG_ROUNDS", "20"))
+READY_MAX_AGE = float(os.getenv("READY_MAX_SYNC_AGE", max(30.0, 5 * SYNC_INTERVAL)))
+# rendered responses, reused until the synced round moves on
+response_cache = RoundCache()
+
+@asynccontextmanager
+async def lifespan(app):
+    deposit_syncer.start()
+    try:
+        yield
+    finally:
+        await deposit_syncer.close()
+        await indexer_client.aclose()
+
+app = FastAPI(title="Algorand Launchpad Backend - Deposit Indexer", lifespan=lifespan)
+
+HTTP_SECONDS = histogram("http_request_duration_seconds", "Time to produce each response (until headers for streams)",
+                         ("method", "route", "status"))
+CACHE_EVENTS = counter("response_cache_events_total", "Response cache lookups by outcome, and evictions", ("event",))
+CACHE_SIZE = gauge("response_cache_entries", "Rendered responses currently cached")
+SYNC_ROUND = gauge("deposit_synced_round", "Highest round the local deposit store is synced to")
+INDEXER_TIP = gauge("indexer_tip_round", "Indexer round seen by the last sync pass")
+SYNC_AGE = gauge("deposit_sync_age_seconds", "Seconds since the last successful sync pass")
+STREAM_SUBSCRIBERS = gauge("deposit_stream_subscribers", "Open /deposits/stream connections")
+
+def collect_backend_metrics() -> None:
+    stats = response_cache.stats()
+    for event in ("hits", "misses", "coalesced", "evictions"):
+        CACHE_EVENTS.set_total(stats[event], event=event)
+    CACHE_SIZE.set(stats["size"])
+    SYNC_ROUND.set(deposit_store.round)
+    INDEXER_TIP.set(deposit_syncer.tip or 0)
+    if deposit_syncer.last_sync:
+        SYNC_AGE.set(time.time() - deposit_syncer.last_sync)
+    STREAM_SUBSCRIBERS.set(len(deposit_hub))
+
+REGISTRY.register_collector(collect_backend_metrics)
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # route template, not the raw path, so ids do not multiply the series
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route, status=str(response.status_code))
+    return response
+
+@app.get("/health")
+async def health():
+    """Liveness: the server answers and the deposit follower is running. Never calls the indexer."""
+    status = deposit_syncer.status()
+    return JSONResponse(status_code=200 if status["running"] else 503, content={"status": "ok" if status["running"] else "down", **status})
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: deposits are synced recently and close to the indexer tip, as seen by the follower's last passes.
+    Escrows still in their initial backfill (e.g. just added via POST /escrows) are listed but do not count as lag.
+    """
+    status = deposit_syncer.status()
+    problems = []
+    if not status["running"]:
+        problems.append("deposit sync is not running")
+    if status["last_sync_age"] is None:
+        problems.append("no successful sync yet")
+    elif status["last_sync_age"] > READY_MAX_AGE:
+        problems.append(f"last successful sync {status['last_sync_age']:.0f}s ago")
+    if status["last_sync_age"] is not None and status["synced_round"] is None and status["backfilling"]:
+        problems.append("no escrow has finished its initial backfill")
+    if status["lag_rounds"] is not None and status["lag_rounds"] > READY_MAX_LAG:
+        problems.append(f"{status['lag_rounds']} rounds behind the indexer")
+    return JSONResponse(status_code=503 if problems else 200,
+                        content={"status": "not ready" if problems else "ready", "problems": problems, **status})
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition: request/indexer latency histograms, retries, cache and sync state."""
+    return Response(content=REGISTRY.render_text(), media_type="text/plain; version=0.0.4")
 
 class Deposit(BaseModel):
     txid: str
@@ -25,38 +129,132 @@ class Deposit(BaseModel):
     amount: int  # microAlgos
     round: int
 
-def safe_search_transactions(receiver, limit=10, max_retries=3):
-    if limit > 1000:
-        limit = 1000
-    for attempt in range(max_retries):
-        try:
-            resp = indexer_client.search_transactions(limit=limit, receiver=receiver, tx_type="pay")
-            return resp.get("transactions", [])
-        except Exception as e:
-            logging.warning("Indexer request failed (attempt %s): %s", attempt+1, e)
-            time.sleep(1 + attempt)
-    raise RuntimeError("Failed to query indexer after retries")
-
-@app.get("/deposits/latest")
-def get_latest_deposits(limit: int = 10):
+class DepositList(BaseModel):
+    deposits: List[Deposit]
+    count: int
+
+class DepositPage(DepositList):
+    next_cursor: Optional[str] = None
+
+# the models document the responses; handlers return pre-encoded bodies, so rows are not re-validated per request
+ENCODED = {200: {"content": {JSON: {}, MSGPACK: {}}}}
+
+def encoded(body: bytes, media_type: str) -> Response:
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
+
+@app.get("/deposits/latest", response_model=DepositList, responses=ENCODED)
+async def get_latest_deposits(limit: int = 10, accept: Optional[str] = Header(None)):
     if limit <= 0:
         raise HTTPException(status_code=400, detail="limit must be > 0")
-    if limit > 500:
-        limit = 500
+    if limit > LATEST_KEEP:
+        limit = LATEST_KEEP
+    # answered from the local snapshot; indexer failures only delay new deposits showing up.
+    # identical queries within the escrow's synced round share one rendered body; keyed on this escrow's
+    # round, since another escrow's sync can move the store-wide round before this one is refreshed
+    body, media_type = await response_cache.get(("latest", ESCROW_ADDRESS, limit, negotiate(accept)), deposit_store.synced_round(ESCROW_ADDRESS),
+                                                lambda: render_latest(limit, accept))
+    return encoded(body, media_type)
+
+async def render_latest(limit: int, accept: Optional[str]):
+    results = deposit_store.latest(ESCROW_ADDRESS, limit)
+    return render({"deposits": results, "count": len(results)}, accept)
+
+@app.get("/deposits", response_model=DepositPage, responses=ENCODED)
+async def list_deposits(limit: int = 100, cursor: Optional[str] = None, min_round: Optional[int] = None,
+                        max_round: Optional[int] = None, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                        sender: Optional[str] = None, order: str = "desc", accept: Optional[str] = Header(None)):
+    """Full deposit history, one keyset page at a time; pass `next_cursor` back as `cursor` for the next page."""
+    page = await deposit_page(ESCROW_ADDRESS, limit, cursor, min_round, max_round, start_time, end_time, sender, order)
+    return encoded(*render(page, accept))
+
+async def deposit_page(escrow: str, limit: int, cursor: Optional[str], min_round: Optional[int], max_round: Optional[int],
+                       start_time: Optional[int], end_time: Optional[int], sender: Optional[str], order: str):
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be > 0")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows, next_key = await asyncio.to_thread(
+        deposit_store.page, escrow, min(limit, MAX_PAGE), after=after, min_round=min_round, max_round=max_round,
+        start_time=start_time, end_time=end_time, sender=sender, ascending=order == "asc")
+    return {"deposits": [r.as_dict() for r in rows], "count": len(rows),
+            "next_cursor": encode_cursor(*next_key) if next_key else None}
+
+@app.get("/deposits/stream")
+async def stream_deposits(from_round: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events feed of new deposits.
+
+    Reconnecting EventSource clients send Last-Event-ID and get everything after it;
+    `from_round` replays stored deposits from that round first. Without either, only
+    deposits synced from now on are sent.
+    """
     try:
-        txs = safe_search_transactions(ESCROW_ADDRESS, limit=limit)
-        results = []
-        for tx in txs:
-            # defensive parsing of transaction structure
-            pay = tx.get("payment-transaction", {}) or {}
-            amt = int(pay.get("amount", 0))
-            results.append({
-                "txid": tx.get("id"),
-                "sender": tx.get("sender"),
-                "amount": amt,
-                "round": int(tx.get("confirmed-round") or 0)
-            })
-        return {"deposits": results, "count": len(results)}
-    except Exception as e:
-        logging.exception("Error fetching deposits")
-        raise HTTPException(status_code=500, detail="Indexer query failed")
\ No newline at end of file
+        if last_event_id:
+            after = decode_cursor(last_event_id)
+        elif from_round is not None:
+            after = (max(from_round, 1) - 1, 0xFFFFFFFF)
+        else:
+            after = None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(sse_events(deposit_hub, deposit_store, ESCROW_ADDRESS, after), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/deposits/stats", responses=ENCODED)
+async def deposit_stats(sender: Optional[str] = None, buckets: int = 24, top: int = 10, accept: Optional[str] = Header(None)):
+    """Totals, top senders and per-round-bucket volume from the incrementally maintained rollups."""
+    if not (0 <= buckets <= 1000 and 0 <= top <= 1000):
+        raise HTTPException(status_code=400, detail="buckets and top must be between 0 and 1000")
+    key = ("stats", ESCROW_ADDRESS, sender, buckets, top, negotiate(accept))
+    body, media_type = await response_cache.get(key, deposit_store.synced_round(ESCROW_ADDRESS),
+                                                lambda: render_stats(sender, buckets, top, accept))
+    return encoded(body, media_type)
+
+async def render_stats(sender: Optional[str], buckets: int, top: int, accept: Optional[str]):
+    return render(await asyncio.to_thread(deposit_store.stats, ESCROW_ADDRESS, sender, buckets, top), accept)
+
+def require_admin(key: Optional[str]) -> None:
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Escrow management is disabled (set ADMIN_API_KEY)")
+    if key is None or not hmac.compare_digest(key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+class EscrowIn(BaseModel):
+    address: str
+
+@app.get("/escrows")
+async def list_escrows():
+    return {"escrows": [{"address": e, "synced_round": deposit_store.synced_round(e)} for e in deposit_store.escrows]}
+
+@app.post("/escrows", status_code=201)
+async def add_escrow(escrow: EscrowIn, x_admin_key: Optional[str] = Header(None)):
+    """Track another escrow; its history is backfilled by the follower's next pass."""
+    require_admin(x_admin_key)
+    if not encoding.is_valid_address(escrow.address):
+        raise HTTPException(status_code=400, detail="Invalid Algorand address")
+    added = await asyncio.to_thread(deposit_store.track, escrow.address)
+    return {"address": escrow.address, "added": added}
+
+@app.delete("/escrows/{address}")
+async def remove_escrow(address: str, x_admin_key: Optional[str] = Header(None)):
+    """Stop following an escrow; stored deposits stay queryable."""
+    require_admin(x_admin_key)
+    if address == ESCROW_ADDRESS:
+        raise HTTPException(status_code=400, detail="The primary ESCROW_ADDRESS cannot be removed")
+    if not await asyncio.to_thread(deposit_store.untrack, address):
+        raise HTTPException(status_code=404, detail="Escrow not tracked")
+    return {"address": address, "removed": True}
+
+@app.get("/escrows/{address}/deposits", response_model=DepositPage, responses=ENCODED)
+async def escrow_deposits(address: str, limit: int = 100, cursor: Optional[str] = None, min_round: Optional[int] = None,
+                          max_round: Optional[int] = None, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                          sender: Optional[str] = None, order: str = "desc", accept: Optional[str] = Header(None)):
+    """Same as /deposits, for any escrow that is or was tracked."""
+    if address not in deposit_store.escrows and not deposit_store.synced_round(address):
+        raise HTTPException(status_code=404, detail="Escrow not tracked")
+    page = await deposit_page(address, limit, cursor, min_round, max_round, start_time, end_time, sender, order)
+    return encoded(*render(page, accept))
@@ -1,4 +1,4 @@
-"""
+r"""
 Hardened batched airdrop for ASA or ALGO.
 
 CSV format: recipient,amount
@@ -16,13 +16,31 @@ Usage (PowerShell example):
  python .\scripts\airdrop_batch.py --csv .\data\recipients.csv --asset 12345 --batch 8 --dry-run
  # execute (will send txs)
  python .\scripts\airdrop_batch.py --csv .\data\recipients.csv --asset 12345 --batch 8 --execute
+ # pipelined execute: keep up to 8 groups in flight, confirm in the background
+ python .\scripts\airdrop_batch.py --csv .\data\recipients.csv --asset 12345 --execute --pipeline --window 8
+ # continue a killed run from its journal (.\data\recipients.csv.journal.sqlite)
+ python .\scripts\airdrop_batch.py --csv .\data\recipients.csv --asset 12345 --execute --pipeline --resume
+ # also opt in custodial recipients whose keys we hold (one mnemonic per line), in the same atomic groups as their transfers
+ python .\scripts\airdrop_batch.py --csv .\data\recipients.csv --asset 12345 --execute --pipeline --custodial-keys .\custodial.keys
+ # keep submit/confirm timings, throughput and algod call metrics in a file (.prom text or .json) while running
+ python .\scripts\airdrop_batch.py --csv .\data\recipients.csv --asset 12345 --execute --pipeline --metrics-file .\airdrop.prom
 """
 from __future__ import annotations
-import os, sys, csv, argparse, math, time, logging
-from typing import List, Tuple, Optional
+import os, sys, argparse, base64, math, time, logging, threading, queue
+from itertools import islice
+from typing import Container, Dict, Iterable, Iterator, List, Sequence, Set, Tuple, Optional
 from algosdk import mnemonic, account
+from algosdk.error import AlgodHTTPError
 from algosdk.v2client import algod
-from algosdk.future.transaction import AssetTransferTxn, PaymentTxn, assign_group_id
+from signing import MAX_GROUP, bundle_txns, new_run_id, pack_bundles, sign_bundles, sign_groups
+from txn_params import ParamsCache
+from confirmations import ConfirmationService, Resolution
+from ratelimit import http_status, throttle
+from key_provider import KeyProvider, load_key_provider
+from metrics import MetricsDumper, DEFAULT_DUMP_INTERVAL, counter, gauge, histogram
+from optin_resolver import OptinCache, current_round, resolve_optins, DEFAULT_WORKERS, DEFAULT_MAX_AGE_ROUNDS
+from recipients import iter_recipients, RecipientTable, NO_OPTIN, INVALID, ZERO_AMOUNT, DUPLICATE, SENT
+from airdrop_journal import AirdropJournal, RowRanges, SUBMITTED, CONFIRMED, FAILED, UNKNOWN, csv_fingerprint
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
@@ -30,14 +48,24 @@ ALGOD_ADDRESS = os.getenv("ALGOD_ADDRESS", "https://testnet-algorand.api.puresta
 ALGOD_TOKEN = os.getenv("ALGOD_TOKEN", "")
 HEADERS = {"X-API-Key": ALGOD_TOKEN} if ALGOD_TOKEN else None
 
-MAX_GROUP = 16  # Algorand supports up to 16 txns in a group
+OPTIN_CHUNK = 10000  # rows resolved per opt-in pass
 DEFAULT_BATCH = 16
+DEFAULT_WINDOW = 8  # groups kept in flight by the pipelined submitter
+JOURNAL_SUFFIX = ".journal.sqlite"  # default journal path is <csv> + suffix
+
+SUBMIT_SECONDS = histogram("airdrop_submit_seconds", "Time for algod to accept one signed group")
+CONFIRM_SECONDS = histogram("airdrop_confirm_seconds", "Time from submitting a group until it is resolved",
+                            buckets=(1.0, 2.5, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0, 120.0))
+GROUPS_RESOLVED = counter("airdrop_groups_total", "Submitted groups by final status", ("status",))
+TXNS_SUBMITTED = counter("airdrop_txns_submitted_total", "Transactions accepted by algod")
+INFLIGHT_GROUPS = gauge("airdrop_inflight_groups", "Groups submitted and not yet resolved")
+TXNS_PER_SECOND = gauge("airdrop_txns_per_second", "Transactions submitted per second since the run started")
 
 def get_algod_client() -> algod.AlgodClient:
     if not ALGOD_TOKEN:
         logging.error("ALGOD_TOKEN not set (PureStake or Algod token required)")
         sys.exit(1)
-    return algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS, headers=HEADERS, timeout=30)
+    return throttle(algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS, headers=HEADERS, timeout=30))
 
 def get_admin() -> Tuple[str, str]:
     m = os.getenv("ADMIN_MNEMONIC", "")
@@ -48,41 +76,6 @@ def get_admin() -> Tuple[str, str]:
     addr = account.address_from_private_key(sk)
     return addr, sk
 
-def load_csv(path: str) -> List[Tuple[str, int]]:
-    if not os.path.exists(path):
-        logging.error("CSV file not found: %s", path)
-        sys.exit(1)
-    rows = []
-    with open(path, newline='') as f:
-        r = csv.reader(f)
-        for i, row in enumerate(r, start=1):
-            if not row or all(not c.strip() for c in row): 
-                continue
-            if len(row) < 2:
-                logging.warning("Skipping malformed line %d: %s", i, row)
-                continue
-            try:
-                addr = row[0].strip()
-                amt = int(row[1])
-            except Exception as e:
-                logging.warning("Skipping bad line %d: %s (%s)", i, row, e)
-                continue
-            rows.append((addr, amt))
-    return rows
-
-def check_optin(acl: algod.AlgodClient, addr: str, asset_id: Optional[int]) -> bool:
-    if asset_id is None:
-        return True
-    try:
-        info = acl.account_info(addr)
-        for a in info.get("assets", []):
-            if a.get("asset-id") == asset_id:
-                return True
-        return False
-    except Exception as e:
-        logging.warning("Account info error for %s: %s", addr, e)
-        return False
-
 def ensure_admin_has_funds(acl: algod.AlgodClient, admin_addr: str, total_algo_required: int, asset_id: Optional[int], total_asset_required: int) -> None:
     info = acl.account_info(admin_addr)
     bal = int(info.get("amount", 0))
@@ -102,85 +95,370 @@ def ensure_admin_has_funds(acl: algod.AlgodClient, admin_addr: str, total_algo_r
             logging.error("Admin does not hold enough of asset %s. required=%d holding=%d", asset_id, total_asset_required, found)
             sys.exit(1)
 
-def send_batch(acl: algod.AlgodClient, admin_addr: str, admin_sk: str, batch_rows: List[Tuple[str,int]], asset_id: Optional[int], wait_confirm: bool = True) -> List[str]:
-    params = acl.suggested_params()
-    txns = []
-    for to, amount in batch_rows:
-        if asset_id:
-            txn = AssetTransferTxn(sender=admin_addr, sp=params, receiver=to, amt=amount, index=asset_id)
+class GroupPipeline:
+    """
+    Submits signed groups while keeping at most `window` of them unconfirmed.
+
+    submit_raw() blocks only when the window is full; a background thread follows the
+    chain round by round (see confirmations.ConfirmationService) and frees a slot
+    as soon as a group is confirmed, rejected by the pool, or past its last valid
+    round. poll_interval is only the pause after a failed status call. With a
+    journal, each group is recorded before it is sent and again once resolved.
+    """
+
+    def __init__(self, acl: algod.AlgodClient, window: int = DEFAULT_WINDOW, poll_interval: float = 1.0, journal: Optional[AirdropJournal] = None):
+        if window <= 0:
+            raise ValueError(f"Invalid window: {window} (must be >= 1)")
+        self.acl = acl
+        self.window = window
+        self.poll_interval = poll_interval
+        self.journal = journal
+        self.submitted = 0
+        self.confirmed = 0
+        self.failed: List[Tuple[int, str, str]] = []  # (group index, first txid, reason)
+        self._slots = threading.BoundedSemaphore(window)
+        self._sent_at: Dict[int, float] = {}  # group index -> monotonic submit time
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._confirm_loop, name="airdrop-confirm", daemon=True)
+        self._worker.start()
+
+    def submit_raw(self, index: int, txids: List[str], blob: bytes, last_valid: int, rows: Optional[Sequence[int]] = None) -> List[str]:
+        """Submit a group that was signed and msgpack-encoded elsewhere (see signing.sign_groups)."""
+        self._send(index, txids, last_valid, rows, lambda: self.acl.send_raw_transaction(base64.b64encode(blob)))
+        return txids
+
+    def _send(self, index: int, txids: List[str], last_valid: int, rows: Optional[Sequence[int]], send) -> None:
+        self._slots.acquire()
+        if self.journal is not None and rows is not None:
+            # write-ahead: a crash after this point must never lead to a resend
+            self.journal.record_submitted(index, rows, txids, last_valid)
+        try:
+            with SUBMIT_SECONDS.time():
+                send()
+        except Exception as e:
+            self._slots.release()
+            code, _ = http_status(e)
+            if self.journal is not None and isinstance(e, AlgodHTTPError) and code is not None and 400 <= code < 500:
+                # the node answered and rejected the group, so nothing was sent
+                self.journal.record_result(index, FAILED, detail=str(e))
+            elif self.journal is not None:
+                # 5xx, timeout or lost connection: the group may have reached the node; --resume looks it up
+                logging.error("Group %d left as submitted (first_txid=%s) after a send error: %s", index + 1, txids[0], e)
+            raise
+        with self._lock:
+            self.submitted += 1
+            self._sent_at[index] = time.monotonic()
+        TXNS_SUBMITTED.inc(len(txids))
+        INFLIGHT_GROUPS.inc()
+        self._queue.put((index, txids[0], last_valid))
+
+    def track(self, index: int, first: str, last_valid: int) -> None:
+        """Wait on a group that was submitted earlier, e.g. by a run being resumed."""
+        self._slots.acquire()
+        INFLIGHT_GROUPS.inc()
+        self._queue.put((index, first, last_valid))
+
+    def close(self) -> None:
+        """Wait for every submitted group to resolve and stop the confirmer."""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _resolve(self, index: int, first: str, status: str, confirmed_round: Optional[int] = None, reason: Optional[str] = None) -> None:
+        if self.journal is not None:
+            self.journal.record_result(index, status, confirmed_round=confirmed_round, detail=reason)
+        with self._lock:
+            if status == CONFIRMED:
+                self.confirmed += 1
+            else:
+                self.failed.append((index, first, reason or status))
+            sent_at = self._sent_at.pop(index, None)
+        if sent_at is not None:
+            CONFIRM_SECONDS.observe(time.monotonic() - sent_at)
+        GROUPS_RESOLVED.inc(status=status)
+        INFLIGHT_GROUPS.dec()
+        self._slots.release()
+
+    def _confirm_loop(self) -> None:
+        service = ConfirmationService(self.acl)
+        outstanding: Dict[str, int] = {}  # first txid -> group index
+        closing = False
+        while not closing or outstanding:
+            # block for new work only when nothing is waiting on confirmation
+            while not closing:
+                try:
+                    item = self._queue.get(block=not outstanding)
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                index, first, last_valid = item
+                res = service.track(first, last_valid)
+                if res is not None:
+                    self._finish(index, res)
+                else:
+                    outstanding[first] = index
+            if not outstanding:
+                continue
+            try:
+                # blocks until the next round, then resolves everything in it
+                resolutions = service.poll()
+            except Exception as e:
+                logging.warning("Status error while confirming: %s", e)
+                time.sleep(self.poll_interval)
+                continue
+            for res in resolutions:
+                index = outstanding.pop(res.txid, None)
+                if index is not None:
+                    self._finish(index, res)
+
+    def _finish(self, index: int, res: Resolution) -> None:
+        if res.status == CONFIRMED:
+            logging.info("Group %d confirmed in round %s", index + 1, res.confirmed_round)
+        elif res.status == UNKNOWN:
+            # the node no longer knows the txn; it may have confirmed unseen
+            logging.error("Group %d unresolved first_txid=%s: %s", index + 1, res.txid, res.reason)
         else:
-            txn = PaymentTxn(sender=admin_addr, sp=params, receiver=to, amt=amount)
-        txns.append(txn)
-    if len(txns) > MAX_GROUP:
-        raise ValueError(f"Batch size {len(txns)} exceeds max group size {MAX_GROUP}")
-    assign_group_id(txns)
-    signed = [t.sign(admin_sk) for t in txns]
+            logging.error("Group %d failed first_txid=%s: %s", index + 1, res.txid, res.reason)
+        self._resolve(index, res.txid, res.status, confirmed_round=res.confirmed_round, reason=res.reason)
+
+def run_pipelined(acl: algod.AlgodClient, admin_addr: str, admin_sk: str, batches: Iterable[Sequence[Tuple[int,str,int]]], asset_id: Optional[int], window: int = DEFAULT_WINDOW,
+                  poll_interval: float = 1.0, total_batches: Optional[int] = None, journal: Optional[AirdropJournal] = None,
+                  params_cache: Optional[ParamsCache] = None, sign_workers: int = 0, keys: Optional[KeyProvider] = None,
+                  optin_rows: Container[int] = (), topup: int = 0) -> GroupPipeline:
+    """
+    Send batches of (row_index, receiver, amount) rows, one group each, through a GroupPipeline.
+
+    With sign_workers > 0 groups are built and signed in a process pool ahead of the submitter.
+    With `keys`, rows in `optin_rows` are sent as opt-in bundles (see signing.sign_bundles),
+    signed inline; batches should then come from signing.pack_bundles.
+    """
+    if params_cache is None:
+        params_cache = ParamsCache(acl)
+    params_cache.start()
+    pipeline = GroupPipeline(acl, window=window, poll_interval=poll_interval, journal=journal)
+    first_index = journal.next_group_index() if journal is not None else 0
+    started = time.monotonic()
+    sent_txns = 0
     try:
-        txid = acl.send_transactions(signed)
-        # algosdk may return a single txid or list depending on client; normalize to list
-        if isinstance(txid, list):
-            txids = txid
-        elif isinstance(txid, str):
-            txids = [txid]
+        # every txn notes the run and its row, so repeated rows never share a txid
+        run_id = new_run_id()
+        logging.info("Run id %s (in every transaction note)", run_id)
+        if keys is not None:
+            groups = sign_bundles(batches, params_cache.get, admin_addr, admin_sk, asset_id, keys, optin_rows, topup, run_id=run_id)
         else:
-            txids = [txid]
-        logging.info("Submitted batch with len=%d first_txid=%s", len(txns), txids[0] if txids else None)
-        if wait_confirm:
-            # wait for first tx confirmation
-            first = txids[0]
-            for _ in range(30):
-                try:
-                    info = acl.pending_transaction_info(first)
-                    if info.get("confirmed-round", 0) > 0:
-                        logging.info("Batch confirmed in round %s", info.get("confirmed-round"))
-                        break
-                except Exception:
-                    pass
-                time.sleep(2)
-        return txids
-    except Exception as e:
-        logging.exception("Failed to send batch: %s", e)
-        raise
+            groups = sign_groups(batches, params_cache.get, admin_addr, admin_sk, asset_id, workers=sign_workers, run_id=run_id)
+        for i, group in enumerate(groups):
+            pipeline.submit_raw(first_index + i, group.txids, group.blob, group.last_valid, rows=group.rows)
+            sent_txns += group.size
+            TXNS_PER_SECOND.set(sent_txns / max(time.monotonic() - started, 1e-9))
+            logging.info("Submitted batch %d/%s size=%d first_txid=%s", i+1, total_batches or "?", group.size, group.txids[0])
+    finally:
+        pipeline.close()
+        params_cache.close()
+    elapsed = max(time.monotonic() - started, 1e-9)
+    TXNS_PER_SECOND.set(sent_txns / elapsed)
+    logging.info("Airdrop done: groups=%d confirmed=%d failed=%d in %.1fs (%.1f txns/sec)",
+                 pipeline.submitted, pipeline.confirmed, len(pipeline.failed), elapsed, sent_txns / elapsed)
+    return pipeline
 
-def run_airdrop(csv_path: str, asset_id: Optional[int], batch_size: int, dry_run: bool=False, execute: bool=False):
+def reconcile_journal(acl: algod.AlgodClient, journal: AirdropJournal, window: int = DEFAULT_WINDOW, poll_interval: float = 1.0) -> None:
+    """Resolve groups a previous run left as submitted: one pending-info lookup each, no history scans."""
+    pending = [g for g in journal.groups() if g.status == SUBMITTED]
+    if not pending:
+        return
+    logging.info("Re-checking %d group(s) left pending by the previous run", len(pending))
+    pipeline = GroupPipeline(acl, window=window, poll_interval=poll_interval, journal=journal)
+    try:
+        for g in pending:
+            try:
+                info = acl.pending_transaction_info(g.txids[0])
+            except Exception as e:
+                # pruned from the node after confirming, or never accepted: cannot tell which
+                logging.error("Group %d status unknown first_txid=%s: %s", g.group_index + 1, g.txids[0], e)
+                journal.record_result(g.group_index, UNKNOWN, detail=str(e))
+                continue
+            if info.get("confirmed-round", 0) > 0:
+                journal.record_result(g.group_index, CONFIRMED, confirmed_round=info["confirmed-round"])
+            elif info.get("pool-error"):
+                journal.record_result(g.group_index, FAILED, detail=info["pool-error"])
+            else:
+                pipeline.track(g.group_index, g.txids[0], g.last_valid)
+    finally:
+        pipeline.close()
+
+def iter_rows(csv_path: str) -> Iterator[Tuple[int, str, int]]:
+    """Yield (row_index, receiver, amount); row_index counts well-formed CSV rows from 0."""
+    return ((i, to, amt) for i, (to, amt) in enumerate(iter_recipients(csv_path)))
+
+def validate_recipients(table: RecipientTable, merge_duplicates: bool = False) -> Dict[str, int]:
+    """
+    Pre-flight checks over the whole table before anything is sent.
+
+    Addresses and amounts were already checked while loading (INVALID and
+    ZERO_AMOUNT flags); this adds duplicate detection through a hashed index
+    of the decoded keys and, when asked, folds duplicate amounts into the
+    first row for each address.
+    """
+    dups = table.find_duplicates()
+    folded = table.merge_duplicates(dups) if merge_duplicates else 0
+    report = {
+        "rows": len(table),
+        "invalid": table.count(INVALID),
+        "zero_amount": table.count(ZERO_AMOUNT),
+        "duplicate_addresses": len(dups),
+        "duplicate_rows": sum(len(p) for p in dups.values()) - len(dups),
+        "merged_rows": folded,
+    }
+    logging.info("Validation: %s", report)
+    for flag, key in ((INVALID, "invalid"), (ZERO_AMOUNT, "zero_amount")):
+        if report[key]:
+            logging.warning("Excluding %d %s row(s), e.g. data rows %s", report[key], key, [table.rows[i] + 1 for i in islice(table.flagged(flag), 5)])
+    if dups and not merge_duplicates:
+        examples = [(table.address(p[0]), [table.rows[i] + 1 for i in p]) for p in islice(dups.values(), 5)]
+        logging.warning("%d address(es) appear more than once and will be paid once per row; "
+                        "pass --merge-duplicates to pay each once with the summed amount. Examples: %s", len(dups), examples)
+    return report
+
+def mark_unopted(acl: algod.AlgodClient, table: RecipientTable, asset_id: int, workers: int = DEFAULT_WORKERS,
+                 cache_path: Optional[str] = None, max_age_rounds: int = DEFAULT_MAX_AGE_ROUNDS) -> None:
+    """Flag NO_OPTIN on every table row whose receiver has not opted in to `asset_id`."""
+    # one cache connection and one round for the whole table; each chunk only reads its own addresses
+    cache = OptinCache(cache_path) if cache_path else None
+    now = current_round(acl) if cache is not None else None
+    try:
+        for start in range(0, len(table), OPTIN_CHUNK):
+            chunk = [(i, table.address(i), table.amounts[i]) for i in table.sendable(start, start + OPTIN_CHUNK)]
+            if not chunk:
+                continue
+            _, skipped = resolve_optins(acl, [(addr, amt) for _, addr, amt in chunk], asset_id, workers=workers,
+                                        max_age_rounds=max_age_rounds, cache=cache, now=now)
+            if not skipped:
+                continue
+            skipped_addrs = {addr for addr, _ in skipped}
+            for i, addr, _ in chunk:
+                if addr in skipped_addrs:
+                    table.mark(i, NO_OPTIN)
+    finally:
+        if cache is not None:
+            cache.close()
+
+def claim_custodial(table: RecipientTable, keys: KeyProvider) -> Set[int]:
+    """
+    Make NO_OPTIN rows whose receiver `keys` can sign for sendable again, to be
+    opted in within their transfer's group. Returns their CSV row indexes.
+    """
+    claimed: Set[int] = set()
+    for i in list(table.flagged(NO_OPTIN)):
+        if table.flags[i] == NO_OPTIN and keys.has(table.address(i)):
+            table.unmark(i, NO_OPTIN)
+            claimed.add(table.rows[i])
+    return claimed
+
+def open_journal(path: str, csv_path: str, asset_id: Optional[int], resume: bool, merge_duplicates: bool = False) -> AirdropJournal:
+    exists = os.path.exists(path)
+    if resume and not exists:
+        logging.error("No journal to resume from: %s", path)
+        sys.exit(1)
+    journal = AirdropJournal(path)
+    if resume:
+        meta = journal.meta()
+        if meta.get("csv_sha256") != csv_fingerprint(csv_path) or meta.get("asset_id") != str(asset_id):
+            logging.error("Journal %s was written for a different CSV or asset; refusing to resume", path)
+            sys.exit(1)
+        if meta.get("merge_duplicates", "False") != str(merge_duplicates):
+            # merged rows are journaled under the first row only; flipping this would re-pay the rest
+            logging.error("Journal %s was written with merge_duplicates=%s; resume with the same setting", path, meta.get("merge_duplicates"))
+            sys.exit(1)
+    elif journal.has_entries():
+        logging.error("Journal %s already has progress; pass --resume to continue it, or move it away to start over", path)
+        sys.exit(1)
+    else:
+        journal.set_meta(csv_path=os.path.abspath(csv_path), csv_sha256=csv_fingerprint(csv_path), asset_id=asset_id,
+                         merge_duplicates=merge_duplicates)
+    return journal
+
+def run_airdrop(csv_path: str, asset_id: Optional[int], batch_size: int, dry_run: bool=False, execute: bool=False, pipeline: bool=False, window: int=DEFAULT_WINDOW,
+                optin_workers: int=DEFAULT_WORKERS, optin_cache: Optional[str]=None, optin_max_age: int=DEFAULT_MAX_AGE_ROUNDS,
+                journal_path: Optional[str]=None, resume: bool=False, merge_duplicates: bool=False, sign_workers: int=0,
+                custodial_keys: Optional[str]=None, optin_topup: int=0):
     if batch_size <= 0 or batch_size > MAX_GROUP:
         logging.error("Invalid batch size: %d (must be 1..%d)", batch_size, MAX_GROUP)
         sys.exit(1)
+    if custodial_keys and asset_id is None:
+        logging.error("--custodial-keys only applies to ASA airdrops (pass --asset)")
+        sys.exit(1)
+    if custodial_keys and batch_size < bundle_txns(optin_topup):
+        logging.error("Batch size %d cannot hold an opt-in bundle of %d txns", batch_size, bundle_txns(optin_topup))
+        sys.exit(1)
+    if pipeline and window <= 0:
+        logging.error("Invalid window: %d (must be >= 1)", window)
+        sys.exit(1)
+    if not os.path.exists(csv_path):
+        logging.error("CSV file not found: %s", csv_path)
+        sys.exit(1)
     acl = get_algod_client()
     admin_addr, admin_sk = get_admin()
-    rows = load_csv(csv_path)
-    if not rows:
+    keys = None
+    if custodial_keys:
+        try:
+            keys = load_key_provider(custodial_keys)
+        except (OSError, ValueError, ImportError, AttributeError) as e:
+            logging.error("Could not load custodial keys from %s: %s", custodial_keys, e)
+            sys.exit(1)
+
+    journal = None
+    done = RowRanges()
+    if resume or (execute and not dry_run):
+        journal = open_journal(journal_path or csv_path + JOURNAL_SUFFIX, csv_path, asset_id, resume, merge_duplicates)
+    if resume:
+        if not dry_run:
+            reconcile_journal(acl, journal, window=window if pipeline else 1)
+        done = journal.covered_rows()
+        unknown = [g for g in journal.groups() if g.status == UNKNOWN]
+        logging.info("Resuming: %d row(s) already sent or in flight will be skipped", len(done))
+        if unknown:
+            logging.warning("%d group(s) have unknown status and are NOT resent; reconcile manually: %s",
+                            len(unknown), [(g.group_index, g.txids[0]) for g in unknown[:5]])
+
+    # validate the whole list first, so merges are identical on every resume
+    table = RecipientTable.from_rows(iter_rows(csv_path))
+    if not len(table):
         logging.error("No recipients found in CSV")
         sys.exit(1)
+    validate_recipients(table, merge_duplicates=merge_duplicates)
+    for lo, hi in done.ranges():
+        table.mark_rows(lo, hi, SENT)
+    if resume and not table.count():
+        logging.info("Nothing left to send.")
+        return
 
-    # filter opt-in for ASA
-    ok_rows = []
-    skipped = []
-    for to, amt in rows:
-        if asset_id is not None:
-            if not check_optin(acl, to, asset_id):
-                skipped.append((to, amt))
-                continue
-        ok_rows.append((to, amt))
+    # filter opt-in for ASA; invalid rows are already flagged and never looked up
+    if asset_id is not None:
+        mark_unopted(acl, table, asset_id, workers=optin_workers,
+                     cache_path=optin_cache, max_age_rounds=optin_max_age)
+    optin_rows: Set[int] = claim_custodial(table, keys) if keys is not None else set()
 
-    logging.info("Total recipients: %d, will_send: %d, skipped_no_optin: %d", len(rows), len(ok_rows), len(skipped))
+    will_send = table.count()
+    skipped = table.count(NO_OPTIN)
+    logging.info("Total recipients: %d, will_send: %d (opt-in bundled: %d), skipped_no_optin: %d, excluded_by_validation: %d, already_sent: %d",
+                 len(table), will_send, len(optin_rows), skipped, table.count(INVALID | ZERO_AMOUNT | DUPLICATE), table.count(SENT))
     if skipped:
-        logging.info("Skipped examples: %s", skipped[:5])
+        logging.info("Skipped examples: %s", [(table.address(i), table.amounts[i]) for i in islice(table.flagged(NO_OPTIN), 5)])
+    total_algo_required = table.total() if asset_id is None else 0
+    total_asset_required = table.total() if asset_id is not None else 0
 
-    # estimate total fees and totals
-    sample_params = acl.suggested_params()
+    # estimate total fees and totals; the same params are reused for the first groups
+    params_cache = ParamsCache(acl)
+    sample_params = params_cache.get()
     fee_per_txn = int(sample_params.fee) if sample_params and getattr(sample_params, "fee", None) else 1000
-    total_fee = fee_per_txn * len(ok_rows)
-    total_algo_required = 0
-    total_asset_required = 0
-    for _, amt in ok_rows:
-        if asset_id is None:
-            total_algo_required += amt
-        else:
-            total_asset_required += amt
+    # each opt-in bundle adds the opt-in's pooled fee, plus a top-up payment and its fee when set
+    extra_txns = len(optin_rows) * (bundle_txns(optin_topup) - 1)
+    total_fee = fee_per_txn * (will_send + extra_txns)
 
     # Include fees for sending transactions (microAlgos)
-    required_algo_micro = total_fee + (total_algo_required if total_algo_required else 0)
+    required_algo_micro = total_fee + (total_algo_required if total_algo_required else 0) + optin_topup * len(optin_rows)
     logging.info("Estimated total fees (microAlgos): %d; total_algo_required: %d; total_asset_required: %d", total_fee, total_algo_required, total_asset_required)
 
     if dry_run:
@@ -194,13 +472,22 @@ def run_airdrop(csv_path: str, asset_id: Optional[int], batch_size: int, dry_run
         logging.error("Execution flag not provided. Add --execute to actually submit transactions. Use --dry-run to preview.")
         sys.exit(1)
 
-    total_batches = math.ceil(len(ok_rows)/batch_size)
-    for i in range(total_batches):
-        batch = ok_rows[i*batch_size:(i+1)*batch_size]
-        logging.info("Sending batch %d/%d size=%d", i+1, total_batches, len(batch))
-        send_batch(acl, admin_addr, admin_sk, batch, asset_id, wait_confirm=True)
-        # small delay to avoid hitting rate limits
-        time.sleep(1)
+    # without --pipeline each group is confirmed before the next one is sent
+    sendable = table.compact()
+    if keys is not None:
+        if sign_workers:
+            logging.info("Opt-in bundles are signed inline; --sign-workers is ignored with --custodial-keys")
+        batches = pack_bundles(sendable.view(0, len(sendable)), batch_size, optin_rows, optin_topup)
+    else:
+        batches = sendable.batches(batch_size)
+    result = run_pipelined(acl, admin_addr, admin_sk, batches, asset_id,
+                           window=window if pipeline else 1, total_batches=math.ceil((will_send + extra_txns)/batch_size), journal=journal,
+                           params_cache=params_cache, sign_workers=sign_workers, keys=keys, optin_rows=optin_rows, topup=optin_topup)
+    journal.close()
+    if result.failed:
+        logging.error("%d group(s) did not confirm; first failures: %s. Rerun with --resume to retry failed rows.",
+                      len(result.failed), result.failed[:5])
+        sys.exit(1)
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
@@ -209,5 +496,28 @@ if __name__ == "__main__":
     p.add_argument("--batch", type=int, default=DEFAULT_BATCH, help=f"Batch size (1..{MAX_GROUP})")
     p.add_argument("--dry-run", action="store_true", help="Show estimates and validations, do not submit txs")
     p.add_argument("--execute", action="store_true", help="Actually submit transactions (required to send)")
+    p.add_argument("--pipeline", action="store_true", help="Keep several groups in flight and confirm them in the background")
+    p.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Max unconfirmed groups in flight with --pipeline")
+    p.add_argument("--optin-workers", type=int, default=DEFAULT_WORKERS, help="Concurrent account lookups for the ASA opt-in check")
+    p.add_argument("--optin-cache", default=None, help="SQLite file caching opt-in lookups between runs")
+    p.add_argument("--optin-max-age", type=int, default=DEFAULT_MAX_AGE_ROUNDS, help="Reuse cached opt-ins seen within this many rounds")
+    p.add_argument("--journal", default=None, help=f"Progress journal path (default: <csv>{JOURNAL_SUFFIX})")
+    p.add_argument("--resume", action="store_true", help="Continue a killed run from its journal, skipping rows already sent")
+    p.add_argument("--merge-duplicates", action="store_true", help="Pay each repeated address once with the summed amount")
+    p.add_argument("--sign-workers", type=int, default=0, help="Sign groups in this many worker processes (0 = sign inline)")
+    p.add_argument("--custodial-keys", default=None,
+                   help="Opt in recipients whose keys these hold, in the same groups as their transfers: a mnemonics file, kmd:WALLET or module:factory")
+    p.add_argument("--optin-topup", type=int, default=0,
+                   help="microAlgos paid to each opted-in recipient first, for accounts short of the opt-in minimum balance")
+    p.add_argument("--metrics-file", default=None, help="Write metrics here while running (JSON if it ends in .json, else Prometheus text)")
+    p.add_argument("--metrics-interval", type=float, default=DEFAULT_DUMP_INTERVAL, help="Seconds between --metrics-file rewrites")
     args = p.parse_args()
-    run_airdrop(args.csv, args.asset, args.batch, dry_run=args.dry_run, execute=args.execute)
\ No newline at end of file
+    dumper = MetricsDumper(args.metrics_file, args.metrics_interval).start() if args.metrics_file else None
+    try:
+        run_airdrop(args.csv, args.asset, args.batch, dry_run=args.dry_run, execute=args.execute, pipeline=args.pipeline, window=args.window,
+                    optin_workers=args.optin_workers, optin_cache=args.optin_cache, optin_max_age=args.optin_max_age,
+                    journal_path=args.journal, resume=args.resume, merge_duplicates=args.merge_duplicates,
+                    sign_workers=args.sign_workers, custodial_keys=args.custodial_keys, optin_topup=args.optin_topup)
+    finally:
+        if dumper is not None:
+            dumper.close()
\ No newline at end of file
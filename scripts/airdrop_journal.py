@@ -0,0 +1,170 @@
+"""
+Durable progress journal for airdrop runs.
+
+Every group is written ahead as `submitted` (the rows it pays, txids, last
+valid round) before it is sent, and later resolved by appending a `confirmed`,
+`failed` or `unknown` entry. Entries are never updated in place, so a killed
+run leaves an exact record of what may have reached the network:
+ - confirmed / submitted / unknown rows are never sent again on --resume
+ - failed rows (rejected by the node or expired unconfirmed) are sent again
+ - unknown groups could not be proven either way and need manual reconciliation
+
+Row indexes count well-formed CSV rows from 0, so the journal also records a
+fingerprint of the CSV and refuses to resume against a different file.
+"""
+from __future__ import annotations
+import hashlib, sqlite3, threading, time
+from bisect import bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+SUBMITTED = "submitted"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+UNKNOWN = "unknown"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    seq              INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_index      INTEGER NOT NULL,
+    status           TEXT    NOT NULL,
+    first_row        INTEGER,
+    last_row         INTEGER,
+    row_ranges       TEXT,
+    txids            TEXT,
+    last_valid       INTEGER,
+    confirmed_round  INTEGER,
+    detail           TEXT,
+    created          REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_group ON entries (group_index, seq);
+"""
+
+def csv_fingerprint(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class GroupRecord(NamedTuple):
+    group_index: int
+    status: str
+    first_row: int
+    last_row: int
+    txids: List[str]
+    last_valid: int
+    rows: List[Tuple[int, int]]  # the rows the group pays, as inclusive ranges
+
+class RowRanges:
+    """Set of row indexes stored as sorted, merged inclusive ranges."""
+
+    def __init__(self, ranges: Sequence[Tuple[int, int]] = ()):
+        merged: List[Tuple[int, int]] = []
+        for lo, hi in sorted(ranges):
+            if merged and lo <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+            else:
+                merged.append((lo, hi))
+        self._starts = [lo for lo, _ in merged]
+        self._ends = [hi for _, hi in merged]
+
+    def ranges(self) -> List[Tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    def __contains__(self, row: int) -> bool:
+        i = bisect_right(self._starts, row) - 1
+        return i >= 0 and row <= self._ends[i]
+
+    def __len__(self) -> int:
+        return sum(hi - lo + 1 for lo, hi in zip(self._starts, self._ends))
+
+    @classmethod
+    def of(cls, rows: Iterable[int]) -> "RowRanges":
+        return cls([(r, r) for r in rows])
+
+    def dumps(self) -> str:
+        return ",".join(f"{lo}-{hi}" for lo, hi in self.ranges())
+
+    @classmethod
+    def loads(cls, text: str) -> "RowRanges":
+        return cls([tuple(int(x) for x in part.split("-")) for part in text.split(",") if part])
+
+class AirdropJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # written from the confirmer thread as well as the submitter
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        if "row_ranges" not in {c[1] for c in self._db.execute("PRAGMA table_info(entries)")}:
+            # journals written before exact rows were kept only have the first/last row
+            self._db.execute("ALTER TABLE entries ADD COLUMN row_ranges TEXT")
+        self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def meta(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._db.execute("SELECT key, value FROM meta"))
+
+    def set_meta(self, **values) -> None:
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                 [(k, str(v)) for k, v in values.items()])
+            self._db.commit()
+
+    def has_entries(self) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM entries LIMIT 1").fetchone() is not None
+
+    def next_group_index(self) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT MAX(group_index) FROM entries").fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def _append(self, group_index: int, status: str, **cols) -> None:
+        cols.update(group_index=group_index, status=status, created=time.time())
+        names = ", ".join(cols)
+        marks = ", ".join("?" for _ in cols)
+        with self._lock:
+            self._db.execute(f"INSERT INTO entries ({names}) VALUES ({marks})", tuple(cols.values()))
+            self._db.commit()
+
+    def record_submitted(self, group_index: int, rows: Iterable[int], txids: List[str], last_valid: int) -> None:
+        """`rows` are the exact rows the group pays; rows skipped between them stay unsent."""
+        ranges = RowRanges.of(rows)
+        spans = ranges.ranges()
+        self._append(group_index, SUBMITTED, first_row=spans[0][0], last_row=spans[-1][1], row_ranges=ranges.dumps(),
+                     txids=",".join(txids), last_valid=last_valid)
+
+    def record_result(self, group_index: int, status: str, confirmed_round: Optional[int] = None, detail: Optional[str] = None) -> None:
+        if status not in (CONFIRMED, FAILED, UNKNOWN):
+            raise ValueError(f"Invalid journal status: {status}")
+        self._append(group_index, status, confirmed_round=confirmed_round, detail=detail)
+
+    def groups(self) -> List[GroupRecord]:
+        """Latest state of every journaled group, in group order."""
+        with self._lock:
+            cur = self._db.execute("""
+                SELECT s.group_index,
+                       (SELECT e.status FROM entries e WHERE e.group_index = s.group_index ORDER BY e.seq DESC LIMIT 1),
+                       s.first_row, s.last_row, s.txids, s.last_valid, s.row_ranges
+                FROM entries s
+                WHERE s.status = ?
+                ORDER BY s.group_index
+            """, (SUBMITTED,))
+            rows = cur.fetchall()
+        return [GroupRecord(g, st, lo, hi, txids.split(","), lv, RowRanges.loads(exact).ranges() if exact else [(lo, hi)])
+                for g, st, lo, hi, txids, lv, exact in rows]
+
+    def covered_rows(self) -> RowRanges:
+        """Rows that must not be sent again: those of every group not known to have failed."""
+        return RowRanges([span for g in self.groups() if g.status != FAILED for span in g.rows])
@@ -0,0 +1,73 @@
+"""
+Non-blocking indexer access for the backend.
+
+AsyncIndexerClient covers the indexer calls the backend makes, on one pooled
+httpx.AsyncClient, so connections stay alive between sync passes. Requests
+take tokens from the same per-host bucket as the SDK clients wrapped by
+ratelimit.throttle, and are retried with asyncio sleeps, so a slow or
+rate-limited indexer never holds a worker thread.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional
+import httpx
+from ratelimit import RetryPolicy, DEFAULT_POLICY, Limits, bucket_for, call_with_retries_async
+from metrics import route
+
+INDEXER_AUTH_HEADER = "X-Indexer-API-Token"
+MAX_CONNECTIONS = 20
+
+class IndexerHTTPError(Exception):
+    def __init__(self, msg: str, code: int, retry_after: Optional[float] = None):
+        super().__init__(msg)
+        self.code = code
+        self.retry_after = retry_after
+
+class AsyncIndexerClient:
+    def __init__(self, indexer_token: str, indexer_address: str, headers: Optional[Dict[str, str]] = None,
+                 timeout: float = 30.0, limits: Optional[Limits] = None, policy: RetryPolicy = DEFAULT_POLICY):
+        hdrs = dict(headers or {})
+        if indexer_token:
+            hdrs[INDEXER_AUTH_HEADER] = indexer_token
+        self.indexer_address = indexer_address.rstrip("/")
+        self.policy = policy
+        self.bucket = bucket_for(indexer_address, limits)
+        self._http = httpx.AsyncClient(
+            base_url=self.indexer_address, headers=hdrs, timeout=timeout,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def request(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """GET `path` (relative to /v2) and return the decoded JSON body."""
+        query = {k: v for k, v in (params or {}).items() if v is not None}
+        return await call_with_retries_async(lambda: self._get("/v2" + path, query), self.bucket, self.policy,
+                                             call="GET /v2" + route(path))
+
+    async def _get(self, path: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            resp = await self._http.get(path, params=query)
+        except httpx.TransportError as e:
+            raise ConnectionError(f"indexer unreachable: {e}") from e
+        if resp.status_code >= 400:
+            try:
+                msg = resp.json().get("message", resp.text)
+            except ValueError:
+                msg = resp.text
+            retry_after = resp.headers.get("Retry-After")
+            raise IndexerHTTPError(msg, resp.status_code, float(retry_after) if retry_after and retry_after.isdigit() else None)
+        return resp.json()
+
+    async def health(self) -> Dict[str, Any]:
+        return await call_with_retries_async(lambda: self._get("/health", {}), self.bucket, self.policy, call="GET /health")
+
+    async def search_transactions(self, limit: Optional[int] = None, next_page: Optional[str] = None,
+                                  txn_type: Optional[str] = None, min_round: Optional[int] = None,
+                                  max_round: Optional[int] = None, address: Optional[str] = None,
+                                  address_role: Optional[str] = None) -> Dict[str, Any]:
+        """Same keywords (and response) as IndexerClient.search_transactions, for the subset the backend uses."""
+        return await self.request("/transactions", {
+            "limit": limit, "next": next_page, "tx-type": txn_type, "min-round": min_round,
+            "max-round": max_round, "address": address, "address-role": address_role,
+        })
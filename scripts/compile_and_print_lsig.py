@@ -1,9 +1,11 @@
 # Compile escrow.teal via Algod (PureStake) and print the logic-sig (escrow) address.
 # Do NOT put private keys here. Set ALGOD_TOKEN to your PureStake API key in env vars.
+# Results are reused from the local compile cache (see teal_cache.py) when the source is unchanged.
 
-import os, base64, sys
+import os, sys
 from algosdk.v2client import algod
-from algosdk import logic
+from ratelimit import throttle
+from teal_cache import compile_teal
 
 ALGOD_ADDRESS = os.getenv("ALGOD_ADDRESS", "https://testnet-algorand.api.purestake.io/ps2")
 ALGOD_TOKEN = os.getenv("ALGOD_TOKEN", "")
@@ -12,7 +14,7 @@ if not ALGOD_TOKEN:
     sys.exit(1)
 
 HEADERS = {"X-API-Key": ALGOD_TOKEN}
-client = algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS, headers=HEADERS, timeout=30)
+client = throttle(algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS, headers=HEADERS, timeout=30))
 
 teal_path = os.path.join(os.path.dirname(__file__), "..", "contracts", "escrow", "escrow.teal")
 if not os.path.exists(teal_path):
@@ -23,12 +25,11 @@ with open(teal_path, "r", encoding="utf-8") as f:
     teal_source = f.read()
 
 try:
-    resp = client.compile(teal_source)
-    prog_b64 = resp.get("result")
-    prog = base64.b64decode(prog_b64)
-    lsig = logic.LogicSigAccount(prog)
-    print("Escrow (lsig) address:", lsig.address())
-    print("Compiled program (base64):", prog_b64)
+    compiled = compile_teal(client, teal_source)
+    print("Escrow (lsig) address:", compiled.address)
+    print("Compiled program (base64):", compiled.b64)
+    if compiled.cached:
+        print("(from compile cache, node", compiled.node_version + ")")
 except Exception as e:
     print("Compile failed:", e, file=sys.stderr)
     sys.exit(1)
\ No newline at end of file
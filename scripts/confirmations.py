@@ -0,0 +1,163 @@
+"""
+Round-driven confirmation tracking for many txids at once.
+
+Instead of polling `pending_transaction_info` per txid on a timer, the
+service blocks on `status_after_block` and, for every new round, fetches the
+block's txid list (`GET /v2/blocks/{round}/txids`) and resolves every tracked
+txid that appears in it. That is about one request per round no matter how
+many txids are outstanding. Pending info is only consulted for:
+ - txids still unconfirmed `stale_rounds` after being tracked (to surface
+   pool errors early instead of waiting out the validity window)
+ - nodes without the block-txids endpoint, once per round per txid
+A txid that passes its last valid round without appearing in any scanned
+block is reported as failed; if some of those blocks could not be scanned
+and the node no longer knows the txid, it is reported as unknown.
+
+The service is not thread-safe: one thread (a confirmer loop, or the caller
+of wait_for) owns it.
+"""
+from __future__ import annotations
+import logging
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+CONFIRMED = "confirmed"
+FAILED = "failed"
+UNKNOWN = "unknown"
+
+STALE_ROUNDS = 3     # rounds before an unconfirmed txid is checked individually
+RECENT_ROUNDS = 8    # scanned blocks remembered for txids tracked late
+
+class Resolution(NamedTuple):
+    txid: str
+    status: str
+    confirmed_round: Optional[int]
+    reason: Optional[str]
+
+class _Tracked:
+    __slots__ = ("last_valid", "since", "gap", "checked")
+
+    def __init__(self, last_valid: int, since: int):
+        self.last_valid = last_valid
+        self.since = since
+        self.gap = False       # a block in its window could not be scanned
+        self.checked = False   # already looked up individually once
+
+class ConfirmationService:
+    def __init__(self, acl, stale_rounds: int = STALE_ROUNDS):
+        self.acl = acl
+        self.stale_rounds = stale_rounds
+        self.round: Optional[int] = None
+        self._scanned = 0      # last round whose txids were fetched
+        self.requests = 0
+        self._tracked: Dict[str, _Tracked] = {}
+        self._recent: Deque[Tuple[int, Set[str]]] = deque(maxlen=RECENT_ROUNDS)
+        self._block_txids_supported = True
+
+    def __len__(self) -> int:
+        return len(self._tracked)
+
+    def _current_round(self) -> int:
+        if self.round is None:
+            self.requests += 1
+            self.round = int(self.acl.status().get("last-round", 0))
+            # the latest block may already hold txids sent just before this call
+            self._scanned = max(self._scanned, self.round - 1)
+        return self.round
+
+    def track(self, txid: str, last_valid: int) -> Optional[Resolution]:
+        """Start tracking `txid`; resolves immediately if it is in a recently scanned block."""
+        for rnd, txids in self._recent:
+            if txid in txids:
+                return Resolution(txid, CONFIRMED, rnd, None)
+        if not self._tracked:
+            # idle since the last poll: re-read the round rather than scanning the blocks in between
+            self.round = None
+        self._tracked[txid] = _Tracked(last_valid, self._current_round())
+        return None
+
+    def poll(self) -> List[Resolution]:
+        """Wait for the next round and return every txid it resolved."""
+        start = self._current_round()
+        self.requests += 1
+        status = self.acl.status_after_block(start)
+        new_round = int(status.get("last-round", start + 1))
+        resolved: List[Resolution] = []
+        for rnd in range(self._scanned + 1, new_round + 1):
+            txids = self._block_txids(rnd)
+            if txids is None:
+                for t in self._tracked.values():
+                    t.gap = True
+                continue
+            self._recent.append((rnd, txids))
+            for txid in [t for t in self._tracked if t in txids]:
+                del self._tracked[txid]
+                resolved.append(Resolution(txid, CONFIRMED, rnd, None))
+        self.round = self._scanned = new_round
+        resolved.extend(self._check_individually(new_round))
+        return resolved
+
+    def wait_for(self, txid: str, last_valid: Optional[int] = None) -> dict:
+        """Block until `txid` confirms and return its pending info (asset-index etc.)."""
+        self.requests += 1
+        info = self.acl.pending_transaction_info(txid)
+        if info.get("confirmed-round", 0) > 0:
+            return info
+        if info.get("pool-error"):
+            raise RuntimeError(f"Transaction {txid} rejected: {info['pool-error']}")
+        if last_valid is None:
+            last_valid = int(info.get("txn", {}).get("txn", {}).get("lv", self._current_round() + 1000))
+        res = self.track(txid, last_valid)
+        while res is None:
+            res = next((r for r in self.poll() if r.txid == txid), None)
+        if res.status != CONFIRMED:
+            raise RuntimeError(f"Transaction {txid} not confirmed: {res.reason or res.status}")
+        self.requests += 1
+        return self.acl.pending_transaction_info(txid)
+
+    def _block_txids(self, rnd: int) -> Optional[Set[str]]:
+        if not self._block_txids_supported:
+            return None
+        try:
+            self.requests += 1
+            resp = self.acl.algod_request("GET", f"/blocks/{rnd}/txids")
+            return set(resp.get("blockTxids") or [])
+        except Exception as e:
+            if "404" in str(e) or "not found" in str(e).lower():
+                logging.info("Node has no block txids endpoint; falling back to per-txid checks")
+                self._block_txids_supported = False
+            else:
+                logging.warning("Could not fetch txids for round %d: %s", rnd, e)
+            return None
+
+    def _check_individually(self, now: int) -> List[Resolution]:
+        resolved: List[Resolution] = []
+        for txid, t in list(self._tracked.items()):
+            expired = now > t.last_valid
+            if expired and not t.gap:
+                # every block in its validity window was scanned and it was in none of them
+                resolved.append(Resolution(txid, FAILED, None, f"expired after round {t.last_valid}"))
+                del self._tracked[txid]
+                continue
+            stale = not t.checked and now - t.since >= self.stale_rounds
+            if not (expired or t.gap or stale):
+                continue
+            t.checked = True
+            try:
+                self.requests += 1
+                info = self.acl.pending_transaction_info(txid)
+            except Exception as e:
+                if expired:
+                    resolved.append(Resolution(txid, UNKNOWN, None, str(e)))
+                    del self._tracked[txid]
+                continue
+            if info.get("confirmed-round", 0) > 0:
+                resolved.append(Resolution(txid, CONFIRMED, info["confirmed-round"], None))
+            elif info.get("pool-error"):
+                resolved.append(Resolution(txid, FAILED, None, info["pool-error"]))
+            elif expired:
+                resolved.append(Resolution(txid, FAILED, None, f"expired after round {t.last_valid}"))
+            else:
+                continue
+            del self._tracked[txid]
+        return resolved
@@ -1,4 +1,4 @@
-"""
+r"""
 Create an Algorand Standard Asset (ASA).
 Env vars required:
  - ALGOD_ADDRESS (eg https://testnet-algorand.api.purestake.io/ps2)
@@ -7,13 +7,26 @@ Env vars required:
 Usage (PowerShell):
  $env:ALGOD_TOKEN="YOUR_KEY"; $env:ADMIN_MNEMONIC="your twelve word mnemonic"
  python .\scripts\create_asa.py --name "MyToken" --unit "MTK" --total 1000000 --decimals 0 --url "https://example.com/meta.json"
+ # many assets from a manifest (JSON list or CSV with a header: name,unit,total,decimals,url,default_frozen),
+ # created in atomic groups of up to 16 with several groups in flight; asset ids are written to the report
+ python .\scripts\create_asa.py --manifest .\data\assets.csv --report .\data\assets.report.json
 """
 import os
 import sys
+import csv
+import base64
+import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence
 from algosdk import mnemonic, account
+from algosdk.error import AlgodHTTPError
 from algosdk.v2client import algod
-from algosdk.future.transaction import AssetConfigTxn
+from algosdk.future.transaction import AssetConfigTxn, assign_group_id
+from txn_params import ParamsCache
+from confirmations import ConfirmationService, CONFIRMED, FAILED
+from ratelimit import http_status, throttle
+from signing import MAX_GROUP, encode_signed, new_run_id
 
 ALGOD_ADDRESS = os.getenv("ALGOD_ADDRESS", "https://testnet-algorand.api.purestake.io/ps2")
 ALGOD_TOKEN = os.getenv("ALGOD_TOKEN", "")
@@ -22,7 +35,7 @@ HEADERS = {"X-API-Key": ALGOD_TOKEN} if ALGOD_TOKEN else None
 def get_client():
     if not ALGOD_TOKEN:
         print("ERROR: set ALGOD_TOKEN in env", file=sys.stderr); sys.exit(1)
-    return algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS, headers=HEADERS, timeout=30)
+    return throttle(algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS, headers=HEADERS, timeout=30))
 
 def get_admin_account():
     m = os.getenv("ADMIN_MNEMONIC", "")
@@ -33,33 +46,221 @@ def get_admin_account():
     addr = account.address_from_private_key(sk)
     return addr, sk
 
-def create_asa(args):
-    client = get_client()
-    sender, sk = get_admin_account()
-    params = client.suggested_params()
-    txn = AssetConfigTxn(
+ASSET_MIN_BALANCE = 100000   # microAlgos the creator must hold per created asset
+DEFAULT_CONCURRENCY = 4      # groups submitted at once in manifest mode
+
+class AssetSpec(NamedTuple):
+    name: str
+    unit: str
+    total: int
+    decimals: int = 0
+    url: str = ""
+    default_frozen: bool = False
+
+class AssetResult(NamedTuple):
+    row: int                 # position in the manifest, from 0
+    name: str
+    unit: str
+    txid: Optional[str]
+    status: str              # confirmations.CONFIRMED / FAILED / UNKNOWN
+    asset_id: Optional[int]
+    reason: Optional[str] = None
+
+def asset_txn(spec: AssetSpec, sender: str, params, note: Optional[bytes] = None) -> AssetConfigTxn:
+    return AssetConfigTxn(
         sender=sender,
         sp=params,
-        total=args.total,
-        default_frozen=False,
-        unit_name=args.unit,
-        asset_name=args.name,
+        total=spec.total,
+        default_frozen=spec.default_frozen,
+        unit_name=spec.unit,
+        asset_name=spec.name,
         manager=sender,
         reserve=sender,
         freeze=sender,
         clawback=sender,
-        decimals=args.decimals,
-        url=args.url or "",
+        decimals=spec.decimals,
+        url=spec.url or "",
+        note=note,
     )
+
+def _truthy(value) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+def load_manifest(path: str) -> List[AssetSpec]:
+    """Asset specs from a JSON list (or {"assets": [...]}) or a CSV with a header row; exits listing every bad row."""
+    if not os.path.exists(path):
+        print("ERROR: manifest not found:", path, file=sys.stderr); sys.exit(1)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".json"):
+            data = json.load(f)
+            entries = data.get("assets", []) if isinstance(data, dict) else data
+        else:
+            entries = list(csv.DictReader(f))
+    specs, errors = [], []
+    for i, e in enumerate(entries):
+        try:
+            spec = AssetSpec(name=str(e["name"]).strip(), unit=str(e["unit"]).strip(), total=int(e["total"]),
+                             decimals=int(e.get("decimals") or 0), url=str(e.get("url") or "").strip(),
+                             default_frozen=_truthy(e.get("default_frozen", False)))
+        except (KeyError, TypeError, ValueError) as ex:
+            errors.append(f"entry {i + 1}: {ex!r}")
+            continue
+        problems = [msg for bad, msg in (
+            (not spec.name or len(spec.name.encode()) > 32, "name must be 1..32 bytes"),
+            (not spec.unit or len(spec.unit.encode()) > 8, "unit must be 1..8 bytes"),
+            (len(spec.url.encode()) > 96, "url must be at most 96 bytes"),
+            (not 0 < spec.total < 2 ** 64, "total must be 1..2^64-1"),
+            (not 0 <= spec.decimals <= 19, "decimals must be 0..19"),
+        ) if bad]
+        if problems:
+            errors.append(f"entry {i + 1} ({spec.name or '?'}): " + ", ".join(problems))
+        specs.append(spec)
+    if errors:
+        print("ERROR: invalid manifest entries:\n  " + "\n  ".join(errors), file=sys.stderr); sys.exit(1)
+    if not specs:
+        print("ERROR: manifest has no assets", file=sys.stderr); sys.exit(1)
+    return specs
+
+def ensure_can_create(client, sender: str, count: int, fee: int) -> None:
+    """Exit unless `sender` can pay the fees and the min-balance increase for `count` new assets."""
+    info = client.account_info(sender)
+    spendable = int(info.get("amount", 0)) - int(info.get("min-balance", 0))
+    need = count * (ASSET_MIN_BALANCE + fee)
+    if spendable < need:
+        print(f"ERROR: creating {count} asset(s) needs {need} microAlgos above the min balance; {sender} has {spendable}",
+              file=sys.stderr)
+        sys.exit(1)
+
+def group_asset_ids(client, txids: Sequence[str]) -> List[Optional[int]]:
+    """asset-index of each txn in a confirmed creation group."""
+    first = client.pending_transaction_info(txids[0]).get("asset-index")
+    if len(txids) == 1:
+        return [first]
+    last = client.pending_transaction_info(txids[-1]).get("asset-index")
+    if first and last and last - first == len(txids) - 1:
+        # a group's txns sit back to back in the block, so their ids are consecutive
+        return list(range(first, last + 1))
+    return [first] + [client.pending_transaction_info(t).get("asset-index") for t in txids[1:-1]] + [last]
+
+def create_assets(client, sender: str, sk: str, specs: Sequence[AssetSpec], group_size: int = MAX_GROUP,
+                  concurrency: int = DEFAULT_CONCURRENCY, params_cache: Optional[ParamsCache] = None) -> List[AssetResult]:
+    """
+    Create every asset in `specs`: atomic groups of up to `group_size`, `concurrency` groups submitted
+    at once, confirmations followed round by round, then the asset ids looked up per group.
+    """
+    if not 1 <= group_size <= MAX_GROUP:
+        raise ValueError(f"Invalid group size: {group_size} (must be 1..{MAX_GROUP})")
+    params_cache = params_cache or ParamsCache(client)
+    # a run/entry note keeps identical manifest entries from sharing a txid under the same cached params
+    run_id = new_run_id()
+    groups = []  # (first row, txids, blob, last_valid)
+    for start in range(0, len(specs), group_size):
+        params = params_cache.get()
+        txns = [asset_txn(spec, sender, params, f"create_asa:{run_id}:{start + i}".encode())
+                for i, spec in enumerate(specs[start:start + group_size])]
+        if len(txns) > 1:
+            assign_group_id(txns)
+        groups.append((start, [t.get_txid() for t in txns], encode_signed([t.sign(sk) for t in txns]), txns[0].last_valid_round))
+
+    results: Dict[int, AssetResult] = {}
+
+    def fail(start: int, txids: List[str], status: str, reason: str) -> None:
+        for i, txid in enumerate(txids):
+            spec = specs[start + i]
+            results[start + i] = AssetResult(start + i, spec.name, spec.unit, txid, status, None, reason)
+
+    def send(group):
+        try:
+            client.send_raw_transaction(base64.b64encode(group[2]))
+            return None
+        except Exception as e:
+            return e
+
+    service = ConfirmationService(client)
+    outstanding: Dict[str, tuple] = {}
+    confirmed = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for group, error in zip(groups, pool.map(send, groups)):
+            start, txids, _, last_valid = group
+            if error is not None:
+                code, _ = http_status(error)
+                if isinstance(error, AlgodHTTPError) and code is not None and 400 <= code < 500:
+                    print(f"Group at entry {start + 1} rejected: {error}", file=sys.stderr)
+                    fail(start, txids, FAILED, str(error))
+                    continue
+                # 5xx, timeout or lost connection: the node may have the group; confirmation or expiry decides
+                print(f"Group at entry {start + 1} may not have been sent ({error}); following it until it confirms or expires",
+                      file=sys.stderr)
+            else:
+                print(f"Submitted {len(txids)} asset(s) from entry {start + 1}, first txid {txids[0]}")
+            res = service.track(txids[0], last_valid)
+            if res is None:
+                outstanding[txids[0]] = group
+            elif res.status == CONFIRMED:
+                confirmed.append(group)
+            else:
+                fail(start, txids, res.status, res.reason or res.status)
+        while outstanding:
+            for res in service.poll():
+                group = outstanding.pop(res.txid, None)
+                if group is None:
+                    continue
+                if res.status == CONFIRMED:
+                    confirmed.append(group)
+                else:
+                    fail(group[0], group[1], res.status, res.reason or res.status)
+
+        def lookup(group):
+            try:
+                return group_asset_ids(client, group[1])
+            except Exception as e:
+                return e
+        for group, ids in zip(confirmed, pool.map(lookup, confirmed)):
+            start, txids = group[0], group[1]
+            for i, txid in enumerate(txids):
+                spec = specs[start + i]
+                if isinstance(ids, Exception) or ids[i] is None:
+                    why = ids if isinstance(ids, Exception) else "no asset-index"
+                    results[start + i] = AssetResult(start + i, spec.name, spec.unit, txid, CONFIRMED, None,
+                                                     f"confirmed, but the asset id lookup failed: {why}")
+                else:
+                    results[start + i] = AssetResult(start + i, spec.name, spec.unit, txid, CONFIRMED, ids[i])
+    return [results[i] for i in range(len(specs))]
+
+def create_from_manifest(args) -> List[AssetResult]:
+    specs = load_manifest(args.manifest)
+    client = get_client()
+    sender, sk = get_admin_account()
+    params_cache = ParamsCache(client)
+    ensure_can_create(client, sender, len(specs), int(getattr(params_cache.get(), "min_fee", None) or 1000))
+    try:
+        results = create_assets(client, sender, sk, specs, group_size=args.group_size, concurrency=args.concurrency,
+                                params_cache=params_cache)
+    except ValueError as e:
+        print("ERROR:", e, file=sys.stderr); sys.exit(1)
+    for r in results:
+        print(f"{r.row + 1:>5}  {r.unit:<8} {r.name:<32} {r.status:<9} {r.asset_id if r.asset_id is not None else '-':>12}  {r.reason or ''}")
+    created = sum(1 for r in results if r.asset_id is not None)
+    print(f"Created {created}/{len(results)} asset(s)")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump([r._asdict() for r in results], f, indent=2)
+        print("Report written to", args.report)
+    if any(r.status != CONFIRMED for r in results):
+        sys.exit(1)
+    return results
+
+def create_asa(args, params_cache=None):
+    client = get_client()
+    sender, sk = get_admin_account()
+    params = (params_cache or ParamsCache(client)).get()
+    txn = asset_txn(AssetSpec(args.name, args.unit, args.total, args.decimals, args.url or ""), sender, params)
     signed = txn.sign(sk)
     txid = client.send_transaction(signed)
     print("Sent create-asa txid:", txid)
     print("Waiting for confirmation...")
-    from algosdk.v2client import algod as algod_client_mod
     try:
-        confirmed = client.pending_transaction_info(txid)
-        while not confirmed.get("confirmed-round", None):
-            confirmed = client.pending_transaction_info(txid)
+        confirmed = ConfirmationService(client).wait_for(txid, txn.last_valid_round)
         asset_id = confirmed["asset-index"]
         print("ASA created. Asset ID:", asset_id)
     except Exception as e:
@@ -67,10 +268,19 @@ def create_asa(args):
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
-    p.add_argument("--name", required=True)
-    p.add_argument("--unit", required=True)
-    p.add_argument("--total", type=int, required=True)
+    p.add_argument("--name")
+    p.add_argument("--unit")
+    p.add_argument("--total", type=int)
     p.add_argument("--decimals", type=int, default=0)
     p.add_argument("--url", default="")
+    p.add_argument("--manifest", default=None, help="JSON or CSV of assets to create in batched groups")
+    p.add_argument("--group-size", type=int, default=MAX_GROUP, help=f"Assets per atomic group with --manifest (1..{MAX_GROUP})")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Groups submitted at once with --manifest")
+    p.add_argument("--report", default=None, help="Write the per-asset results (incl. asset ids) to this JSON file")
     args = p.parse_args()
-    create_asa(args)
\ No newline at end of file
+    if args.manifest:
+        create_from_manifest(args)
+    elif not (args.name and args.unit and args.total):
+        p.error("--name, --unit and --total are required (or pass --manifest)")
+    else:
+        create_asa(args)
\ No newline at end of file
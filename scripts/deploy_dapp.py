@@ -5,14 +5,17 @@ Deploys smart contracts and provides Application ID for the dApp
 """
 
 import os
-import base64
 import json
 import sys
 from dotenv import load_dotenv
 from algosdk.v2client import algod
-from algosdk import transaction, account, mnemonic, logic
+from algosdk import account, mnemonic, logic
 from algosdk.transaction import ApplicationCreateTxn, OnComplete
 from algosdk.transaction import StateSchema
+from txn_params import ParamsCache
+from confirmations import ConfirmationService
+from ratelimit import throttle
+from teal_cache import compile_teal
 
 # Load environment variables from .env file
 load_dotenv()
@@ -32,7 +35,7 @@ def setup_client():
         # Use no-authentication (AlgoNode or other public endpoints)
         client = algod.AlgodClient("", ALGOD_ADDRESS)
 
-    return client
+    return throttle(client)
 
 def get_admin_account():
     """Get admin account from mnemonic"""
@@ -56,15 +59,14 @@ def compile_escrow_contract(client):
         teal_source = f.read()
 
     try:
-        response = client.compile(teal_source)
-        compiled_program = base64.b64decode(response['result'])
-        print("✅ Escrow contract compiled successfully")
-        return compiled_program
+        compiled = compile_teal(client, teal_source)
+        print("✅ Escrow contract compiled successfully" + (" (cached)" if compiled.cached else ""))
+        return compiled.program
     except Exception as e:
         print(f"❌ ERROR: Failed to compile escrow contract: {e}")
         sys.exit(1)
 
-def deploy_launchpad_app(client, admin_private_key, admin_address):
+def deploy_launchpad_app(client, admin_private_key, admin_address, params_cache=None):
     """Deploy the launchpad application"""
     app_path = os.path.join(os.path.dirname(__file__), "..", "contracts", "stateful", "launchpad_app.py")
 
@@ -83,7 +85,7 @@ def deploy_launchpad_app(client, admin_private_key, admin_address):
 
     txn = ApplicationCreateTxn(
         sender=admin_address,
-        sp=client.suggested_params(),
+        sp=(params_cache or ParamsCache(client)).get(),
         on_complete=OnComplete.NoOpOC,
         approval_program=approval_program,
         clear_program=clear_program,
@@ -96,7 +98,7 @@ def deploy_launchpad_app(client, admin_private_key, admin_address):
     print(f"📤 Application creation transaction sent: {tx_id}")
 
     # Wait for confirmation
-    confirmed_txn = transaction.wait_for_confirmation(client, tx_id, 4)
+    confirmed_txn = ConfirmationService(client).wait_for(tx_id, txn.last_valid_round)
     app_id = confirmed_txn["application-index"]
 
     print(f"✅ Launchpad application deployed successfully!")
@@ -171,6 +173,7 @@ def main():
 
     # Setup
     client = setup_client()
+    params_cache = ParamsCache(client)
     admin_private_key, admin_address = get_admin_account()
 
     print(f"👤 Admin Address: {admin_address}")
@@ -184,7 +187,7 @@ def main():
     lsig, escrow_address = create_escrow_lsig(compiled_program)
 
     # Deploy launchpad application
-    app_id = deploy_launchpad_app(client, admin_private_key, admin_address)
+    app_id = deploy_launchpad_app(client, admin_private_key, admin_address, params_cache)
 
     # Update configuration files
     update_config_files(app_id, escrow_address)
@@ -0,0 +1,517 @@
+"""
+Local deposit store for the backend.
+
+DepositSyncer follows the indexer in the background for a set of tracked
+escrows that can change at runtime. Every `interval` seconds each escrow is
+brought up to the tip with an address search. From FOLLOW_SCAN_MIN escrows
+up, one paged search for all payments above the lowest synced round is
+demultiplexed by receiver instead, so indexer cost stops growing with the
+number of escrows; a newly added escrow, or one far behind, still gets its
+own address search to catch up. Deposits are appended to SQLite (indexed by escrow/round and by
+sender). Request handlers never call the indexer; /deposits/latest is
+answered from an in-memory snapshot of each escrow's newest rows that is
+swapped in after each sync, so its latency does not depend on indexer health.
+
+History is read with keyset pagination on (round, intra): each page is one
+index range scan starting after the previous page's last row, so walking
+millions of deposits costs the same per page at any depth.
+
+Each sync pass doubles as a probe of the indexer: status() reports the tip,
+how far the slowest synced escrow lags it, the escrows still backfilling, the age of the last good pass and the
+failure rate over the recent passes, all from memory, so health checks never
+reach upstream.
+
+Rollups (running totals, per-sender totals, per-round-bucket volume) are
+updated in the same transaction that inserts new deposits, so stats() reads
+a handful of rows instead of aggregating history.
+"""
+from __future__ import annotations
+import asyncio, base64, logging, sqlite3, struct, threading, time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+LATEST_KEEP = 500           # rows kept in the in-memory snapshot (the endpoint's max limit)
+PAGE_LIMIT = 1000           # indexer page size
+MAX_PAGE = 1000             # rows per /deposits page
+DEFAULT_SYNC_INTERVAL = 4.0
+FOLLOW_MAX_GAP = 1000       # rounds behind the tip beyond which an escrow catches up on its own
+FOLLOW_SCAN_MIN = 8         # followed escrows from which one unfiltered search beats one address search each
+ROUND_BUCKET = 1000         # rounds per volume bucket (about an hour)
+PROBE_WINDOW = 20           # recent sync passes the reported error rate covers
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deposits (
+    txid        TEXT PRIMARY KEY,
+    escrow      TEXT    NOT NULL,
+    sender      TEXT    NOT NULL,
+    amount      INTEGER NOT NULL,
+    round       INTEGER NOT NULL,
+    round_time  INTEGER NOT NULL,
+    intra       INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deposits_escrow ON deposits (escrow, round, intra);
+CREATE INDEX IF NOT EXISTS deposits_sender ON deposits (sender, round, intra);
+CREATE INDEX IF NOT EXISTS deposits_time ON deposits (round_time);
+CREATE TABLE IF NOT EXISTS sync (
+    escrow  TEXT PRIMARY KEY,
+    round   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS escrows (
+    address  TEXT PRIMARY KEY,
+    added    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    escrow       TEXT PRIMARY KEY,
+    count        INTEGER NOT NULL,
+    total        INTEGER NOT NULL,
+    senders      INTEGER NOT NULL,
+    first_round  INTEGER NOT NULL,
+    last_round   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sender_stats (
+    escrow       TEXT    NOT NULL,
+    sender       TEXT    NOT NULL,
+    count        INTEGER NOT NULL,
+    total        INTEGER NOT NULL,
+    first_round  INTEGER NOT NULL,
+    last_round   INTEGER NOT NULL,
+    PRIMARY KEY (escrow, sender)
+);
+CREATE INDEX IF NOT EXISTS sender_stats_total ON sender_stats (escrow, total);
+CREATE TABLE IF NOT EXISTS bucket_stats (
+    escrow  TEXT    NOT NULL,
+    bucket  INTEGER NOT NULL,  -- round // ROUND_BUCKET
+    count   INTEGER NOT NULL,
+    total   INTEGER NOT NULL,
+    PRIMARY KEY (escrow, bucket)
+);
+"""
+
+_UPSERT_SENDER = """
+INSERT INTO sender_stats (escrow, sender, count, total, first_round, last_round) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (escrow, sender) DO UPDATE SET
+    count = count + excluded.count, total = total + excluded.total,
+    first_round = MIN(first_round, excluded.first_round), last_round = MAX(last_round, excluded.last_round)
+"""
+_UPSERT_BUCKET = """
+INSERT INTO bucket_stats (escrow, bucket, count, total) VALUES (?, ?, ?, ?)
+ON CONFLICT (escrow, bucket) DO UPDATE SET count = count + excluded.count, total = total + excluded.total
+"""
+_UPSERT_TOTALS = """
+INSERT INTO totals (escrow, count, total, senders, first_round, last_round) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (escrow) DO UPDATE SET
+    count = count + excluded.count, total = total + excluded.total, senders = senders + excluded.senders,
+    first_round = MIN(first_round, excluded.first_round), last_round = MAX(last_round, excluded.last_round)
+"""
+
+class DepositRow(NamedTuple):
+    txid: str
+    escrow: str
+    sender: str
+    amount: int      # microAlgos
+    round: int
+    round_time: int
+    intra: int       # offset within the round, orders deposits of the same round
+
+    def as_dict(self) -> Dict[str, object]:
+        return {"txid": self.txid, "sender": self.sender, "amount": self.amount, "round": self.round}
+
+def parse_deposit(tx: dict, escrow: str) -> Optional[DepositRow]:
+    """DepositRow for an indexer payment into `escrow`, else None."""
+    pay = tx.get("payment-transaction") or {}
+    if pay.get("receiver") != escrow:
+        return None
+    return DepositRow(tx.get("id"), escrow, tx.get("sender"), int(pay.get("amount", 0)),
+                      int(tx.get("confirmed-round") or 0), int(tx.get("round-time") or 0),
+                      int(tx.get("intra-round-offset") or 0))
+
+_CURSOR = struct.Struct(">QI")
+
+def encode_cursor(rnd: int, intra: int) -> str:
+    """Opaque page cursor for the position after (round, intra)."""
+    return base64.urlsafe_b64encode(_CURSOR.pack(rnd, intra)).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        return _CURSOR.unpack(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, struct.error):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+class DepositStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()  # per-thread read connections; WAL lets them run beside the writer
+        # written by the sync thread, read by request handlers
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        self._latest: Dict[str, tuple] = {}
+        self._synced: Dict[str, int] = dict(self._db.execute("SELECT escrow, round FROM sync"))
+        self._tracked: Tuple[str, ...] = tuple(r[0] for r in self._db.execute("SELECT address FROM escrows ORDER BY added"))
+        if self._db.execute("SELECT 1 FROM totals LIMIT 1").fetchone() is None and \
+                self._db.execute("SELECT 1 FROM deposits LIMIT 1").fetchone() is not None:
+            self.rebuild_stats()  # store created before rollups existed
+        for escrow in self._tracked:
+            self.refresh_latest(escrow)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, check_same_thread=False)
+        return db
+
+    @property
+    def escrows(self) -> Tuple[str, ...]:
+        """Tracked escrow addresses, in the order they were added."""
+        return self._tracked
+
+    def track(self, escrow: str) -> bool:
+        """Start tracking `escrow`; returns False if it already was."""
+        with self._lock:
+            cur = self._db.execute("INSERT OR IGNORE INTO escrows (address, added) VALUES (?, ?)", (escrow, time.time()))
+            self._db.commit()
+            if cur.rowcount:
+                self._tracked = self._tracked + (escrow,)
+        return bool(cur.rowcount)
+
+    def untrack(self, escrow: str) -> bool:
+        """Stop syncing `escrow`. Its deposits and sync round stay, so tracking it again resumes from there."""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM escrows WHERE address = ?", (escrow,))
+            self._db.commit()
+            self._tracked = tuple(e for e in self._tracked if e != escrow)
+        return bool(cur.rowcount)
+
+    def synced_round(self, escrow: str) -> int:
+        return self._synced.get(escrow, 0)
+
+    @property
+    def round(self) -> int:
+        """Highest synced round; answers derived from the store can be cached per value of this."""
+        return max(self._synced.values(), default=0)
+
+    def add(self, rows: Sequence[DepositRow]) -> List[DepositRow]:
+        """Insert deposits, ignoring ones already stored; returns the new ones."""
+        if not rows:
+            return []
+        with self._lock:
+            marks = ", ".join("?" for _ in rows)
+            known = {r[0] for r in self._db.execute(f"SELECT txid FROM deposits WHERE txid IN ({marks})", [r.txid for r in rows])}
+            fresh = list({r.txid: r for r in rows if r.txid not in known}.values())
+            self._db.executemany("INSERT OR IGNORE INTO deposits VALUES (?, ?, ?, ?, ?, ?, ?)", fresh)
+            self._roll_up(fresh)
+            self._db.commit()
+        return fresh
+
+    def _roll_up(self, rows: Sequence[DepositRow]) -> None:
+        """Fold new deposits into the rollup tables; caller holds the lock and commits."""
+        senders: Dict[Tuple[str, str], List[int]] = {}
+        buckets: Dict[Tuple[str, int], List[int]] = defaultdict(lambda: [0, 0])
+        for r in rows:
+            s = senders.get((r.escrow, r.sender))
+            if s is None:
+                senders[(r.escrow, r.sender)] = [1, r.amount, r.round, r.round]
+            else:
+                s[0] += 1
+                s[1] += r.amount
+                s[2] = min(s[2], r.round)
+                s[3] = max(s[3], r.round)
+            b = buckets[(r.escrow, r.round // ROUND_BUCKET)]
+            b[0] += 1
+            b[1] += r.amount
+        escrows = {escrow for escrow, _ in senders}
+        new_senders: Dict[str, int] = defaultdict(int)
+        for escrow, sender in senders:
+            if self._db.execute("SELECT 1 FROM sender_stats WHERE escrow = ? AND sender = ?", (escrow, sender)).fetchone() is None:
+                new_senders[escrow] += 1
+        self._db.executemany(_UPSERT_SENDER, [(e, snd, *v) for (e, snd), v in senders.items()])
+        self._db.executemany(_UPSERT_BUCKET, [(e, b, *v) for (e, b), v in buckets.items()])
+        for escrow in escrows:
+            mine = [r for r in rows if r.escrow == escrow]
+            self._db.execute(_UPSERT_TOTALS, (escrow, len(mine), sum(r.amount for r in mine), new_senders[escrow],
+                                              min(r.round for r in mine), max(r.round for r in mine)))
+
+    def rebuild_stats(self) -> None:
+        """Recompute every rollup from the deposits table."""
+        with self._lock:
+            for table in ("totals", "sender_stats", "bucket_stats"):
+                self._db.execute(f"DELETE FROM {table}")
+            self._db.execute("""INSERT INTO sender_stats SELECT escrow, sender, COUNT(*), SUM(amount), MIN(round), MAX(round)
+                                FROM deposits GROUP BY escrow, sender""")
+            self._db.execute("""INSERT INTO bucket_stats SELECT escrow, round / ?, COUNT(*), SUM(amount)
+                                FROM deposits GROUP BY escrow, round / ?""", (ROUND_BUCKET, ROUND_BUCKET))
+            self._db.execute("""INSERT INTO totals SELECT escrow, COUNT(*), SUM(amount), COUNT(DISTINCT sender), MIN(round), MAX(round)
+                                FROM deposits GROUP BY escrow""")
+            self._db.commit()
+
+    def stats(self, escrow: str, sender: Optional[str] = None, buckets: int = 24, top: int = 10) -> Dict[str, Any]:
+        """
+        Rollups for `escrow`: running totals, the `top` senders by amount, the
+        last `buckets` round buckets, and one sender's totals when `sender` is given.
+        """
+        db = self._reader()
+        db.execute("BEGIN")  # one snapshot across the rollup tables
+        try:
+            return self._stats(db, escrow, sender, buckets, top)
+        finally:
+            db.execute("END")
+
+    def _stats(self, db: sqlite3.Connection, escrow: str, sender: Optional[str], buckets: int, top: int) -> Dict[str, Any]:
+        row = db.execute("SELECT count, total, senders, first_round, last_round FROM totals WHERE escrow = ?", (escrow,)).fetchone()
+        count, total, n_senders, first, last = row or (0, 0, 0, None, None)
+        out: Dict[str, Any] = {"count": count, "total": total, "senders": n_senders, "first_round": first,
+                               "last_round": last, "synced_round": self.synced_round(escrow), "bucket_rounds": ROUND_BUCKET}
+        out["top_senders"] = [
+            {"sender": s, "count": c, "total": t, "first_round": f, "last_round": l}
+            for s, c, t, f, l in db.execute(
+                "SELECT sender, count, total, first_round, last_round FROM sender_stats WHERE escrow = ? ORDER BY total DESC LIMIT ?",
+                (escrow, top))]
+        out["buckets"] = [
+            {"first_round": b * ROUND_BUCKET, "count": c, "total": t}
+            for b, c, t in db.execute(
+                "SELECT bucket, count, total FROM bucket_stats WHERE escrow = ? ORDER BY bucket DESC LIMIT ?", (escrow, buckets))]
+        if sender is not None:
+            r = db.execute("SELECT count, total, first_round, last_round FROM sender_stats WHERE escrow = ? AND sender = ?",
+                           (escrow, sender)).fetchone()
+            out["sender"] = {"sender": sender, "count": r[0], "total": r[1], "first_round": r[2], "last_round": r[3]} if r else \
+                            {"sender": sender, "count": 0, "total": 0, "first_round": None, "last_round": None}
+        return out
+
+    def set_synced(self, escrow: str, rnd: int) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sync (escrow, round) VALUES (?, ?)", (escrow, rnd))
+            self._db.commit()
+            self._synced[escrow] = rnd
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM deposits").fetchone()[0]
+
+    def page(self, escrow: str, limit: int, after: Optional[Tuple[int, int]] = None, min_round: Optional[int] = None,
+             max_round: Optional[int] = None, start_time: Optional[int] = None, end_time: Optional[int] = None,
+             sender: Optional[str] = None, ascending: bool = False) -> Tuple[List[DepositRow], Optional[Tuple[int, int]]]:
+        """
+        One page of `escrow`'s deposits ordered by (round, intra), newest first unless `ascending`.
+
+        `after` is the (round, intra) key of the previous page's last row; returns
+        the rows and the key to continue from, or None on the last page.
+        """
+        db = self._reader()
+        # time bounds become round bounds through the round_time index, so the page itself is a round range scan;
+        # rounds and round times grow together, so one index seek finds the edge (ties resolved by equality lookup)
+        if start_time is not None:
+            r = db.execute("SELECT MIN(round) FROM deposits WHERE round_time = "
+                           "(SELECT round_time FROM deposits WHERE round_time >= ? ORDER BY round_time LIMIT 1)",
+                           (start_time,)).fetchone()[0]
+            if r is None:
+                return [], None
+            min_round = max(min_round or 0, r)
+        if end_time is not None:
+            r = db.execute("SELECT MAX(round) FROM deposits WHERE round_time = "
+                           "(SELECT round_time FROM deposits WHERE round_time <= ? ORDER BY round_time DESC LIMIT 1)",
+                           (end_time,)).fetchone()[0]
+            if r is None:
+                return [], None
+            max_round = r if max_round is None else min(max_round, r)
+        where, args = ["escrow = ?"], [escrow]
+        if sender is not None:
+            where.append("sender = ?")
+            args.append(sender)
+        if min_round is not None:
+            where.append("round >= ?")
+            args.append(min_round)
+        if max_round is not None:
+            where.append("round <= ?")
+            args.append(max_round)
+        if after is not None:
+            where.append("(round, intra) > (?, ?)" if ascending else "(round, intra) < (?, ?)")
+            args.extend(after)
+        order = "ASC" if ascending else "DESC"
+        sql = f"SELECT * FROM deposits WHERE {' AND '.join(where)} ORDER BY round {order}, intra {order} LIMIT ?"
+        rows = [DepositRow(*r) for r in db.execute(sql, (*args, limit + 1))]
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1].round, rows[-1].intra)
+
+    def latest(self, escrow: str, limit: int) -> List[Dict[str, object]]:
+        """Newest deposits first; served from memory, never blocks on the writer."""
+        return list(self._latest.get(escrow, ())[:limit])
+
+    def refresh_latest(self, escrow: str) -> None:
+        with self._lock:
+            cur = self._db.execute("SELECT * FROM deposits WHERE escrow = ? ORDER BY round DESC, intra DESC LIMIT ?",
+                                   (escrow, LATEST_KEEP))
+            rows = [DepositRow(*r).as_dict() for r in cur]
+        self._latest[escrow] = tuple(rows)  # single reference swap; readers see old or new, never partial
+
+class DepositSyncer:
+    """
+    Keeps a DepositStore up to date with the tracked escrows' payments from the indexer.
+
+    Runs as a task on the server's event loop; `client` is an
+    async_indexer.AsyncIndexerClient (or anything with the same awaitable
+    search_transactions and health). Store writes go to a worker thread so a
+    large catch-up never stalls request handling. Newly stored deposits are
+    passed to `hub.publish` (see deposit_stream.DepositHub) in chain order.
+    """
+
+    def __init__(self, client, store: DepositStore, escrows: Sequence[str] = (), interval: float = DEFAULT_SYNC_INTERVAL,
+                 hub=None, max_gap: int = FOLLOW_MAX_GAP, scan_min: int = FOLLOW_SCAN_MIN):
+        self.client = client
+        self.store = store
+        self.interval = interval
+        self.hub = hub
+        self.max_gap = max_gap
+        self.scan_min = scan_min
+        self.tip: Optional[int] = None
+        self.last_sync: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._outcomes: "deque[bool]" = deque(maxlen=PROBE_WINDOW)  # True for a failed pass
+        self._task: Optional[asyncio.Task] = None
+        for escrow in escrows:
+            store.track(escrow)
+
+    def start(self) -> "DepositSyncer":
+        """Start following the indexer; must be called from a running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop(), name="deposit-sync")
+        return self
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Sync state for health checks; reads memory only.
+
+        Escrows still in their initial backfill (never synced, e.g. just added
+        through the API) are listed under "backfilling" and left out of
+        synced_round and lag_rounds, so adding one does not read as lag.
+        """
+        synced = {e: self.store.synced_round(e) for e in self.store.escrows}
+        backfilling = sorted(e for e, rnd in synced.items() if rnd == 0)
+        lowest = min((rnd for rnd in synced.values() if rnd), default=None)
+        return {
+            "running": self.running,
+            "tip": self.tip,
+            "synced_round": lowest,
+            "lag_rounds": max(self.tip - lowest, 0) if self.tip is not None and lowest is not None else None,
+            "backfilling": backfilling,
+            "last_sync_age": round(time.time() - self.last_sync, 3) if self.last_sync is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "probes": len(self._outcomes),
+            "last_error": self.last_error,
+        }
+
+    async def sync_once(self) -> int:
+        """One pass over every tracked escrow; returns how many deposits were new."""
+        escrows = self.store.escrows
+        if not escrows:
+            return 0
+        health = await self.client.health()
+        self.tip = tip = int(health.get("round") or 0)
+        synced = {e: self.store.synced_round(e) for e in escrows}
+        behind = [e for e in escrows if synced[e] == 0 or tip - synced[e] > self.max_gap]
+        following = [e for e in escrows if e not in behind]
+        new: List[DepositRow] = []
+        for escrow in behind:
+            new += await self._catch_up(escrow)
+        if len(following) >= self.scan_min:
+            new += await self._follow(following, synced, tip)
+        else:
+            # an unfiltered search pulls every payment on chain; with few escrows, ask by address
+            for escrow in following:
+                new += await self._catch_up(escrow, tip)
+        if new and self.hub is not None:
+            self.hub.publish(sorted(new, key=lambda r: (r.round, r.intra)))
+        self.last_sync = time.time()
+        return len(new)
+
+    async def _pages(self, **params):
+        """Yield (current round, transactions) for each page of a search."""
+        token: Optional[str] = None
+        while True:
+            resp = await self.client.search_transactions(txn_type="pay", limit=PAGE_LIMIT, next_page=token, **params)
+            txns = resp.get("transactions", [])
+            yield int(resp.get("current-round") or 0), txns
+            token = resp.get("next-token")
+            # indexers may cap pages below PAGE_LIMIT, so a short page is not the last one
+            if not token or not txns:
+                return
+
+    async def _catch_up(self, escrow: str, tip: Optional[int] = None) -> List[DepositRow]:
+        """Address search for one escrow from its synced round to `tip` (the indexer's current round if None)."""
+        since = self.store.synced_round(escrow)
+        if tip is not None and since >= tip:
+            return []
+        target: Optional[int] = tip
+        new: List[DepositRow] = []
+        bounds = {"min_round": since + 1} if tip is None else {"min_round": since + 1, "max_round": tip}
+        async for current, txns in self._pages(address=escrow, address_role="receiver", **bounds):
+            if target is None:
+                # later pages may reach past this round; those rows are simply inserted again next time
+                target = current or since
+            rows = [d for d in (parse_deposit(tx, escrow) for tx in txns) if d is not None]
+            new += await asyncio.to_thread(self.store.add, rows)
+        await self._commit(escrow, new, max(target or since, since))
+        return new
+
+    async def _follow(self, escrows: Sequence[str], synced: Dict[str, int], tip: int) -> List[DepositRow]:
+        """One search for all payments above the lowest synced round, split by receiver (for scan_min+ escrows)."""
+        start = min(synced[e] for e in escrows) + 1
+        if start > tip:
+            return []
+        wanted = set(escrows)
+        new: List[DepositRow] = []
+        async for _, txns in self._pages(min_round=start, max_round=tip):
+            rows = []
+            for tx in txns:
+                receiver = (tx.get("payment-transaction") or {}).get("receiver")
+                if receiver in wanted and int(tx.get("confirmed-round") or 0) > synced[receiver]:
+                    rows.append(parse_deposit(tx, receiver))
+            new += await asyncio.to_thread(self.store.add, rows)
+        for escrow in escrows:
+            await self._commit(escrow, [r for r in new if r.escrow == escrow], tip)
+        return new
+
+    async def _commit(self, escrow: str, new: List[DepositRow], rnd: int) -> None:
+        if new:
+            await asyncio.to_thread(self.store.refresh_latest, escrow)
+            logging.info("Synced %d new deposit(s) for %s up to round %d", len(new), escrow, rnd)
+        # bump the round last: anything cached for the new round must see the new rows
+        await asyncio.to_thread(self.store.set_synced, escrow, rnd)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.sync_once()
+                self.last_error = None
+                self._outcomes.append(False)
+            except Exception as e:
+                # keep serving the stored deposits; the client already retried transient errors
+                self.last_error = str(e)
+                self._outcomes.append(True)
+                logging.warning("Deposit sync failed, serving stored deposits: %s", e)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,92 @@
+"""
+Push delivery of new deposits to many subscribers from one sync follower.
+
+The DepositSyncer publishes each batch of newly stored deposits to a
+DepositHub, which copies it into every subscriber's bounded queue; the
+indexer is polled once no matter how many clients are listening. A client
+that falls too far behind is dropped rather than buffered without limit; it
+reconnects with its last event id and catches up from the store.
+
+sse_events() renders one subscriber's stream as Server-Sent Events, first
+replaying stored deposits after the resume point and then following the hub.
+Event ids are deposit cursors, so a reconnecting EventSource resumes exactly
+where it stopped.
+"""
+from __future__ import annotations
+import asyncio, json
+from typing import AsyncIterator, Optional, Sequence, Set, Tuple
+from deposit_store import DepositRow, DepositStore, encode_cursor
+
+SUBSCRIBER_QUEUE = 1000     # pending deposits per subscriber before it is dropped
+KEEPALIVE_SECONDS = 15.0
+REPLAY_PAGE = 500
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.queue: "asyncio.Queue[DepositRow]" = asyncio.Queue(maxsize)
+        self.dropped = False
+
+class DepositHub:
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self.published = 0
+        self._subs: Set[Subscription] = set()
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self.queue_size)
+        self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subs.discard(sub)
+
+    def publish(self, rows: Sequence[DepositRow]) -> None:
+        """Hand `rows` (in chain order) to every subscriber; must run on the event loop."""
+        self.published += len(rows)
+        for sub in list(self._subs):
+            try:
+                for row in rows:
+                    sub.queue.put_nowait(row)
+            except asyncio.QueueFull:
+                sub.dropped = True
+                self._subs.discard(sub)  # the reader notices `dropped` once it drains its queue
+
+def _event(row: DepositRow) -> str:
+    return f"id: {encode_cursor(row.round, row.intra)}\nevent: deposit\ndata: {json.dumps(row.as_dict(), separators=(',', ':'))}\n\n"
+
+async def sse_events(hub: DepositHub, store: DepositStore, escrow: str, after: Optional[Tuple[int, int]] = None,
+                     keepalive: float = KEEPALIVE_SECONDS) -> AsyncIterator[str]:
+    """
+    SSE stream of `escrow`'s deposits after the (round, intra) key `after`.
+
+    With after=None only deposits synced from now on are sent. Subscribing happens
+    before the replay, so nothing synced meanwhile is lost; overlap is skipped by key.
+    """
+    sub = hub.subscribe()
+    last = after
+    try:
+        if after is not None:
+            while True:
+                rows, nxt = await asyncio.to_thread(store.page, escrow, REPLAY_PAGE, after=last, ascending=True)
+                for row in rows:
+                    yield _event(row)
+                    last = (row.round, row.intra)
+                if nxt is None:
+                    break
+        while True:
+            if sub.dropped and sub.queue.empty():
+                return  # too slow; the client reconnects with Last-Event-ID
+            try:
+                row = await asyncio.wait_for(sub.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if row.escrow != escrow or (last is not None and (row.round, row.intra) <= last):
+                continue
+            last = (row.round, row.intra)
+            yield _event(row)
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,243 @@
+"""
+Offline evaluator for the escrow logic signature (contracts/escrow/escrow.teal).
+
+EscrowProgram parses the TEAL once into Python closures. It covers the opcode
+subset the escrow uses: txn, global, int, addr, comparisons, &&, ||, !,
+pop, assert, err and return. check() then runs a candidate spend in-process, with
+no algod dryrun and no submit, fast enough to pre-filter thousands of
+withdrawals a second.
+
+A rejected candidate is run a second time with tracing. The Verdict then
+names the conditions that were false, e.g.
+"line 19: txn Receiver == addr TZX4...". Inside an && only the false parts
+are named; an || is reported whole, since none of its alternatives held.
+
+Addresses are compared in their checksummed string form; unset address
+fields (no RekeyTo, no CloseRemainderTo) read as the zero address, as on
+chain.
+"""
+from __future__ import annotations
+import os
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from algosdk import encoding
+
+ESCROW_TEAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "contracts", "escrow", "escrow.teal")
+ZERO_ADDRESS = encoding.encode_address(bytes(32))
+MIN_TXN_FEE = 1000
+
+TYPE_ENUM = {"unknown": 0, "pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4, "afrz": 5, "appl": 6}
+_ADDRESS_FIELDS = ("Sender", "Receiver", "CloseRemainderTo", "RekeyTo", "AssetReceiver", "AssetCloseTo", "AssetSender")
+
+class UnsupportedProgram(ValueError):
+    """The TEAL uses an opcode or field outside the evaluated subset."""
+
+class EvalError(Exception):
+    """The program itself fails (stack underflow, type mismatch, err); on chain this rejects too."""
+
+class Verdict(NamedTuple):
+    approved: bool
+    failed: Tuple[str, ...] = ()     # false conditions, outermost first
+    error: Optional[str] = None      # set when evaluation itself failed
+
+    def __bool__(self) -> bool:
+        return self.approved
+
+def fields_of(txn: Any, group_index: int = 0) -> Dict[str, Any]:
+    """TEAL `txn` fields of an algosdk Transaction (or a dict already keyed by field name)."""
+    if isinstance(txn, dict):
+        fields = dict(txn)
+    else:
+        kind = getattr(txn, "type", "unknown")
+        fields = {
+            "TypeEnum": TYPE_ENUM.get(kind, 0), "Sender": txn.sender, "Fee": txn.fee,
+            "FirstValid": txn.first_valid_round, "LastValid": txn.last_valid_round,
+            "RekeyTo": getattr(txn, "rekey_to", None), "Receiver": getattr(txn, "receiver", None),
+            "Amount": getattr(txn, "amt", 0) if kind == "pay" else 0,
+            "CloseRemainderTo": getattr(txn, "close_remainder_to", None),
+            "XferAsset": getattr(txn, "index", 0) if kind == "axfer" else 0,
+            "AssetAmount": getattr(txn, "amount", 0) if kind == "axfer" else 0,
+            "AssetReceiver": getattr(txn, "receiver", None) if kind == "axfer" else None,
+            "AssetCloseTo": getattr(txn, "close_assets_to", None),
+            "AssetSender": getattr(txn, "revocation_target", None),
+        }
+        if kind == "axfer":
+            fields["Receiver"] = None
+    fields.setdefault("GroupIndex", group_index)
+    for name in _ADDRESS_FIELDS:
+        if not fields.get(name):
+            fields[name] = ZERO_ADDRESS
+    return fields
+
+class _Node(NamedTuple):
+    """A traced stack value: what it is and how it was computed."""
+    value: Any
+    text: str
+    op: str = ""
+    parts: Tuple["_Node", ...] = ()
+
+_COMPARE: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": lambda a, b: a == b, "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b, ">": lambda a, b: a > b, "<=": lambda a, b: a <= b, ">=": lambda a, b: a >= b,
+}
+_ORDERED = ("<", ">", "<=", ">=")
+
+class EscrowProgram:
+    def __init__(self, source: str, name: str = "escrow.teal"):
+        self.name = name
+        self.ops: List[Tuple[int, str, Optional[str]]] = []  # (line, opcode, immediate)
+        for lineno, raw in enumerate(source.splitlines(), 1):
+            line = raw.split("//", 1)[0].strip()
+            if not line or line.startswith("#pragma"):
+                continue
+            parts = line.split()
+            if len(parts) > 2:
+                raise UnsupportedProgram(f"{name}:{lineno}: unexpected immediates in {line!r}")
+            self.ops.append((lineno, parts[0], parts[1] if len(parts) > 1 else None))
+        self._steps = [self._compile(*op) for op in self.ops]
+
+    @classmethod
+    def from_file(cls, path: str = ESCROW_TEAL) -> "EscrowProgram":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read(), name=os.path.basename(path))
+
+    def _const(self, line: int, op: str, arg: Optional[str]) -> Callable[[Dict[str, Any], Dict[str, Any]], Any]:
+        """Value getter for a push opcode, given (txn fields, globals)."""
+        if arg is None:
+            raise UnsupportedProgram(f"{self.name}:{line}: {op} needs an argument")
+        if op == "txn":
+            return lambda f, g: f[arg]
+        if op == "global":
+            return lambda f, g: g[arg]
+        if op == "int":
+            value = TYPE_ENUM[arg] if arg in TYPE_ENUM else int(arg, 0)
+            return lambda f, g: value
+        if op == "addr":
+            if not encoding.is_valid_address(arg):
+                raise UnsupportedProgram(f"{self.name}:{line}: invalid address {arg}")
+            return lambda f, g: arg
+        raise UnsupportedProgram(f"{self.name}:{line}: unsupported opcode {op!r}")
+
+    def _compile(self, line: int, op: str, arg: Optional[str]):
+        if op in ("txn", "global", "int", "addr"):
+            return ("push", self._const(line, op, arg))
+        if op in _COMPARE or op in ("&&", "||", "!", "pop", "assert", "return", "err"):
+            return (op, None)
+        raise UnsupportedProgram(f"{self.name}:{line}: unsupported opcode {op!r}")
+
+    def _globals(self, group_size: int) -> Dict[str, Any]:
+        return {"ZeroAddress": ZERO_ADDRESS, "GroupSize": group_size, "MinTxnFee": MIN_TXN_FEE}
+
+    def check(self, txn: Any, group_index: int = 0, group_size: int = 1) -> Verdict:
+        """Would the escrow approve `txn` at `group_index` of a group of `group_size`?"""
+        fields = fields_of(txn, group_index)
+        glob = self._globals(group_size)
+        try:
+            if self._run(fields, glob):
+                return Verdict(True)
+        except (EvalError, IndexError, KeyError, TypeError):
+            pass  # re-run with tracing for the message
+        return self._explain(fields, glob)
+
+    def check_many(self, txns: Iterable[Any], group_size: int = 1) -> List[Verdict]:
+        return [self.check(t, group_size=group_size) for t in txns]
+
+    def _run(self, fields: Dict[str, Any], glob: Dict[str, Any]) -> bool:
+        stack: List[Any] = []
+        pop = stack.pop
+        for kind, get in self._steps:
+            if kind == "push":
+                stack.append(get(fields, glob))
+            elif kind == "&&" or kind == "||":
+                b = pop(); a = pop()
+                if a.__class__ is not int or b.__class__ is not int:
+                    raise EvalError(kind)
+                stack.append(1 if (a and b if kind == "&&" else a or b) else 0)
+            elif kind in _COMPARE:
+                b = pop(); a = pop()
+                if a.__class__ is not b.__class__ or (kind in _ORDERED and a.__class__ is not int):
+                    raise EvalError(kind)
+                stack.append(1 if _COMPARE[kind](a, b) else 0)
+            elif kind == "err":
+                return False
+            elif kind == "pop":
+                pop()
+            else:
+                a = pop()
+                if a.__class__ is not int:
+                    raise EvalError(kind)
+                if kind == "!":
+                    stack.append(0 if a else 1)
+                elif kind == "assert":
+                    if not a:
+                        return False
+                elif kind == "return":
+                    return a != 0
+        return len(stack) == 1 and isinstance(stack[0], int) and stack[0] != 0
+
+    def _explain(self, fields: Dict[str, Any], glob: Dict[str, Any]) -> Verdict:
+        stack: List[_Node] = []
+
+        def pop(line: int, op: str) -> _Node:
+            if not stack:
+                raise EvalError(f"line {line}: stack underflow at {op}")
+            return stack.pop()
+
+        def need_int(node: _Node, line: int, op: str) -> None:
+            if not isinstance(node.value, int):
+                raise EvalError(f"line {line}: {op} expects an int, got {node.text}")
+
+        try:
+            for (line, op, arg), (kind, get) in zip(self.ops, self._steps):
+                if kind == "push":
+                    try:
+                        value = get(fields, glob)
+                    except KeyError:
+                        raise EvalError(f"line {line}: field {arg} is not available to the evaluator")
+                    stack.append(_Node(value, f"{op} {arg}"))
+                elif kind in ("&&", "||"):
+                    b = pop(line, op); a = pop(line, op)
+                    need_int(a, line, op); need_int(b, line, op)
+                    value = 1 if (a.value and b.value if kind == "&&" else a.value or b.value) else 0
+                    stack.append(_Node(value, f"({a.text}) {op} ({b.text})", op, (a, b)))
+                elif kind in _COMPARE:
+                    b = pop(line, op); a = pop(line, op)
+                    if type(a.value) is not type(b.value) or (kind in _ORDERED and not isinstance(a.value, int)):
+                        raise EvalError(f"line {line}: {op} type mismatch between {a.text} and {b.text}")
+                    stack.append(_Node(1 if _COMPARE[kind](a.value, b.value) else 0, f"line {line}: {a.text} {op} {b.text}"))
+                elif kind == "pop":
+                    pop(line, op)
+                elif kind == "!":
+                    a = pop(line, op)
+                    need_int(a, line, op)
+                    stack.append(_Node(0 if a.value else 1, f"!({a.text})"))
+                elif kind == "assert":
+                    a = pop(line, op)
+                    need_int(a, line, op)
+                    if not a.value:
+                        return Verdict(False, tuple(_false_parts(a)) + (f"line {line}: assert",))
+                elif kind == "return":
+                    a = pop(line, op)
+                    need_int(a, line, op)
+                    return Verdict(bool(a.value), () if a.value else tuple(_false_parts(a)))
+                else:
+                    return Verdict(False, (f"line {line}: err",))
+            if len(stack) != 1:
+                raise EvalError(f"program ends with {len(stack)} values on the stack (needs exactly 1)")
+            top = stack[0]
+            need_int(top, self.ops[-1][0], "end of program")
+            return Verdict(bool(top.value), () if top.value else tuple(_false_parts(top)))
+        except EvalError as e:
+            return Verdict(False, (), str(e))
+
+def _false_parts(node: _Node) -> Iterable[str]:
+    if node.value:
+        return
+    if node.op == "&&":
+        for part in node.parts:
+            yield from _false_parts(part)
+    else:
+        yield node.text
+
+def check_withdrawals(txns: Sequence[Any], path: str = ESCROW_TEAL) -> List[Verdict]:
+    """Verdicts for candidate single-transaction withdrawals against the escrow program at `path`."""
+    return EscrowProgram.from_file(path).check_many(txns)
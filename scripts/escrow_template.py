@@ -0,0 +1,201 @@
+"""
+Templated escrow logic signatures, assembled locally.
+
+contracts/escrow/escrow.teal.tmpl is the escrow program with these
+placeholders:
+ - ${admin}: the address the escrow may close to (it is also always an
+   allowed receiver)
+ - ${receiver_checks}: the allowed receivers
+ - ${pragma}: the TEAL version
+ - ${salt}: optional per-sale salt
+
+render_escrow() fills them in. Every sale can get its own escrow (its own
+address), even with the same admin and receivers, because the salt pushes
+and pops a sale number.
+
+assemble() turns the escrow's opcode subset into bytecode without algod, so
+derive_escrows() can provision hundreds of escrows in one pass with no
+compile request. Note that the resulting address is the hash of the bytes
+*we* assemble. algod's assembler lays constants out differently, so the same
+source compiled by a node gets a different address. Sign with the program
+bytes this module returns, which is why the CLI writes them next to each
+address.
+
+Usage:
+ python scripts/escrow_template.py --admin ADMIN_ADDR --receiver PAYOUT_ADDR --sales 1-300 --out escrows.json
+ python scripts/escrow_template.py --admin ADMIN_ADDR --render > contracts/escrow/escrow.teal
+"""
+from __future__ import annotations
+import argparse, base64, json, os, sys
+from string import Template
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from algosdk import encoding, logic
+from escrow_eval import TYPE_ENUM, UnsupportedProgram
+
+ESCROW_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "contracts", "escrow", "escrow.teal.tmpl")
+DEFAULT_PRAGMA = 5
+MIN_PRAGMA, MAX_PRAGMA = 2, 8     # RekeyTo needs v2
+
+# opcode bytes (TEAL spec); the escrow only needs this subset
+_SIMPLE_OPS: Dict[str, Tuple[int, int]] = {   # name -> (opcode, min version)
+    "err": (0x00, 1), "<": (0x0C, 1), ">": (0x0D, 1), "<=": (0x0E, 1), ">=": (0x0F, 1),
+    "&&": (0x10, 1), "||": (0x11, 1), "==": (0x12, 1), "!=": (0x13, 1), "!": (0x14, 1),
+    "return": (0x43, 2), "assert": (0x44, 3), "pop": (0x48, 1),
+}
+INTCBLOCK, INTC, INTC_0 = 0x20, 0x21, 0x22
+BYTECBLOCK, BYTEC, BYTEC_0 = 0x26, 0x27, 0x28
+TXN, GLOBAL = 0x31, 0x32
+TXN_FIELDS = {name: i for i, name in enumerate((
+    "Sender", "Fee", "FirstValid", "FirstValidTime", "LastValid", "Note", "Lease", "Receiver", "Amount",
+    "CloseRemainderTo", "VotePK", "SelectionPK", "VoteFirst", "VoteLast", "VoteKeyDilution", "Type", "TypeEnum",
+    "XferAsset", "AssetAmount", "AssetSender", "AssetReceiver", "AssetCloseTo", "GroupIndex", "TxID",
+    "ApplicationID", "OnCompletion", "ApplicationArgs", "NumAppArgs", "Accounts", "NumAccounts",
+    "ApprovalProgram", "ClearStateProgram", "RekeyTo"))}
+GLOBAL_FIELDS = {"MinTxnFee": 0, "MinBalance": 1, "MaxTxnLife": 2, "ZeroAddress": 3, "GroupSize": 4}
+
+class Escrow(NamedTuple):
+    address: str
+    program: bytes
+    source: str
+    sale: Optional[int] = None
+
+    @property
+    def b64(self) -> str:
+        return base64.b64encode(self.program).decode()
+
+def _uvarint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _load_template(path: str = ESCROW_TEMPLATE) -> Template:
+    with open(path, "r", encoding="utf-8") as f:
+        return Template(f.read())
+
+def render_escrow(admin: str, receivers: Sequence[str] = (), pragma: int = DEFAULT_PRAGMA, sale: Optional[int] = None,
+                  template: Optional[Template] = None) -> str:
+    """TEAL source of an escrow paying only to `admin` and `receivers`, closable only to `admin`."""
+    allowed = list(dict.fromkeys([admin, *receivers]))
+    for addr in allowed:
+        if not encoding.is_valid_address(addr):
+            raise ValueError(f"Invalid Algorand address: {addr}")
+    if not MIN_PRAGMA <= pragma <= MAX_PRAGMA:
+        raise ValueError(f"Unsupported pragma version {pragma} (must be {MIN_PRAGMA}..{MAX_PRAGMA})")
+    checks = []
+    for i, addr in enumerate(allowed):
+        checks += ["txn Receiver", f"addr {addr}", "=="] + (["||"] if i else [])
+    salt = f"// Sale {sale}: gives this escrow an address of its own\nint {sale}\npop" if sale is not None else ""
+    return (template or _load_template()).substitute(pragma=pragma, admin=admin, receiver_checks="\n".join(checks), salt=salt)
+
+def assemble(source: str) -> bytes:
+    """Bytecode for a program in the escrow's opcode subset (int/addr constants go in cblocks)."""
+    version: Optional[int] = None
+    ops: List[Tuple[int, str, Optional[str]]] = []
+    for lineno, raw in enumerate(source.splitlines(), 1):
+        line = raw.split("//", 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        if parts[0] == "#pragma":
+            if len(parts) != 3 or parts[1] != "version" or not parts[2].isdigit():
+                raise UnsupportedProgram(f"line {lineno}: bad pragma {line!r}")
+            version = int(parts[2])
+            continue
+        if len(parts) > 2:
+            raise UnsupportedProgram(f"line {lineno}: unexpected immediates in {line!r}")
+        ops.append((lineno, parts[0], parts[1] if len(parts) > 1 else None))
+    if version is None or not MIN_PRAGMA <= version <= MAX_PRAGMA:
+        raise UnsupportedProgram(f"a #pragma version between {MIN_PRAGMA} and {MAX_PRAGMA} is required")
+
+    ints: Dict[int, int] = {}
+    addrs: Dict[bytes, int] = {}
+    for lineno, op, arg in ops:
+        if op == "int":
+            try:
+                value = TYPE_ENUM[arg] if arg in TYPE_ENUM else int(arg or "", 0)
+            except ValueError:
+                raise UnsupportedProgram(f"line {lineno}: bad int {arg!r}")
+            ints.setdefault(value, len(ints))
+        elif op == "addr":
+            if not arg or not encoding.is_valid_address(arg):
+                raise UnsupportedProgram(f"line {lineno}: invalid address {arg!r}")
+            addrs.setdefault(encoding.decode_address(arg), len(addrs))
+
+    out = bytearray(_uvarint(version))
+    if ints:
+        out += bytes([INTCBLOCK]) + _uvarint(len(ints)) + b"".join(_uvarint(v) for v in ints)
+    if addrs:
+        out += bytes([BYTECBLOCK]) + _uvarint(len(addrs)) + b"".join(_uvarint(len(a)) + a for a in addrs)
+    for lineno, op, arg in ops:
+        if op == "int":
+            i = ints[TYPE_ENUM[arg] if arg in TYPE_ENUM else int(arg, 0)]
+            out += bytes([INTC_0 + i]) if i < 4 else bytes([INTC, i])
+        elif op == "addr":
+            i = addrs[encoding.decode_address(arg)]
+            out += bytes([BYTEC_0 + i]) if i < 4 else bytes([BYTEC, i])
+        elif op in ("txn", "global"):
+            fields = TXN_FIELDS if op == "txn" else GLOBAL_FIELDS
+            if arg not in fields:
+                raise UnsupportedProgram(f"line {lineno}: unknown {op} field {arg!r}")
+            out += bytes([TXN if op == "txn" else GLOBAL, fields[arg]])
+        elif op in _SIMPLE_OPS:
+            code, since = _SIMPLE_OPS[op]
+            if version < since:
+                raise UnsupportedProgram(f"line {lineno}: {op} needs #pragma version {since}")
+            out.append(code)
+        else:
+            raise UnsupportedProgram(f"line {lineno}: unsupported opcode {op!r}")
+    if len(ints) > 255 or len(addrs) > 255:
+        raise UnsupportedProgram("too many distinct constants")
+    return bytes(out)
+
+def build_escrow(admin: str, receivers: Sequence[str] = (), pragma: int = DEFAULT_PRAGMA, sale: Optional[int] = None,
+                 template: Optional[Template] = None) -> Escrow:
+    source = render_escrow(admin, receivers, pragma, sale, template)
+    program = assemble(source)
+    return Escrow(logic.address(program), program, source, sale)
+
+def derive_escrows(admin: str, sales: Iterable[int], receivers: Sequence[str] = (), pragma: int = DEFAULT_PRAGMA) -> List[Escrow]:
+    """One escrow per sale number, all rendered and assembled locally in a single pass."""
+    template = _load_template()
+    return [build_escrow(admin, receivers, pragma, sale, template) for sale in sales]
+
+def parse_sales(spec: str) -> List[int]:
+    """"1-3,7" -> [1, 2, 3, 7]."""
+    sales: List[int] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        lo, _, hi = part.partition("-")
+        sales += range(int(lo), int(hi or lo) + 1)
+    return sales
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Render escrow TEAL from the template and derive lsig addresses locally")
+    p.add_argument("--admin", required=True, help="Admin address (allowed receiver and only close-to target)")
+    p.add_argument("--receiver", action="append", default=[], help="Additional allowed receiver (repeatable)")
+    p.add_argument("--pragma", type=int, default=DEFAULT_PRAGMA, help="TEAL version to emit")
+    p.add_argument("--sales", default=None, help='Sale numbers to derive escrows for, e.g. "1-300"')
+    p.add_argument("--render", action="store_true", help="Print the TEAL source (of the unsalted escrow) and exit")
+    p.add_argument("--out", default=None, help="Write derived escrows as JSON here (default: stdout)")
+    args = p.parse_args()
+    try:
+        if args.render:
+            print(render_escrow(args.admin, args.receiver, args.pragma), end="")
+            sys.exit(0)
+        escrows = (derive_escrows(args.admin, parse_sales(args.sales), args.receiver, args.pragma) if args.sales
+                   else [build_escrow(args.admin, args.receiver, args.pragma)])
+    except (ValueError, UnsupportedProgram) as e:
+        print("ERROR:", e, file=sys.stderr)
+        sys.exit(1)
+    body = json.dumps([{"sale": e.sale, "address": e.address, "program": e.b64} for e in escrows], indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(body + "\n")
+        print(f"Derived {len(escrows)} escrow address(es) into {args.out}")
+    else:
+        print(body)
@@ -0,0 +1,108 @@
+"""
+Signers for accounts other than the admin, e.g. custodial or sub-accounts
+whose keys we hold.
+
+A key provider answers has(address) and signs with sign(txn), which returns a
+SignedTransaction for txn.sender. The airdrop uses one to sign the opt-ins it
+bundles in front of transfers to recipients that have not opted in yet.
+
+load_key_provider(spec) picks one from a command-line spec:
+ - "kmd:WALLET": keys in a kmd wallet (env KMD_ADDRESS, KMD_TOKEN,
+   KMD_WALLET_PASSWORD)
+ - "module:factory": factory() from an importable module, for an HSM or a
+   remote signer; it must return a KeyProvider subclass, which cannot even
+   be instantiated without addresses() and sign()
+ - anything else: a file of mnemonics, one per line (# comments allowed), or
+   a JSON list of mnemonics or {address: mnemonic} object
+"""
+from __future__ import annotations
+import importlib, json, os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List
+from algosdk import account, mnemonic
+
+class KeyProvider(ABC):
+    """Interface: the addresses a provider can sign for, and signing for them."""
+
+    @abstractmethod
+    def addresses(self) -> List[str]:
+        ...
+
+    def has(self, address: str) -> bool:
+        return address in set(self.addresses())
+
+    @abstractmethod
+    def sign(self, txn):
+        ...
+
+class MnemonicKeyProvider(KeyProvider):
+    def __init__(self, keys: Dict[str, str]):
+        self._keys = dict(keys)  # address -> private key
+
+    @classmethod
+    def from_mnemonics(cls, phrases: Iterable[str]) -> "MnemonicKeyProvider":
+        keys = {}
+        for phrase in phrases:
+            sk = mnemonic.to_private_key(phrase)
+            keys[account.address_from_private_key(sk)] = sk
+        return cls(keys)
+
+    @classmethod
+    def from_file(cls, path: str) -> "MnemonicKeyProvider":
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        if text.lstrip().startswith(("[", "{")):
+            data = json.loads(text)
+            provider = cls.from_mnemonics(data.values() if isinstance(data, dict) else data)
+            if isinstance(data, dict) and set(data) != set(provider._keys):
+                raise ValueError(f"{path}: some addresses do not match their mnemonics")
+            return provider
+        lines = (line.split("#", 1)[0].strip() for line in text.splitlines())
+        return cls.from_mnemonics(line for line in lines if line)
+
+    def addresses(self) -> List[str]:
+        return list(self._keys)
+
+    def has(self, address: str) -> bool:
+        return address in self._keys
+
+    def sign(self, txn):
+        return txn.sign(self._keys[txn.sender])
+
+class KmdKeyProvider(KeyProvider):
+    """Keys held in a kmd wallet; the wallet handle is opened once and renewed on use."""
+
+    def __init__(self, kcl, wallet: str, password: str):
+        wallets = [w for w in kcl.list_wallets() if w.get("name") == wallet]
+        if not wallets:
+            raise ValueError(f"kmd wallet not found: {wallet}")
+        self.kcl = kcl
+        self.password = password
+        self.handle = kcl.init_wallet_handle(wallets[0]["id"], password)
+        self._addresses = set(kcl.list_keys(self.handle))
+
+    def addresses(self) -> List[str]:
+        return sorted(self._addresses)
+
+    def has(self, address: str) -> bool:
+        return address in self._addresses
+
+    def sign(self, txn):
+        self.kcl.renew_wallet_handle(self.handle)
+        return self.kcl.sign_transaction(self.handle, self.password, txn)
+
+    def close(self) -> None:
+        self.kcl.release_wallet_handle(self.handle)
+
+def load_key_provider(spec: str) -> KeyProvider:
+    if spec.startswith("kmd:"):
+        from algosdk import kmd
+        kcl = kmd.KMDClient(os.getenv("KMD_TOKEN", ""), os.getenv("KMD_ADDRESS", "http://localhost:4002"))
+        return KmdKeyProvider(kcl, spec[4:], os.getenv("KMD_WALLET_PASSWORD", ""))
+    if ":" in spec and not os.path.exists(spec):
+        module, _, factory = spec.partition(":")
+        provider = getattr(importlib.import_module(module), factory)()
+        if not isinstance(provider, KeyProvider):
+            raise ValueError(f"{spec} did not return a KeyProvider")
+        return provider
+    return MnemonicKeyProvider.from_file(spec)
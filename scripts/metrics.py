@@ -0,0 +1,249 @@
+"""
+In-process metrics for the backend and the scripts, in Prometheus text format.
+
+Counters, gauges and histograms live in one Registry (REGISTRY by default) and
+are cheap enough to update on every request. The backend serves
+REGISTRY.render_text() at /metrics; a script can dump it to a file with
+REGISTRY.write(), or periodically with a MetricsDumper (".json" paths get a
+JSON snapshot, anything else the text format a node_exporter textfile
+collector reads).
+
+Values kept elsewhere (e.g. a cache's own hit counts) are mirrored in by a
+collector callback that runs before every export.
+"""
+from __future__ import annotations
+import json, logging, math, os, re, threading, time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# seconds; covers a local node answering in ms up to a public API backing off
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_DUMP_INTERVAL = 10.0
+
+Labels = Tuple[str, ...]
+
+# path segments that are ids (rounds, asset ids, addresses, txids) and would explode label cardinality
+_ID_SEGMENT = re.compile(r"^(\d+|[A-Z2-7]{26,})$")
+
+def route(path: str) -> str:
+    """`path` without its query and with id segments replaced by ":id", for use as a label."""
+    path = path.split("?", 1)[0]
+    return "/".join(":id" if _ID_SEGMENT.match(seg) else seg for seg in path.split("/"))
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_str(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = (f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames: Labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Labels, float]]:
+        """(sample name, label names, label values, value) for every exported series."""
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: str) -> None:
+        """Mirror a running total counted elsewhere (from a collector)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, self.labelnames, key, value
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self.set_total(value, **labels)
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Labels, List[float]] = {}  # per-bucket counts, then sum, then count
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> float:
+        row = self._values.get(self._key(labels))
+        return row[-1] if row else 0.0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        names = self.labelnames + ("le",)
+        for key, row in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                yield self.name + "_bucket", names, key + (_fmt(bound),), cumulative
+            yield self.name + "_bucket", names, key + ("+Inf",), row[-1]
+            yield self.name + "_sum", self.labelnames, key, row[-2]
+            yield self.name + "_count", self.labelnames, key, row[-1]
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: Sequence[str], **kw) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kw)
+            elif type(metric) is not cls or metric.labelnames != tuple(labels):
+                raise ValueError(f"Metric {name} already registered as a different {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def register_collector(self, fn: Callable[[], None]) -> None:
+        """Run `fn` before each export, to refresh metrics mirrored from other objects."""
+        self._collectors.append(fn)
+
+    def _collect(self) -> List[_Metric]:
+        for fn in list(self._collectors):
+            fn()
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda m: m.name)
+
+    def render_text(self) -> str:
+        lines: List[str] = []
+        for metric in self._collect():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labelnames, values, value in metric.samples():
+                lines.append(f"{name}{_label_str(labelnames, values)} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, List[Dict[str, object]]]:
+        """{metric name: [{"labels": {...}, "value": ...}, ...]}, histograms as one sample per series."""
+        out: Dict[str, List[Dict[str, object]]] = {}
+        for metric in self._collect():
+            series: Dict[Labels, Dict[str, object]] = {}
+            for name, labelnames, values, value in metric.samples():
+                if name.endswith("_bucket"):
+                    key = values[:-1]
+                    entry = series.setdefault(key, {"labels": dict(zip(metric.labelnames, key))})
+                    entry.setdefault("buckets", {})[values[-1]] = value  # type: ignore[union-attr]
+                elif metric.kind == "histogram":
+                    series.setdefault(values, {"labels": dict(zip(labelnames, values))})[name[len(metric.name) + 1:]] = value
+                else:
+                    series[values] = {"labels": dict(zip(labelnames, values)), "value": value}
+            out[metric.name] = list(series.values())
+        return out
+
+    def write(self, path: str) -> None:
+        """Atomically write the metrics to `path`: JSON for *.json, Prometheus text otherwise."""
+        body = json.dumps(self.snapshot(), indent=2) if path.endswith(".json") else self.render_text()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+class MetricsDumper:
+    """Rewrites a metrics file every `interval` seconds in the background, and once more on close()."""
+
+    def __init__(self, path: str, interval: float = DEFAULT_DUMP_INTERVAL, registry: Optional[Registry] = None):
+        self.path = path
+        self.interval = interval
+        self.registry = registry or REGISTRY
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsDumper":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.registry.write(self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.registry.write(self.path)
+            except OSError as e:
+                logging.warning("Could not write metrics to %s: %s", self.path, e)
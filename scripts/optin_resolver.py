@@ -0,0 +1,132 @@
+"""
+Bulk opt-in resolution for ASA airdrops.
+
+Looks up every distinct recipient once over a bounded thread pool and records
+the answer in an on-disk SQLite cache keyed by (address, asset_id, round), so
+a rerun of the same drop only re-queries what it has to:
+ - opted-in answers newer than `max_age_rounds` are reused as-is
+ - not-opted-in answers are always re-queried (those are the rows that change
+   between runs, once recipients go and opt in)
+ - lookup errors are never cached and the row is treated as not opted in
+
+Callers resolving a long list in chunks should open one OptinCache and read
+the chain round once, and pass both to every resolve_optins() call; the
+cache is then queried only for each chunk's own addresses.
+"""
+from __future__ import annotations
+import sqlite3, logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_AGE_ROUNDS = 1000  # ~1 hour of blocks
+QUERY_CHUNK = 500  # addresses per IN (...) lookup, below SQLite's bound-parameter limit
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS optins (
+    address   TEXT    NOT NULL,
+    asset_id  INTEGER NOT NULL,
+    round     INTEGER NOT NULL,
+    opted_in  INTEGER NOT NULL,
+    PRIMARY KEY (address, asset_id, round)
+)
+"""
+
+class OptinCache:
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+    def opted_in_since(self, asset_id: int, min_round: int, addresses: Sequence[str]) -> Set[str]:
+        """Those of `addresses` with an opted-in answer recorded at or after `min_round`."""
+        found: Set[str] = set()
+        for start in range(0, len(addresses), QUERY_CHUNK):
+            chunk = addresses[start:start + QUERY_CHUNK]
+            cur = self._db.execute(
+                f"SELECT DISTINCT address FROM optins WHERE address IN ({','.join('?' * len(chunk))})"
+                " AND asset_id = ? AND round >= ? AND opted_in = 1",
+                (*chunk, asset_id, min_round),
+            )
+            found.update(row[0] for row in cur)
+        return found
+
+    def put_many(self, asset_id: int, results: Iterable[Tuple[str, int, bool]]) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO optins (address, asset_id, round, opted_in) VALUES (?, ?, ?, ?)",
+            [(addr, asset_id, rnd, int(ok)) for addr, rnd, ok in results],
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+def lookup_optin(acl, addr: str, asset_id: int) -> Tuple[bool, int]:
+    """Return (opted_in, round) for one account; raises on network errors."""
+    info = acl.account_info(addr)
+    rnd = int(info.get("round", 0))
+    for a in info.get("assets", []):
+        if a.get("asset-id") == asset_id:
+            return True, rnd
+    return False, rnd
+
+def current_round(acl) -> Optional[int]:
+    try:
+        return int(acl.status().get("last-round", 0))
+    except Exception as e:
+        logging.warning("Status error, opt-in cache will not be reused: %s", e)
+        return None
+
+def resolve_optins(acl, rows: List[Tuple[str, int]], asset_id: int, workers: int = DEFAULT_WORKERS,
+                   cache_path: Optional[str] = None, max_age_rounds: int = DEFAULT_MAX_AGE_ROUNDS,
+                   cache: Optional[OptinCache] = None, now: Optional[int] = None) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+    """
+    Split `rows` into (will_send, skipped) by opt-in status for `asset_id`.
+
+    Each distinct address is looked up at most once; row order is preserved.
+    An open `cache` is used as-is and left open; otherwise `cache_path` is
+    opened for this call. `now` is the chain round the cache age is measured
+    from (looked up when not given).
+    """
+    if workers <= 0:
+        raise ValueError(f"Invalid workers: {workers} (must be >= 1)")
+    addrs = list(dict.fromkeys(addr for addr, _ in rows))
+    status: Dict[str, bool] = {}
+
+    owned = cache is None and bool(cache_path)
+    if owned:
+        cache = OptinCache(cache_path)
+    try:
+        if cache is not None:
+            if now is None:
+                now = current_round(acl)
+            if now is not None:
+                for addr in cache.opted_in_since(asset_id, max(now - max_age_rounds, 0), addrs):
+                    status[addr] = True
+        todo = [a for a in addrs if a not in status]
+        logging.info("Opt-in check: %d distinct addresses, %d cached, %d to look up with %d workers",
+                     len(addrs), len(addrs) - len(todo), len(todo), workers)
+
+        fresh: List[Tuple[str, int, bool]] = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(lookup_optin, acl, addr, asset_id): addr for addr in todo}
+            for fut in as_completed(futures):
+                addr = futures[fut]
+                try:
+                    ok, rnd = fut.result()
+                except Exception as e:
+                    logging.warning("Account info error for %s: %s", addr, e)
+                    status[addr] = False
+                    continue
+                status[addr] = ok
+                fresh.append((addr, rnd, ok))
+        if cache is not None and fresh:
+            cache.put_many(asset_id, fresh)
+    finally:
+        if owned:
+            cache.close()
+
+    will_send = [(addr, amt) for addr, amt in rows if status.get(addr)]
+    skipped = [(addr, amt) for addr, amt in rows if not status.get(addr)]
+    return will_send, skipped
@@ -0,0 +1,244 @@
+"""
+Client-side rate limiting and retries for algod / indexer calls.
+
+throttle(client) routes every request of an AlgodClient or IndexerClient
+through a token bucket shared by all clients of the same host, and retries
+failures with jittered exponential backoff:
+ - 429: the bucket halves its rate and pauses for Retry-After (when sent),
+   then the request is retried
+ - 5xx / connection errors: retried for GET only, since a POSTed
+   transaction may have reached the node even when the response did not
+ - any other HTTP error (404 pending txid, 400 rejected txn) is raised at once
+Every success nudges the rate back up towards the endpoint's max_rate, so a
+run settles just under the provider's real limit instead of a fixed guess.
+
+Each attempt is timed into algo_request_duration_seconds{host,call}; retries
+and calls that finally fail are counted per host (see metrics.py).
+
+Limits are chosen by host; override them with
+ALGO_RATE_LIMITS="purestake.io=10:20:40,127.0.0.1=200" (host=rate[:burst[:max_rate]]).
+"""
+from __future__ import annotations
+import asyncio, logging, os, random, socket, threading, time, urllib.error
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
+from metrics import counter, histogram, route
+
+T = TypeVar("T")
+
+class Limits(NamedTuple):
+    rate: float        # requests/sec to start at
+    burst: int         # requests allowed back to back
+    max_rate: float    # ceiling the rate climbs towards while requests succeed
+
+# PureStake's free tier rejects bursts early; a self-hosted node mostly needs protecting from ourselves
+ENDPOINT_LIMITS: Dict[str, Limits] = {
+    "purestake.io": Limits(rate=5.0, burst=10, max_rate=50.0),
+}
+DEFAULT_LIMITS = Limits(rate=50.0, burst=100, max_rate=1000.0)
+MIN_RATE = 0.5
+RATE_STEP = 0.05   # requests/sec regained per successful request
+
+def parse_limits(spec: str) -> Dict[str, Limits]:
+    """Parse "host=rate[:burst[:max_rate]],..." into per-host Limits."""
+    out: Dict[str, Limits] = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        host, _, values = item.partition("=")
+        parts = values.split(":")
+        try:
+            rate = float(parts[0])
+            burst = int(parts[1]) if len(parts) > 1 else max(1, int(rate * 2))
+            max_rate = float(parts[2]) if len(parts) > 2 else rate
+        except ValueError:
+            raise ValueError(f"Invalid rate limit entry: {item!r}")
+        out[host.strip()] = Limits(rate, burst, max_rate)
+    return out
+
+def limits_for(address: str) -> Limits:
+    host = urlparse(address).hostname or address
+    table = dict(ENDPOINT_LIMITS)
+    table.update(parse_limits(os.getenv("ALGO_RATE_LIMITS", "")))
+    # most specific (longest) matching suffix wins
+    for key in sorted(table, key=len, reverse=True):
+        if host.endswith(key):
+            return table[key]
+    return DEFAULT_LIMITS
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate adapts to 429 responses (AIMD)."""
+
+    def __init__(self, limits: Limits, name: str = ""):
+        self.name = name
+        self.rate = limits.rate
+        self.burst = max(1, limits.burst)
+        self.max_rate = max(limits.max_rate, limits.rate)
+        self.throttled = 0
+        self._tat = 0.0            # theoretical arrival time of the next request
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; returns how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            tat = max(self._tat, now)
+            wait = max(tat - (self.burst - 1) * interval - now, self._paused_until - now, 0.0)
+            self._tat = max(tat, self._paused_until) + interval
+        return wait
+
+    def acquire(self) -> float:
+        """Wait for a token; returns the seconds waited."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + RATE_STEP)
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(MIN_RATE, self.rate / 2)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            rate = self.rate
+        logging.warning("Rate limited by %s; slowing to %.1f req/s%s", self.name or "endpoint", rate,
+                        f" and pausing {retry_after:.1f}s" if retry_after else "")
+
+class RetryPolicy(NamedTuple):
+    max_retries: int = 5
+    base: float = 0.5
+    cap: float = 30.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+        return max(retry_after or 0.0, random.uniform(0, min(self.cap, self.base * 2 ** attempt)))
+
+DEFAULT_POLICY = RetryPolicy()
+
+REQUEST_SECONDS = histogram("algo_request_duration_seconds", "Duration of each algod/indexer request attempt", ("host", "call"))
+REQUEST_RETRIES = counter("algo_request_retries_total", "algod/indexer requests retried, by cause", ("host", "reason"))
+REQUEST_FAILURES = counter("algo_request_failures_total", "algod/indexer calls that failed after any retries", ("host", "call"))
+
+def http_status(exc: BaseException) -> Tuple[Optional[int], Optional[float]]:
+    """(status code, Retry-After seconds) of an SDK HTTP error, if known."""
+    seen = exc
+    while seen is not None:
+        if isinstance(seen, urllib.error.HTTPError):
+            # the SDK raises its own error while handling this one, so it survives as __context__
+            return seen.code, _retry_after(seen.headers.get("Retry-After") if seen.headers else None)
+        code = getattr(seen, "code", None)
+        if isinstance(code, int):
+            return code, getattr(seen, "retry_after", None)
+        seen = seen.__cause__ or seen.__context__
+    return None, None
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None  # HTTP-date form; fall back to backoff
+
+def _is_transient(exc: BaseException, code: Optional[int]) -> bool:
+    if code is not None:
+        return code >= 500
+    return isinstance(exc, (urllib.error.URLError, ConnectionError, socket.timeout, TimeoutError))
+
+def _retry_delay(e: Exception, attempt: int, bucket: Optional[TokenBucket], policy: RetryPolicy, idempotent: bool,
+                 call: str = "") -> Optional[float]:
+    """Seconds to wait before retrying after `e`, or None if it must be raised."""
+    host = bucket.name if bucket is not None else ""
+    code, retry_after = http_status(e)
+    if code == 429:
+        if bucket is not None:
+            bucket.on_throttled(retry_after)
+    elif not (idempotent and _is_transient(e, code)):
+        REQUEST_FAILURES.inc(host=host, call=call)
+        return None
+    if attempt == policy.max_retries:
+        REQUEST_FAILURES.inc(host=host, call=call)
+        return None
+    REQUEST_RETRIES.inc(host=host, reason=str(code) if code is not None else type(e).__name__)
+    delay = policy.delay(attempt, retry_after)
+    logging.warning("Request failed (attempt %d/%d), retrying in %.1fs: %s", attempt + 1, policy.max_retries + 1, delay, e)
+    return delay
+
+def call_with_retries(fn: Callable[[], T], bucket: Optional[TokenBucket] = None, policy: RetryPolicy = DEFAULT_POLICY,
+                      idempotent: bool = True, call: str = "") -> T:
+    """Run `fn` under `bucket` with retries; `call` names it in the request metrics (e.g. "GET /status")."""
+    host = bucket.name if bucket is not None else ""
+    for attempt in range(policy.max_retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            with REQUEST_SECONDS.time(host=host, call=call):
+                result = fn()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, bucket, policy, idempotent, call)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        if bucket is not None:
+            bucket.on_success()
+        return result
+    raise AssertionError("unreachable")
+
+async def call_with_retries_async(fn: Callable[[], Awaitable[T]], bucket: Optional[TokenBucket] = None,
+                                  policy: RetryPolicy = DEFAULT_POLICY, idempotent: bool = True, call: str = "") -> T:
+    """call_with_retries for coroutines: waits with asyncio.sleep, so the event loop keeps serving."""
+    host = bucket.name if bucket is not None else ""
+    for attempt in range(policy.max_retries + 1):
+        if bucket is not None:
+            await bucket.acquire_async()
+        try:
+            with REQUEST_SECONDS.time(host=host, call=call):
+                result = await fn()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, bucket, policy, idempotent, call)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        if bucket is not None:
+            bucket.on_success()
+        return result
+    raise AssertionError("unreachable")
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+def bucket_for(address: str, limits: Optional[Limits] = None) -> TokenBucket:
+    """The bucket shared by every client talking to `address`'s host."""
+    host = urlparse(address).hostname or address
+    with _buckets_lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(limits or limits_for(address), name=host)
+        return _buckets[host]
+
+def throttle(client, limits: Optional[Limits] = None, policy: RetryPolicy = DEFAULT_POLICY):
+    """Rate-limit and retry every request made by an algod or indexer client (in place); returns the client."""
+    if hasattr(client, "algod_request"):
+        name, address = "algod_request", client.algod_address
+    else:
+        name, address = "indexer_request", client.indexer_address
+    bucket = bucket_for(address, limits)
+    request = getattr(client, name)
+
+    def limited(method, requrl, *args, **kwargs):
+        return call_with_retries(lambda: request(method, requrl, *args, **kwargs), bucket, policy,
+                                 idempotent=method.upper() == "GET", call=f"{method.upper()} {route(requrl)}")
+
+    setattr(client, name, limited)
+    return client
@@ -0,0 +1,313 @@
+"""
+Streaming reader for airdrop recipient CSVs (recipient,amount).
+
+Rows are yielded lazily so memory stays flat regardless of file size. The
+encoding is picked from the byte-order mark: Excel/PowerShell exports are
+often UTF-16 (e.g. frontend/data/recipients.csv), everything else is read as
+UTF-8 with an optional BOM.
+
+RecipientTable holds a loaded list compactly (about 45 bytes per row instead
+of a Python tuple, str and int per row) for the steps that need it in memory.
+"""
+from __future__ import annotations
+import csv, codecs, hashlib, logging, re, struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import compress, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from algosdk import encoding
+
+T = TypeVar("T")
+
+def detect_encoding(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(4)
+    if head.startswith((codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE)):
+        return "utf-32"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    return "utf-8-sig"
+
+def iter_recipients(path: str) -> Iterator[Tuple[str, int]]:
+    """Yield (address, amount) for every well-formed row; malformed rows are logged and skipped."""
+    with open(path, newline="", encoding=detect_encoding(path)) as f:
+        for i, row in enumerate(csv.reader(f), start=1):
+            if not row or all(not c.strip() for c in row):
+                continue
+            if len(row) < 2:
+                logging.warning("Skipping malformed line %d: %s", i, row)
+                continue
+            try:
+                addr = row[0].strip()
+                amt = int(row[1])
+            except Exception as e:
+                logging.warning("Skipping bad line %d: %s (%s)", i, row, e)
+                continue
+            if amt < 0:
+                logging.warning("Skipping negative amount on line %d: %s", i, row)
+                continue
+            yield addr, amt
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Group an iterable into lists of at most `size` items without materializing it."""
+    if size <= 0:
+        raise ValueError(f"Invalid batch size: {size}")
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def summarize(rows: Iterable[Tuple[str, int]], asset_id: Optional[int] = None) -> Tuple[int, int, int]:
+    """Return (count, total_algo, total_asset) in a single pass over `rows`."""
+    count = total = 0
+    for _, amt in rows:
+        count += 1
+        total += amt
+    if asset_id is None:
+        return count, total, 0
+    return count, 0, total
+
+# RecipientTable row flags; a row is sendable only when its flags are OK
+OK = 0
+NO_OPTIN = 1
+INVALID = 2       # address fails to decode / checksum, or amount outside uint64
+ZERO_AMOUNT = 4
+DUPLICATE = 8     # amount merged into the first row for the same address
+SENT = 16         # already covered by the journal of a resumed run
+
+KEY_SIZE = 32  # decoded Algorand public key
+ADDRESS_LEN = 58
+MAX_AMOUNT = (1 << 64) - 1
+DECODE_CHUNK = 65536  # rows decoded per batch
+_ZERO_KEY = bytes(KEY_SIZE)
+_OK_MASK = bytes([1] + [0] * 255)  # flags.translate(_OK_MASK) -> 1 for sendable rows
+
+def _flag_mask(flag: int) -> bytes:
+    return bytes(1 if f & flag else 0 for f in range(256))
+
+def _flag_set(flag: int) -> bytes:
+    return bytes(f | flag for f in range(256))
+
+if "sha512_256" in hashlib.algorithms_available:
+    def _checksum(key: bytes) -> bytes:
+        return hashlib.new("sha512_256", key).digest()[-4:]
+else:
+    def _checksum(key: bytes) -> bytes:
+        return encoding.checksum(key)[-4:]
+
+_B32_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
+_B32_TO_INT_DIGITS = str.maketrans(_B32_ALPHABET, "0123456789abcdefghijklmnopqrstuv")
+_B32_RE = re.compile("[A-Z2-7]*")
+
+def _b32_blocks(text: str) -> bytes:
+    # base64.b32decode is a Python loop; int(..., 32) is a linear-time C
+    # conversion for power-of-two bases, so decode the whole chunk as one number
+    return int(text.translate(_B32_TO_INT_DIGITS), 32).to_bytes(len(text) * 5 // 8, "big")
+
+def decode_addresses(addrs: Sequence[str]) -> Tuple[bytes, List[int]]:
+    """
+    Decode many base32 addresses at once.
+
+    Each 58-char address is padded with six zero digits to a 40-byte block and
+    the whole chunk is decoded in one call; only the checksum is then verified
+    per key. Returns the concatenated 32-byte keys (zeros for rejected rows)
+    and the positions of the rejected rows.
+    """
+    well_formed = [len(a) == ADDRESS_LEN for a in addrs]
+    text = "".join((a if ok else "A" * ADDRESS_LEN) + "AAAAAA" for a, ok in zip(addrs, well_formed))
+    if text and _B32_RE.fullmatch(text):
+        raw = _b32_blocks(text)
+    else:
+        # some row has characters outside the alphabet; isolate it row by row
+        parts = []
+        for i, a in enumerate(addrs):
+            if well_formed[i] and _B32_RE.fullmatch(a):
+                parts.append(_b32_blocks(a + "AAAAAA"))
+            else:
+                well_formed[i] = False
+                parts.append(bytes(40))
+        raw = b"".join(parts)
+    keys = []
+    bad = []
+    for i, (key, chk) in enumerate(struct.iter_unpack("32s4s4x", raw)):
+        if well_formed[i] and _checksum(key) == chk:
+            keys.append(key)
+        else:
+            keys.append(_ZERO_KEY)
+            bad.append(i)
+    return b"".join(keys), bad
+
+class RecipientView:
+    """Zero-copy slice of a RecipientTable; iterates (row_index, address, amount)."""
+
+    __slots__ = ("keys", "amounts", "rows")
+
+    def __init__(self, keys: memoryview, amounts: memoryview, rows: memoryview):
+        self.keys = keys
+        self.amounts = amounts
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def __iter__(self) -> Iterator[Tuple[int, str, int]]:
+        for i in range(len(self.amounts)):
+            yield self.rows[i], encoding.encode_address(bytes(self.keys[i*KEY_SIZE:(i+1)*KEY_SIZE])), self.amounts[i]
+
+    def pairs(self) -> List[Tuple[str, int]]:
+        return [(addr, amt) for _, addr, amt in self]
+
+class RecipientTable:
+    """
+    Columnar recipient store for the airdrop pipeline.
+
+    Public keys are kept decoded in one contiguous buffer (32 bytes per row),
+    amounts in an array('Q'), source CSV row indexes in an array('I') and one
+    flag byte per row. Totals and filtering run over the columns in C via
+    sum()/itertools.compress, and batches are memoryview slices, never copies.
+    """
+
+    def __init__(self):
+        self.keys = bytearray()
+        self.amounts = array("Q")
+        self.rows = array("I")
+        self.flags = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def append(self, row_index: int, addr: str, amount: int) -> None:
+        self.extend([(row_index, addr, amount)])
+
+    def extend(self, chunk: Sequence[Tuple[int, str, int]]) -> None:
+        """Validate and append a chunk of (row_index, address, amount) rows."""
+        if not chunk:
+            return
+        row_indexes, addrs, amounts = zip(*chunk)
+        keys, bad = decode_addresses(addrs)
+        flags = bytearray(len(chunk))
+        for i in bad:
+            logging.warning("Invalid address on row %d: %r", row_indexes[i], addrs[i])
+            flags[i] |= INVALID
+        if 0 in amounts:
+            for i in compress(range(len(amounts)), map((0).__eq__, amounts)):
+                flags[i] |= ZERO_AMOUNT
+        if max(amounts) > MAX_AMOUNT or min(amounts) < 0:
+            amounts = list(amounts)
+            for i, amt in enumerate(amounts):
+                if amt < 0 or amt > MAX_AMOUNT:
+                    logging.warning("Amount out of range on row %d: %d", row_indexes[i], amt)
+                    amounts[i] = 0
+                    flags[i] |= INVALID
+        self.keys += keys
+        self.amounts.extend(amounts)
+        self.rows.extend(row_indexes)
+        self.flags += flags
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, str, int]]) -> "RecipientTable":
+        table = cls()
+        for chunk in batched(rows, DECODE_CHUNK):
+            table.extend(chunk)
+        return table
+
+    def address(self, i: int) -> str:
+        return encoding.encode_address(bytes(self.keys[i*KEY_SIZE:(i+1)*KEY_SIZE]))
+
+    def view(self, start: int, stop: int) -> RecipientView:
+        return RecipientView(memoryview(self.keys)[start*KEY_SIZE:stop*KEY_SIZE],
+                             memoryview(self.amounts)[start:stop],
+                             memoryview(self.rows)[start:stop])
+
+    def batches(self, size: int) -> Iterator[RecipientView]:
+        if size <= 0:
+            raise ValueError(f"Invalid batch size: {size}")
+        for start in range(0, len(self), size):
+            yield self.view(start, min(start + size, len(self)))
+
+    def mark(self, i: int, flag: int) -> None:
+        self.flags[i] |= flag
+
+    def unmark(self, i: int, flag: int) -> None:
+        self.flags[i] &= ~flag & 0xFF
+
+    def mark_rows(self, lo: int, hi: int, flag: int) -> None:
+        """Flag every entry whose source row index is within [lo, hi]."""
+        start = bisect_left(self.rows, lo)
+        stop = bisect_right(self.rows, hi)
+        self.flags[start:stop] = self.flags[start:stop].translate(_flag_set(flag))
+
+    def find_duplicates(self) -> Dict[bytes, List[int]]:
+        """Map each key that appears more than once to the positions holding it."""
+        counts = Counter(struct.iter_unpack("32s", self.keys))
+        dups = {k for k, c in counts.items() if c > 1 and k[0] != _ZERO_KEY}
+        if not dups:
+            return {}
+        out: Dict[bytes, List[int]] = {}
+        hits = map(dups.__contains__, struct.iter_unpack("32s", self.keys))
+        for i in compress(range(len(self)), hits):
+            out.setdefault(bytes(self.keys[i*KEY_SIZE:(i+1)*KEY_SIZE]), []).append(i)
+        return out
+
+    def merge_duplicates(self, dups: Optional[Dict[bytes, List[int]]] = None) -> int:
+        """
+        Fold the amounts of repeated addresses into their first row and flag the
+        rest DUPLICATE. A merge that would overflow uint64 flags the rows INVALID.
+        Returns the number of rows folded away.
+        """
+        folded = 0
+        for positions in (self.find_duplicates() if dups is None else dups).values():
+            live = [i for i in positions if not self.flags[i] & INVALID]
+            if len(live) < 2:
+                continue
+            total = sum(self.amounts[i] for i in live)
+            if total > MAX_AMOUNT:
+                logging.warning("Merged amount overflows uint64 for %s (rows %s)", self.address(live[0]), [self.rows[i] for i in live])
+                for i in live:
+                    self.flags[i] |= INVALID
+                continue
+            first = live[0]
+            self.amounts[first] = total
+            if total:
+                self.flags[first] &= ~ZERO_AMOUNT
+            for i in live[1:]:
+                self.flags[i] |= DUPLICATE
+            folded += len(live) - 1
+        return folded
+
+    def count(self, flag: int = OK) -> int:
+        """Number of sendable rows (flag=OK) or of rows carrying `flag`."""
+        if flag == OK:
+            return self.flags.count(OK)
+        return self.flags.translate(_flag_mask(flag)).count(1)
+
+    def sendable(self, start: int = 0, stop: Optional[int] = None) -> Iterator[int]:
+        """Positions of OK rows within [start, stop)."""
+        stop = len(self) if stop is None else stop
+        return compress(range(start, stop), self.flags[start:stop].translate(_OK_MASK))
+
+    def flagged(self, flag: int) -> Iterator[int]:
+        """Indexes of rows carrying `flag`."""
+        return compress(range(len(self)), self.flags.translate(_flag_mask(flag)))
+
+    def total(self) -> int:
+        """Sum of amounts over sendable rows."""
+        if self.flags.count(OK) == len(self.flags):
+            return sum(self.amounts)
+        return sum(compress(self.amounts, self.flags.translate(_OK_MASK)))
+
+    def compact(self) -> "RecipientTable":
+        """Copy of the table holding only sendable rows, so batches stay contiguous views."""
+        if self.flags.count(OK) == len(self.flags):
+            return self
+        mask = self.flags.translate(_OK_MASK)
+        out = RecipientTable()
+        keys = memoryview(self.keys)
+        out.keys = bytearray().join(compress((keys[i:i+KEY_SIZE] for i in range(0, len(keys), KEY_SIZE)), mask))
+        out.amounts = array("Q", compress(self.amounts, mask))
+        out.rows = array("I", compress(self.rows, mask))
+        out.flags = bytearray(len(out.amounts))
+        return out
@@ -0,0 +1,81 @@
+"""
+Round-aware response cache with single-flight coalescing for the backend.
+
+Deposit answers only change when the sync follower reaches a new round, so
+RoundCache keys each entry by the round it was computed at: a lookup for the
+current round is a hit, an entry from an older round is recomputed. Concurrent
+misses for the same key share one computation instead of each doing the work;
+it runs in its own task, so cancelling the caller that started it does not
+fail the others.
+Entries also expire after `ttl` seconds and the least recently used ones are
+evicted beyond `maxsize`.
+"""
+from __future__ import annotations
+import asyncio, time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 60.0
+
+class RoundCache:
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: Optional[float] = DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0   # misses that waited on another caller's computation
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, object]]" = OrderedDict()
+        self._inflight: Dict[Tuple[Hashable, int], asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "coalesced": self.coalesced, "evictions": self.evictions}
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get(self, key: Hashable, rnd: int, compute: Callable[[], Awaitable[T]]) -> T:
+        """Value of `key` as of round `rnd`, computing it at most once per round."""
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[0] == rnd and (self.ttl is None or now < entry[1]):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]  # type: ignore[return-value]
+        flight = self._inflight.get((key, rnd))
+        if flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(flight)
+        self.misses += 1
+        # the computation runs in a task of its own: a leader cancelled because its client went away
+        # stops waiting, but the coalesced waiters still get the value
+        flight = asyncio.get_running_loop().create_task(self._fill(key, rnd, compute))
+        flight.add_done_callback(lambda t: t.cancelled() or t.exception())  # failures seen by nobody are not logged
+        self._inflight[(key, rnd)] = flight
+        return await asyncio.shield(flight)
+
+    async def _fill(self, key: Hashable, rnd: int, compute: Callable[[], Awaitable[T]]) -> T:
+        try:
+            value = await compute()  # on failure every waiter sees the same error; nothing is cached
+        finally:
+            del self._inflight[(key, rnd)]
+        self._store(key, rnd, value)
+        return value
+
+    def _store(self, key: Hashable, rnd: int, value: object) -> None:
+        current = self._entries.get(key)
+        if current is not None and current[0] > rnd:
+            return  # a newer round's answer is already cached
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self._entries[key] = (rnd, expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,57 @@
+"""
+Response encoding for the deposit endpoints.
+
+Handlers build plain dicts/lists and hand them to encode(); the bytes go out
+in a bare Response, skipping FastAPI's jsonable_encoder walk and pydantic
+validation of every row (the rows come from our own typed store). The
+format is negotiated from Accept:
+ - application/msgpack (or application/x-msgpack): msgpack, the most compact
+ - anything else: compact JSON, via orjson when it is installed
+"""
+from __future__ import annotations
+import json
+from typing import Any, Optional, Tuple
+import msgpack
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+def negotiate(accept: Optional[str]) -> str:
+    """Media type to answer with for an Accept header; JSON unless msgpack is preferred."""
+    if not accept:
+        return JSON
+    best, best_q = JSON, 0.0
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        media = media.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in _MSGPACK_TYPES and q > best_q:
+            best, best_q = MSGPACK, q
+        elif media in (JSON, "application/*", "*/*") and q > best_q:
+            best, best_q = JSON, q
+    return best
+
+def encode(payload: Any, media_type: str = JSON) -> bytes:
+    if media_type == MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+def render(payload: Any, accept: Optional[str]) -> Tuple[bytes, str]:
+    """(body, media type) for `payload` under the negotiated format."""
+    media_type = negotiate(accept)
+    return encode(payload, media_type), media_type
@@ -4,24 +4,16 @@ Usage:
  $env:ALGOD_TOKEN="YOUR_KEY"
  python .\scripts\safety_check.py --csv .\data\recipients.csv --asset 12345
 """
-import os, sys, csv, json
+import os, sys, json
 from algosdk.v2client import algod
+from recipients import iter_recipients, summarize
+from ratelimit import throttle
 
-def load_csv(path):
+def load_csv(path, asset_id=None):
+    """Stream the CSV once and return (recipients, total_algo, total_asset)."""
     if not os.path.exists(path):
         print("CSV not found", path, file=sys.stderr); sys.exit(2)
-    total_algo = 0
-    total_asset = 0
-    rows = []
-    with open(path, newline='') as f:
-        r = csv.reader(f)
-        for row in r:
-            if not row or all(not c.strip() for c in row): continue
-            addr = row[0].strip()
-            amt = int(row[1])
-            rows.append((addr, amt))
-            total_algo += amt
-    return rows, total_algo, total_asset
+    return summarize(iter_recipients(path), asset_id)
 
 def main():
     import argparse
@@ -34,9 +26,9 @@ def main():
     if not token:
         print("ALGOD_TOKEN env required", file=sys.stderr); sys.exit(2)
     algod_address = os.getenv("ALGOD_ADDRESS", "https://testnet-algorand.api.purestake.io/ps2")
-    client = algod.AlgodClient(token, algod_address, headers={"X-API-Key":token})
+    client = throttle(algod.AlgodClient(token, algod_address, headers={"X-API-Key":token}))
 
-    rows, total_algo, total_asset = load_csv(args.csv)
+    count, total_algo, total_asset = load_csv(args.csv, args.asset)
     acct = os.getenv("ADMIN_ADDRESS", "")
     if not acct:
         print("Set ADMIN_ADDRESS env to verify holdings", file=sys.stderr); sys.exit(2)
@@ -44,8 +36,9 @@ def main():
     balance = int(info.get("amount",0))
     assets = {a.get("asset-id"): int(a.get("amount",0)) for a in info.get("assets",[])}
     report = {
-        "recipients": len(rows),
+        "recipients": count,
         "total_algo_required": total_algo,
+        "total_asset_required": total_asset,
         "admin_algo_balance": balance,
         "asset_id": args.asset,
         "admin_asset_holdings": assets.get(args.asset, 0)
@@ -54,6 +47,9 @@ def main():
     if balance < total_algo:
         print("WARNING: admin ALGO balance < required", file=sys.stderr)
         sys.exit(3)
+    if args.asset is not None and assets.get(args.asset, 0) < total_asset:
+        print("WARNING: admin asset holdings < required", file=sys.stderr)
+        sys.exit(3)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
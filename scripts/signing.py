@@ -0,0 +1,198 @@
+"""
+Group building and signing for the airdrop pipeline.
+
+sign_groups() turns batches of (row_index, receiver, amount) rows into
+SignedGroup records: txids plus the concatenated msgpack bytes, ready for
+send_raw_transaction. With workers > 0 the CPU-bound part (address encoding,
+txn construction, ed25519 signing, msgpack) runs in a process pool, and at
+most `depth` groups are signed ahead of the submitter, so the cores stay busy
+while memory stays bounded.
+
+sign_bundles() is the variant for custodial recipients: pack_bundles() fits
+an opt-in (signed through a key provider) in front of each transfer to a
+receiver that has not opted in yet, in the same atomic group.
+
+Every transaction carries a note naming the run and its CSV row (see
+txn_note). Groups built from the same cached params would otherwise get the
+same txid whenever their rows repeat (duplicate rows, a final group equal to
+an earlier one), and the node rejects the second as already in the ledger.
+"""
+from __future__ import annotations
+import base64, multiprocessing, secrets
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Container, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from algosdk import encoding
+from algosdk.future.transaction import AssetTransferTxn, PaymentTxn, assign_group_id
+
+MAX_GROUP = 16  # Algorand supports up to 16 txns in a group
+
+class SignedGroup(NamedTuple):
+    first_row: int
+    last_row: int
+    size: int
+    txids: List[str]
+    blob: bytes       # signed txns, msgpack-encoded and concatenated
+    last_valid: int
+    rows: List[int]   # the CSV rows paid, which need not be contiguous
+
+def new_run_id() -> str:
+    return secrets.token_hex(8)
+
+def txn_note(run_id: str, row: int, slot: int = 0) -> bytes:
+    """Note making a txn unique: the run, its CSV row and, in a bundle, its position among that row's txns."""
+    return f"airdrop:{run_id}:{row}:{slot}".encode()
+
+def build_group(params, admin_addr: str, batch_rows: List[Tuple[str,int]], asset_id: Optional[int],
+                notes: Optional[Sequence[bytes]] = None) -> list:
+    txns = []
+    for i, (to, amount) in enumerate(batch_rows):
+        note = notes[i] if notes else None
+        if asset_id:
+            txn = AssetTransferTxn(sender=admin_addr, sp=params, receiver=to, amt=amount, index=asset_id, note=note)
+        else:
+            txn = PaymentTxn(sender=admin_addr, sp=params, receiver=to, amt=amount, note=note)
+        txns.append(txn)
+    if len(txns) > MAX_GROUP:
+        raise ValueError(f"Batch size {len(txns)} exceeds max group size {MAX_GROUP}")
+    assign_group_id(txns)
+    return txns
+
+def encode_signed(signed: list) -> bytes:
+    return b"".join(base64.b64decode(encoding.msgpack_encode(s)) for s in signed)
+
+def sign_group(params, admin_addr: str, admin_sk: str, batch_rows: List[Tuple[str,int]], asset_id: Optional[int],
+               notes: Optional[Sequence[bytes]] = None) -> Tuple[List[str], bytes, int]:
+    """Build, sign and encode one group; returns (txids, blob, last_valid)."""
+    txns = build_group(params, admin_addr, batch_rows, asset_id, notes)
+    signed = [t.sign(admin_sk) for t in txns]
+    return [t.get_txid() for t in txns], encode_signed(signed), txns[0].last_valid_round
+
+# per-process signing context, set once by the pool initializer so the key is
+# not pickled into every task
+_worker: dict = {}
+
+def _init_worker(admin_addr: str, admin_sk: str, asset_id: Optional[int]) -> None:
+    _worker.update(addr=admin_addr, sk=admin_sk, asset_id=asset_id)
+
+def _sign_in_worker(params, receivers: Union[bytes, List[str]], amounts: List[int], notes: List[bytes]) -> Tuple[List[str], bytes, int]:
+    if isinstance(receivers, bytes):
+        receivers = [encoding.encode_address(receivers[i:i+32]) for i in range(0, len(receivers), 32)]
+    return sign_group(params, _worker["addr"], _worker["sk"], list(zip(receivers, amounts)), _worker["asset_id"], notes)
+
+def _pack(batch) -> Tuple[List[int], Union[bytes, List[str]], List[int]]:
+    # RecipientView batches ship their packed keys; address encoding happens in the worker
+    if hasattr(batch, "keys") and hasattr(batch, "amounts"):
+        return list(batch.rows), bytes(batch.keys), list(batch.amounts)
+    rows = list(batch)
+    return [r for r, _, _ in rows], [to for _, to, _ in rows], [amt for _, _, amt in rows]
+
+def sign_groups(batches: Iterable[Sequence[Tuple[int,str,int]]], params: Callable[[], object], admin_addr: str, admin_sk: str,
+                asset_id: Optional[int], workers: int = 0, depth: Optional[int] = None, run_id: Optional[str] = None) -> Iterator[SignedGroup]:
+    """Yield a SignedGroup per batch, in order. `params` is called once per group."""
+    run_id = run_id or new_run_id()
+    if workers <= 0:
+        for batch in batches:
+            rows, receivers, amounts = _pack(batch)
+            if isinstance(receivers, bytes):
+                receivers = [encoding.encode_address(receivers[i:i+32]) for i in range(0, len(receivers), 32)]
+            txids, blob, last_valid = sign_group(params(), admin_addr, admin_sk, list(zip(receivers, amounts)), asset_id,
+                                                 [txn_note(run_id, r) for r in rows])
+            yield SignedGroup(rows[0], rows[-1], len(rows), txids, blob, last_valid, rows)
+        return
+
+    depth = depth or workers * 4
+    # spawn, not fork: the submitter already runs confirmer/refresh threads
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(admin_addr, admin_sk, asset_id)) as pool:
+        ahead: deque = deque()
+        it = iter(batches)
+        exhausted = False
+        while True:
+            while not exhausted and len(ahead) < depth:
+                batch = next(it, None)
+                if batch is None:
+                    exhausted = True
+                    break
+                rows, receivers, amounts = _pack(batch)
+                notes = [txn_note(run_id, r) for r in rows]
+                ahead.append((rows, pool.submit(_sign_in_worker, params(), receivers, amounts, notes)))
+            if not ahead:
+                return
+            rows, fut = ahead.popleft()
+            txids, blob, last_valid = fut.result()
+            yield SignedGroup(rows[0], rows[-1], len(rows), txids, blob, last_valid, rows)
+
+def bundle_txns(topup: int = 0) -> int:
+    """Transactions per opt-in bundle: [top-up payment,] opt-in, transfer."""
+    return 3 if topup else 2
+
+def pack_bundles(rows: Iterable[Tuple[int,str,int]], max_txns: int, optin_rows: Container[int], topup: int = 0) -> Iterator[List[Tuple[int,str,int]]]:
+    """
+    Split (row_index, receiver, amount) rows into groups of at most `max_txns`
+    transactions, counting rows in `optin_rows` as a whole opt-in bundle.
+
+    Rows stay in order; each group is journaled with the exact rows it pays.
+    """
+    per_bundle = bundle_txns(topup)
+    if max_txns < per_bundle or max_txns > MAX_GROUP:
+        raise ValueError(f"Group size {max_txns} cannot hold an opt-in bundle of {per_bundle} txns (max {MAX_GROUP})")
+    batch: List[Tuple[int,str,int]] = []
+    used = 0
+    for row in rows:
+        cost = per_bundle if row[0] in optin_rows else 1
+        if used + cost > max_txns:
+            yield batch
+            batch, used = [], 0
+        batch.append(row)
+        used += cost
+    if batch:
+        yield batch
+
+def build_bundle_group(params, admin_addr: str, batch_rows: Sequence[Tuple[str,int,bool]], asset_id: int, topup: int = 0,
+                       rows: Optional[Sequence[int]] = None, run_id: str = "") -> Tuple[list, List[bool]]:
+    """
+    Build one group of asset transfers where rows flagged True also get the
+    receiver's opt-in (preceded by a `topup` payment from the admin when set).
+
+    The admin's transfer pays the opt-in's fee as well (fee pooling), so the
+    receiver only needs the opt-in's minimum balance. With `rows` (the CSV
+    row of each batch row) every txn gets a txn_note. Returns the txns and,
+    per txn, whether the receiver (not the admin) signs it.
+    """
+    txns, by_receiver = [], []
+    for k, (to, amount, optin) in enumerate(batch_rows):
+        note = [txn_note(run_id, rows[k], slot) for slot in range(3)] if rows is not None else [None] * 3
+        transfer = AssetTransferTxn(sender=admin_addr, sp=params, receiver=to, amt=amount, index=asset_id, note=note[0])
+        if optin:
+            if topup:
+                txns.append(PaymentTxn(sender=admin_addr, sp=params, receiver=to, amt=topup, note=note[1]))
+                by_receiver.append(False)
+            opt = AssetTransferTxn(sender=to, sp=params, receiver=to, amt=0, index=asset_id, note=note[2])
+            transfer.fee += opt.fee
+            opt.fee = 0
+            txns.append(opt)
+            by_receiver.append(True)
+        txns.append(transfer)
+        by_receiver.append(False)
+    if len(txns) > MAX_GROUP:
+        raise ValueError(f"Group of {len(txns)} txns exceeds max group size {MAX_GROUP}")
+    assign_group_id(txns)
+    return txns, by_receiver
+
+def sign_bundles(batches: Iterable[Sequence[Tuple[int,str,int]]], params: Callable[[], object], admin_addr: str, admin_sk: str,
+                 asset_id: int, keys, optin_rows: Container[int], topup: int = 0, run_id: Optional[str] = None) -> Iterator[SignedGroup]:
+    """
+    Like sign_groups(), for batches from pack_bundles(): opt-ins are signed by
+    `keys` (see key_provider), everything else by the admin. Signing happens
+    inline because a key provider may hold a connection or device handle.
+    """
+    run_id = run_id or new_run_id()
+    for batch in batches:
+        rows = list(batch)
+        txns, by_receiver = build_bundle_group(params(), admin_addr, [(to, amt, i in optin_rows) for i, to, amt in rows], asset_id, topup,
+                                               [i for i, _, _ in rows], run_id)
+        signed = [keys.sign(t) if theirs else t.sign(admin_sk) for t, theirs in zip(txns, by_receiver)]
+        yield SignedGroup(rows[0][0], rows[-1][0], len(txns), [t.get_txid() for t in txns], encode_signed(signed), txns[0].last_valid_round,
+                          [i for i, _, _ in rows])
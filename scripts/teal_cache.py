@@ -0,0 +1,113 @@
+"""
+Content-addressed cache of algod TEAL compilations.
+
+compile_teal(client, source) returns the bytecode, program hash and logic-sig
+address for a TEAL source. Results are stored as one small JSON file per key,
+where the key is the sha256 of the source, its #pragma version and the
+algod build that compiled it. A repeat deployment or CI run finds the file
+and makes no network call. Keep the cache directory between CI jobs to share
+it.
+
+The node version itself is remembered per algod address for
+NODE_VERSION_TTL seconds, so a warm run does not even ask for /versions.
+Set TEAL_NODE_VERSION to pin it, TEAL_CACHE_DIR to move the cache, or
+TEAL_CACHE=0 to always compile.
+
+Entries are checked on load: the stored program must hash to the stored
+address, otherwise it is recompiled.
+"""
+from __future__ import annotations
+import base64, hashlib, json, os, re, time
+from typing import Dict, NamedTuple, Optional
+from algosdk import logic
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "algo-launchpad", "teal")
+NODE_VERSION_TTL = 24 * 3600   # seconds a looked-up algod version is trusted
+
+_PRAGMA = re.compile(r"^\s*#pragma\s+version\s+(\d+)", re.MULTILINE)
+
+class CompiledProgram(NamedTuple):
+    program: bytes
+    hash: str          # program hash, which is also the logic-sig address
+    pragma: Optional[int]
+    node_version: str
+    cached: bool
+
+    @property
+    def address(self) -> str:
+        return self.hash
+
+    @property
+    def b64(self) -> str:
+        return base64.b64encode(self.program).decode()
+
+def pragma_version(source: str) -> Optional[int]:
+    m = _PRAGMA.search(source)
+    return int(m.group(1)) if m else None
+
+def cache_key(source: str, node_version: str) -> str:
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    return f"{digest}-v{pragma_version(source) or 0}-{re.sub(r'[^0-9A-Za-z.]', '_', node_version)}"
+
+class TealCache:
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        self.path = path or os.getenv("TEAL_CACHE_DIR") or DEFAULT_CACHE_DIR
+        self.enabled = os.getenv("TEAL_CACHE", "1") != "0" if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self, name: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.path, name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name: str, data: Dict) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        target = os.path.join(self.path, name)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, target)  # concurrent runs never see a half-written entry
+
+    def node_version(self, client) -> str:
+        """algod build version, from TEAL_NODE_VERSION, the remembered value, or one /versions call."""
+        pinned = os.getenv("TEAL_NODE_VERSION")
+        if pinned:
+            return pinned
+        address = getattr(client, "algod_address", "")
+        name = "node-" + hashlib.sha256(address.encode()).hexdigest()[:16] + ".json"
+        known = self._read(name) if self.enabled else None
+        if known and known.get("address") == address and time.time() - known.get("checked", 0) < NODE_VERSION_TTL:
+            return known["version"]
+        build = client.versions().get("build", {})
+        version = f"{build.get('major', 0)}.{build.get('minor', 0)}.{build.get('build_number', 0)}"
+        if self.enabled:
+            self._write(name, {"address": address, "version": version, "checked": time.time()})
+        return version
+
+    def compile(self, client, source: str) -> CompiledProgram:
+        node_version = self.node_version(client)
+        key = cache_key(source, node_version)
+        pragma = pragma_version(source)
+        if self.enabled:
+            entry = self._read(key + ".json")
+            if entry is not None:
+                program = base64.b64decode(entry.get("result", ""))
+                if program and logic.address(program) == entry.get("hash"):
+                    self.hits += 1
+                    return CompiledProgram(program, entry["hash"], pragma, node_version, cached=True)
+        self.misses += 1
+        resp = client.compile(source)
+        program = base64.b64decode(resp["result"])
+        compiled = CompiledProgram(program, resp.get("hash") or logic.address(program), pragma, node_version, cached=False)
+        if self.enabled:
+            self._write(key + ".json", {"result": resp["result"], "hash": compiled.hash, "pragma": pragma,
+                                        "node_version": node_version, "source_sha256": key.split("-", 1)[0],
+                                        "compiled_at": int(time.time())})
+        return compiled
+
+def compile_teal(client, source: str, cache: Optional[TealCache] = None) -> CompiledProgram:
+    """Compile `source` with `client`, reusing a cached result for the same source, pragma and node version."""
+    return (cache or TealCache()).compile(client, source)
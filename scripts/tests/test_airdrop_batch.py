@@ -1,22 +1,28 @@
 import os
 import io
 import csv
+import base64
+import msgpack
 import pytest
 from types import SimpleNamespace
+from algosdk import account as _account, encoding
+from algosdk.error import AlgodHTTPError
+from algosdk.future.transaction import SuggestedParams, SignedTransaction
 
 # adjust import path if needed
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from airdrop_batch import load_csv, get_algod_client, get_admin, run_airdrop, check_optin, ensure_admin_has_funds
+from airdrop_batch import get_algod_client, get_admin, run_airdrop, ensure_admin_has_funds, iter_rows, mark_unopted
+from airdrop_journal import AirdropJournal, CONFIRMED, FAILED, SUBMITTED
+from key_provider import MnemonicKeyProvider
+from recipients import RecipientTable, NO_OPTIN
+from signing import pack_bundles, sign_groups
 
-def test_load_csv_tmp(tmp_path):
+def test_iter_rows_numbers_well_formed_rows(tmp_path):
     p = tmp_path / "rec.csv"
     p.write_text("ADDR1,100\nADDR2,200\n\nbadline\nADDR3,300\n")
-    rows = load_csv(str(p))
-    assert ("ADDR1", 100) in rows
-    assert ("ADDR2", 200) in rows
-    assert ("ADDR3", 300) in rows
-    # badline skipped
+    # badline skipped; row indexes count the rows kept
+    assert list(iter_rows(str(p))) == [(0, "ADDR1", 100), (1, "ADDR2", 200), (2, "ADDR3", 300)]
 
 class DummyACL:
     def __init__(self, acct_info=None):
@@ -26,13 +32,17 @@ class DummyACL:
     def suggested_params(self):
         return SimpleNamespace(fee=1000)
 
-def test_check_optin_true(monkeypatch):
-    dummy = DummyACL({"assets":[{"asset-id":123,"amount":1}]})
-    assert check_optin(dummy, "X", 123) is True
-
-def test_check_optin_false(monkeypatch):
-    dummy = DummyACL({"assets":[]})
-    assert check_optin(dummy, "X", 123) is False
+def test_mark_unopted_flags_receivers_without_the_asset():
+    receivers = [_account.generate_account()[1] for _ in range(3)]
+    table = RecipientTable.from_rows([(i, a, 1) for i, a in enumerate(receivers)])
+    class ACL(DummyACL):
+        def account_info(self, addr):
+            if addr == receivers[2]:
+                raise RuntimeError("account lookup failed")
+            return {"assets": [{"asset-id": 123, "amount": 1}] if addr == receivers[0] else []}
+    mark_unopted(ACL(), table, 123, workers=2)
+    # lookup errors count as not opted in
+    assert list(table.flagged(NO_OPTIN)) == [1, 2] and table.count() == 1
 
 def test_ensure_admin_has_funds_ok(monkeypatch):
     dummy = DummyACL({"amount": 5000000, "assets":[{"asset-id":111,"amount":100}]})
@@ -57,7 +67,158 @@ def test_run_airdrop_dry_run(monkeypatch, tmp_path):
         def suggested_params(self): return SimpleNamespace(fee=1000)
         def account_info(self, addr): return {"amount": 10000000, "assets":[{"asset-id":999,"amount":1000}]}
     monkeypatch.setattr(ab, "get_algod_client", lambda: ACL())
-    # stub check_optin to True
-    monkeypatch.setattr(ab, "check_optin", lambda acl, a, b: True)
     # run dry run (should exit cleanly without raising)
-    ab.run_airdrop(str(p), asset_id=None, batch_size=1, dry_run=True, execute=False)
\ No newline at end of file
+    ab.run_airdrop(str(p), asset_id=None, batch_size=1, dry_run=True, execute=False)
+
+class PipelineACL:
+    """Fake algod that puts every group sent into the next block."""
+    def __init__(self):
+        self.sent = []
+        self.round = 10
+        self.blocks = {}
+        self.mempool = []
+    def suggested_params(self):
+        return SuggestedParams(fee=1000, first=1, last=1000, gh="SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=", flat_fee=True)
+    def send_raw_transaction(self, blob_b64):
+        raw = base64.b64decode(blob_b64)
+        group = [txn for txn in msgpack.Unpacker(io.BytesIO(raw), raw=False)]
+        self.sent.append(group)
+        self.mempool.extend(SignedTransaction.undictify(t).get_txid() for t in group)
+        return "TXID"
+    def status(self):
+        return {"last-round": self.round}
+    def status_after_block(self, rnd):
+        self.round = max(self.round, rnd) + 1
+        self.blocks[self.round], self.mempool = self.mempool, []
+        return {"last-round": self.round}
+    def algod_request(self, method, path, **kwargs):
+        return {"blockTxids": self.blocks.get(int(path.split("/")[2]), [])}
+    def pending_transaction_info(self, txid):
+        for rnd, txids in self.blocks.items():
+            if txid in txids:
+                return {"confirmed-round": rnd}
+        return {}
+
+def test_run_pipelined_confirms_all_groups():
+    import airdrop_batch as ab
+    sk, addr = _account.generate_account()
+    rows = [(i, _account.generate_account()[1], i + 1) for i in range(20)]
+    acl = PipelineACL()
+    result = ab.run_pipelined(acl, addr, sk, [rows[i:i+4] for i in range(0, 20, 4)], None, window=2, poll_interval=0)
+    assert result.submitted == 5
+    assert result.confirmed == 5
+    assert result.failed == []
+    assert sum(len(g) for g in acl.sent) == 20
+
+def test_run_pipelined_signs_in_process_pool():
+    import airdrop_batch as ab
+    sk, addr = _account.generate_account()
+    receivers = [_account.generate_account()[1] for _ in range(10)]
+    table = RecipientTable.from_rows([(i, a, 7) for i, a in enumerate(receivers)])
+    acl = PipelineACL()
+    result = ab.run_pipelined(acl, addr, sk, table.batches(4), 99, window=4, poll_interval=0, sign_workers=2)
+    assert (result.submitted, result.confirmed) == (3, 3)
+    sent = [txn["txn"] for group in acl.sent for txn in group]
+    assert [t["aamt"] for t in sent] == [7] * 10
+    assert len({t["grp"] for t in sent}) == 3
+    assert all("sig" in txn for group in acl.sent for txn in group)
+
+def test_run_pipelined_bundles_optins_with_transfers():
+    import airdrop_batch as ab
+    sk, addr = _account.generate_account()
+    accounts = [_account.generate_account() for _ in range(10)]
+    keys = MnemonicKeyProvider({a: k for k, a in accounts[::2]})  # we hold every other key
+    table = RecipientTable.from_rows([(i, a, 5) for i, (_, a) in enumerate(accounts)])
+    for i in range(6):
+        table.mark(i, NO_OPTIN)  # rows 0..5 not opted in; 1, 3 and 5 are not ours
+    optin_rows = ab.claim_custodial(table, keys)
+    assert optin_rows == {0, 2, 4}
+    assert list(table.flagged(NO_OPTIN)) == [1, 3, 5]
+    sendable = table.compact()
+    batches = list(pack_bundles(sendable.view(0, len(sendable)), 6, optin_rows, topup=200000))
+    # bundles are 3 txns with a top-up, plain rows 1
+    assert [[r for r, _, _ in b] for b in batches] == [[0, 2], [4, 6, 7, 8], [9]]
+    acl = PipelineACL()
+    result = ab.run_pipelined(acl, addr, sk, batches, 99, window=2, poll_interval=0, keys=keys, optin_rows=optin_rows, topup=200000)
+    assert (result.submitted, result.confirmed) == (3, 3)
+    assert [len(g) for g in acl.sent] == [6, 6, 1]
+    group = [t["txn"] for t in acl.sent[1]]
+    receiver = accounts[4][1]
+    assert [t["type"] for t in group] == ["pay", "axfer", "axfer", "axfer", "axfer", "axfer"]
+    assert encoding.encode_address(group[1]["snd"]) == receiver == encoding.encode_address(group[1]["arcv"])
+    assert "fee" not in group[1] and group[2]["fee"] == 2000  # the admin's transfer pays the opt-in's fee
+    assert group[0]["amt"] == 200000 and group[2]["aamt"] == 5
+    assert len({t["grp"] for t in group}) == 1
+
+class GatewayErrorACL(PipelineACL):
+    """Accepts each group, then answers with `code` as a proxy in front of the node might."""
+    def __init__(self, code):
+        super().__init__()
+        self.code = code
+    def send_raw_transaction(self, blob_b64):
+        super().send_raw_transaction(blob_b64)
+        raise AlgodHTTPError("gateway error", self.code)
+
+def test_submit_5xx_is_not_journaled_failed_and_resume_finds_group(tmp_path):
+    import airdrop_batch as ab
+    sk, addr = _account.generate_account()
+    rows = [(i, _account.generate_account()[1], 1) for i in range(4)]
+    journal = AirdropJournal(str(tmp_path / "j.sqlite"))
+    acl = GatewayErrorACL(502)
+    with pytest.raises(AlgodHTTPError):
+        ab.run_pipelined(acl, addr, sk, [rows], None, window=1, poll_interval=0, journal=journal)
+    assert [g.status for g in journal.groups()] == [SUBMITTED]
+    assert 0 in journal.covered_rows() and 3 in journal.covered_rows()  # not resent by --resume
+    acl.status_after_block(acl.round)  # the accepted group lands in a block
+    ab.reconcile_journal(acl, journal, window=1, poll_interval=0)
+    assert [g.status for g in journal.groups()] == [CONFIRMED]
+
+def test_submit_4xx_is_journaled_failed(tmp_path):
+    import airdrop_batch as ab
+    sk, addr = _account.generate_account()
+    journal = AirdropJournal(str(tmp_path / "j.sqlite"))
+    with pytest.raises(AlgodHTTPError):
+        ab.run_pipelined(GatewayErrorACL(400), addr, sk, [[(0, _account.generate_account()[1], 1)]], None,
+                         window=1, poll_interval=0, journal=journal)
+    assert [g.status for g in journal.groups()] == [FAILED]
+    assert len(journal.covered_rows()) == 0
+
+def test_identical_rows_never_share_a_txid():
+    sk, addr = _account.generate_account()
+    to = _account.generate_account()[1]
+    params = PipelineACL().suggested_params()
+    # duplicate rows within a group, and a final group repeating an earlier one, all from the same params
+    groups = list(sign_groups([[(0, to, 5), (1, to, 5)], [(2, to, 5)], [(3, to, 5)]], lambda: params, addr, sk, 99, run_id="r1"))
+    txids = [t for g in groups for t in g.txids]
+    assert len(set(txids)) == 4
+    again = list(sign_groups([[(0, to, 5), (1, to, 5)]], lambda: params, addr, sk, 99, run_id="r2"))
+    assert not set(again[0].txids) & set(txids)  # a later run (e.g. a retry on --resume) is distinct too
+
+class LedgerACL(PipelineACL):
+    """PipelineACL that also answers account lookups: the admin holds plenty, receivers in `opted` hold the asset."""
+    def __init__(self, admin, asset_id):
+        super().__init__()
+        self.admin, self.asset_id, self.opted = admin, asset_id, set()
+    def account_info(self, addr):
+        if addr == self.admin:
+            return {"amount": 10**12, "assets": [{"asset-id": self.asset_id, "amount": 10**12}]}
+        return {"amount": 0, "assets": [{"asset-id": self.asset_id, "amount": 0}] if addr in self.opted else []}
+
+def test_resume_sends_a_skipped_row_that_opted_in_since(tmp_path, monkeypatch):
+    import airdrop_batch as ab
+    sk, addr = _account.generate_account()
+    receivers = [_account.generate_account()[1] for _ in range(4)]
+    p = tmp_path / "rec.csv"
+    p.write_text("".join(f"{a},{i + 1}\n" for i, a in enumerate(receivers)))
+    acl = LedgerACL(addr, 99)
+    acl.opted = {receivers[0], receivers[2], receivers[3]}  # row 1 has not opted in yet
+    monkeypatch.setattr(ab, "get_algod_client", lambda: acl)
+    monkeypatch.setattr(ab, "get_admin", lambda: (addr, sk))
+    run = lambda resume: ab.run_airdrop(str(p), 99, 16, execute=True, journal_path=str(tmp_path / "j.sqlite"), resume=resume)
+    run(False)
+    assert [[t["txn"]["aamt"] for t in g] for g in acl.sent] == [[1, 3, 4]]  # one group spanning rows 0..3
+
+    acl.opted.add(receivers[1])
+    run(True)
+    assert [[t["txn"]["aamt"] for t in g] for g in acl.sent[1:]] == [[2]]
+    assert encoding.encode_address(acl.sent[1][0]["txn"]["arcv"]) == receivers[1]
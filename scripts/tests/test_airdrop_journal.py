@@ -0,0 +1,56 @@
+import os
+import sys
+import sqlite3
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from airdrop_journal import AirdropJournal, RowRanges, CONFIRMED, FAILED, SUBMITTED, UNKNOWN
+
+def test_row_ranges_merge_and_lookup():
+    r = RowRanges([(10, 19), (0, 9), (40, 45)])
+    assert 0 in r and 19 in r and 42 in r
+    assert 20 not in r and 46 not in r and -1 not in r
+    assert len(r) == 26
+
+def test_journal_latest_status_and_covered_rows(tmp_path):
+    path = str(tmp_path / "j.sqlite")
+    j = AirdropJournal(path)
+    j.record_submitted(0, range(0, 16), ["T0", "T1"], 100)
+    j.record_submitted(1, range(16, 32), ["T2"], 100)
+    j.record_submitted(2, range(32, 41), ["T3"], 100)
+    j.record_submitted(3, range(41, 51), ["T4"], 100)
+    j.record_result(0, CONFIRMED, confirmed_round=90)
+    j.record_result(1, FAILED, detail="overspend")
+    j.record_result(3, UNKNOWN)
+    j.close()
+
+    j = AirdropJournal(path)
+    assert [(g.group_index, g.status) for g in j.groups()] == [(0, CONFIRMED), (1, FAILED), (2, SUBMITTED), (3, UNKNOWN)]
+    assert j.groups()[0].txids == ["T0", "T1"]
+    covered = j.covered_rows()
+    assert 0 in covered and 15 in covered
+    assert 16 not in covered and 31 not in covered  # failed rows are resent
+    assert 35 in covered and 50 in covered
+    assert j.next_group_index() == 4
+
+def test_covered_rows_are_the_rows_each_group_paid(tmp_path):
+    j = AirdropJournal(str(tmp_path / "j.sqlite"))
+    j.record_submitted(0, [0, 1, 4, 5, 7], ["T0"], 100)  # rows 2, 3 and 6 were skipped, e.g. not opted in
+    j.record_result(0, CONFIRMED, confirmed_round=90)
+    g = j.groups()[0]
+    assert (g.first_row, g.last_row, g.rows) == (0, 7, [(0, 1), (4, 5), (7, 7)])
+    covered = j.covered_rows()
+    assert [r for r in range(9) if r in covered] == [0, 1, 4, 5, 7]
+
+def test_journal_without_exact_rows_falls_back_to_its_range(tmp_path):
+    path = str(tmp_path / "j.sqlite")
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE entries (seq INTEGER PRIMARY KEY AUTOINCREMENT, group_index INTEGER NOT NULL, status TEXT NOT NULL,
+                              first_row INTEGER, last_row INTEGER, txids TEXT, last_valid INTEGER,
+                              confirmed_round INTEGER, detail TEXT, created REAL NOT NULL);
+        INSERT INTO entries (group_index, status, first_row, last_row, txids, last_valid, created) VALUES (0, 'submitted', 3, 6, 'T0', 100, 0);
+    """)
+    db.close()
+    j = AirdropJournal(path)
+    assert j.groups()[0].rows == [(3, 6)] and len(j.covered_rows()) == 4
+    j.record_submitted(1, [8, 10], ["T1"], 100)
+    assert j.covered_rows().ranges() == [(3, 6), (8, 8), (10, 10)]
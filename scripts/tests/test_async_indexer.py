@@ -0,0 +1,52 @@
+import os
+import sys
+import asyncio
+import httpx
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import ratelimit
+from ratelimit import Limits, RetryPolicy
+from async_indexer import AsyncIndexerClient, IndexerHTTPError
+
+def client_with(handler, **kwargs):
+    c = AsyncIndexerClient("tok", "http://indexer.test", headers={"X-API-Key": "k"}, limits=Limits(1000, 1000, 1000), **kwargs)
+    c._http = httpx.AsyncClient(base_url=c.indexer_address, headers=c._http.headers, transport=httpx.MockTransport(handler))
+    return c
+
+def test_search_maps_sdk_keywords_and_retries_429(monkeypatch):
+    seen = []
+    async def no_sleep(_):
+        pass
+    monkeypatch.setattr(ratelimit.asyncio, "sleep", no_sleep)
+    def handler(request):
+        seen.append(request)
+        if len(seen) == 1:
+            return httpx.Response(429, headers={"Retry-After": "2"}, json={"message": "slow down"})
+        return httpx.Response(200, json={"current-round": 9, "transactions": []})
+    async def run():
+        c = client_with(handler)
+        try:
+            return await c.search_transactions(address="ESC", address_role="receiver", txn_type="pay", min_round=5, next_page=None)
+        finally:
+            await c.aclose()
+    assert asyncio.run(run())["current-round"] == 9
+    assert len(seen) == 2
+    q = dict(seen[-1].url.params)
+    assert q == {"address": "ESC", "address-role": "receiver", "tx-type": "pay", "min-round": "5"}
+    assert seen[-1].headers["X-Indexer-API-Token"] == "tok" and seen[-1].headers["X-API-Key"] == "k"
+
+def test_client_errors_are_not_retried():
+    calls = []
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"message": "bad address"})
+    async def run():
+        c = client_with(handler, policy=RetryPolicy(max_retries=3))
+        try:
+            await c.search_transactions(address="x")
+        finally:
+            await c.aclose()
+    with pytest.raises(IndexerHTTPError) as err:
+        asyncio.run(run())
+    assert err.value.code == 400 and "bad address" in str(err.value)
+    assert len(calls) == 1
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# the backend reads its settings at import time; the indexer is replaced with a fake below
+os.environ.setdefault("INDEXER_ADDRESS", "http://127.0.0.1:1")
+os.environ.setdefault("INDEXER_TOKEN", "test")
+os.environ.setdefault("ESCROW_ADDRESS", "ESCROW")
+os.environ.setdefault("DEPOSIT_DB", os.path.join(tempfile.mkdtemp(), "deposits.sqlite"))
+os.environ.setdefault("DEPOSIT_SYNC_INTERVAL", "3600")  # one pass at startup, then the tests drive the state
+from fastapi.testclient import TestClient
+import backend_fastapi as backend
+from deposit_store import DepositStore, DepositRow
+from response_cache import RoundCache
+from test_deposit_store import FakeIndexer, pay
+
+ESCROW = backend.ESCROW_ADDRESS
+
+@pytest.fixture
+def fake(tmp_path):
+    idx = FakeIndexer([pay(i, 5 + i, receiver=ESCROW) for i in range(1, 4)], current=10, page_size=1000)
+    idx.aclose = lambda: asyncio.sleep(0)
+    store = DepositStore(str(tmp_path / "d.sqlite"))
+    store.track(ESCROW)
+    syncer = backend.deposit_syncer
+    backend.deposit_store = syncer.store = store
+    backend.response_cache = RoundCache()
+    syncer.client, syncer.tip, syncer.last_sync, syncer.last_error = idx, None, None, None
+    syncer._outcomes.clear()
+    return idx
+
+def wait_for_pass(timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not backend.deposit_syncer._outcomes and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_health_and_ready_follow_the_syncer(fake):
+    with TestClient(backend.app) as client:
+        wait_for_pass()
+        assert client.get("/health").status_code == 200
+        r = client.get("/ready")
+        assert r.status_code == 200 and r.json()["lag_rounds"] == 0
+
+        # an escrow added at runtime backfills without taking the instance out of rotation
+        backend.deposit_store.track("NEW")
+        r = client.get("/ready")
+        assert r.status_code == 200 and r.json()["backfilling"] == ["NEW"] and r.json()["synced_round"] == 10
+
+        backend.deposit_syncer.tip = 10 + backend.READY_MAX_LAG + 1
+        r = client.get("/ready")
+        assert r.status_code == 503 and r.json()["problems"] == [f"{backend.READY_MAX_LAG + 1} rounds behind the indexer"]
+    # lifespan over: the follower is stopped
+    assert TestClient(backend.app).get("/health").status_code == 503
+
+def test_ready_before_any_successful_sync(fake):
+    async def down():
+        raise ConnectionError("indexer down")
+    fake.health = down
+    with TestClient(backend.app) as client:
+        wait_for_pass()
+        assert client.get("/health").status_code == 200
+        r = client.get("/ready")
+        assert r.status_code == 503
+        assert r.json()["problems"] == ["no successful sync yet"] and r.json()["last_error"] == "indexer down"
+
+def test_metrics_exposes_sync_state_and_request_timings(fake):
+    with TestClient(backend.app) as client:
+        wait_for_pass()
+        client.get("/health")
+        r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    assert "indexer_tip_round 10" in r.text.splitlines()
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in r.text
+
+def test_cached_latest_follows_its_own_escrows_round(fake):
+    store = backend.deposit_store
+    store.add([DepositRow("T1", ESCROW, "S", 10, 10, 1010, 0)])
+    store.refresh_latest(ESCROW)
+    store.set_synced(ESCROW, 10)
+    client = TestClient(backend.app)
+    assert [d["txid"] for d in client.get("/deposits/latest").json()["deposits"]] == ["T1"]
+    # another escrow syncs further first; that must not pin a body to its round
+    store.track("NEW")
+    store.set_synced("NEW", 50)
+    assert [d["txid"] for d in client.get("/deposits/latest").json()["deposits"]] == ["T1"]
+    store.add([DepositRow("T2", ESCROW, "S", 20, 11, 1011, 0)])
+    store.refresh_latest(ESCROW)
+    store.set_synced(ESCROW, 11)
+    assert [d["txid"] for d in client.get("/deposits/latest").json()["deposits"]] == ["T2", "T1"]
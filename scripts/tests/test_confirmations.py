@@ -0,0 +1,73 @@
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from confirmations import ConfirmationService, CONFIRMED, FAILED, UNKNOWN
+
+class ChainACL:
+    """Fake algod with a scripted block per round."""
+    def __init__(self, blocks, round=100, block_txids=True, pending=None):
+        self.round = round
+        self.blocks = blocks
+        self.block_txids = block_txids
+        self.pending = pending or {}
+        self.calls = {"status": 0, "after": 0, "txids": 0, "pending": 0}
+    def status(self):
+        self.calls["status"] += 1
+        return {"last-round": self.round}
+    def status_after_block(self, rnd):
+        self.calls["after"] += 1
+        self.round = rnd + 1
+        return {"last-round": self.round}
+    def algod_request(self, method, path, **kwargs):
+        self.calls["txids"] += 1
+        if not self.block_txids:
+            raise RuntimeError("404 page not found")
+        return {"blockTxids": self.blocks.get(int(path.split("/")[2]), [])}
+    def pending_transaction_info(self, txid):
+        self.calls["pending"] += 1
+        if txid not in self.pending:
+            raise RuntimeError("txn not found")
+        return self.pending[txid]
+
+def test_one_block_fetch_resolves_every_txid_in_the_round():
+    txids = [f"T{i}" for i in range(50)]
+    acl = ChainACL({101: txids[:30], 102: txids[30:]})
+    svc = ConfirmationService(acl)
+    for t in txids:
+        assert svc.track(t, 1000) is None
+    first = svc.poll()
+    second = svc.poll()
+    assert {r.txid for r in first} == set(txids[:30]) and {r.confirmed_round for r in first} == {101}
+    assert {r.txid for r in second} == set(txids[30:]) and len(svc) == 0
+    assert acl.calls["pending"] == 0
+    # the round current at tracking time is scanned too, then one fetch per new round
+    assert acl.calls["after"] == 2 and acl.calls["txids"] == 3
+
+def test_expiry_pool_error_and_unknown():
+    acl = ChainACL({}, pending={"REJ": {"pool-error": "overspend"}})
+    svc = ConfirmationService(acl, stale_rounds=1)
+    svc.track("EXP", 101)
+    svc.track("REJ", 1000)
+    got = {r.txid: r for r in svc.poll() + svc.poll()}
+    assert got["REJ"].status == FAILED and got["REJ"].reason == "overspend"
+    assert got["EXP"].status == FAILED and "expired" in got["EXP"].reason
+    # without the block txids endpoint an expired, pruned txid cannot be proven either way
+    acl = ChainACL({}, block_txids=False)
+    svc = ConfirmationService(acl)
+    svc.track("GONE", 100)
+    assert [r.status for r in svc.poll()] == [UNKNOWN]
+
+def test_wait_for_returns_pending_info_and_raises_on_failure():
+    acl = ChainACL({101: ["A"]}, pending={"A": {}, "B": {}})
+    svc = ConfirmationService(acl)
+    orig = acl.status_after_block
+    def after(rnd):
+        res = orig(rnd)
+        if res["last-round"] == 101:
+            acl.pending["A"] = {"confirmed-round": 101, "asset-index": 7}
+        return res
+    acl.status_after_block = after
+    assert svc.wait_for("A", 1000)["asset-index"] == 7
+    with pytest.raises(RuntimeError):
+        ConfirmationService(acl).wait_for("B", acl.round)
@@ -0,0 +1,78 @@
+import os
+import sys
+import base64
+import io
+import threading
+import msgpack
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from algosdk import account as _account
+from algosdk.error import AlgodHTTPError
+from algosdk.future.transaction import SignedTransaction
+from test_airdrop_batch import PipelineACL
+from create_asa import AssetSpec, create_assets, load_manifest
+
+class AssetACL(PipelineACL):
+    """PipelineACL that numbers created assets like the ledger's txn counter."""
+    def __init__(self, reject_group=None, code=400):
+        super().__init__()
+        self.counter = 1000
+        self.asset_ids = {}
+        self.reject_group = reject_group
+        self.code = code
+        self.lock = threading.Lock()
+        self.attempts = 0
+    def send_raw_transaction(self, blob_b64):
+        group = list(msgpack.Unpacker(io.BytesIO(base64.b64decode(blob_b64)), raw=False))
+        with self.lock:   # a group's txns are applied back to back
+            self.attempts += 1
+            if self.attempts - 1 == self.reject_group and self.code < 500:
+                raise AlgodHTTPError("overspend", self.code)
+            for t in group:
+                self.counter += 1
+                self.asset_ids[SignedTransaction.undictify(t).get_txid()] = self.counter
+            sent = super().send_raw_transaction(blob_b64)
+            if self.attempts - 1 == self.reject_group:
+                raise AlgodHTTPError("bad gateway", self.code)  # accepted, but the answer is lost
+            return sent
+    def pending_transaction_info(self, txid):
+        info = super().pending_transaction_info(txid)
+        if info:
+            info["asset-index"] = self.asset_ids[txid]
+        return info
+
+def test_manifest_assets_are_created_in_groups_with_ids():
+    sk, addr = _account.generate_account()
+    specs = [AssetSpec(f"Token {i}", f"T{i}", 1000 + i) for i in range(37)]
+    acl = AssetACL()
+    results = create_assets(acl, addr, sk, specs, concurrency=3)
+    assert sorted(len(g) for g in acl.sent) == [5, 16, 16]   # groups go out concurrently
+    assert [r.status for r in results] == ["confirmed"] * 37
+    assert [r.asset_id for r in results] == [acl.asset_ids[r.txid] for r in results]
+    assert len({r.asset_id for r in results}) == 37
+    sent = [t["txn"] for g in acl.sent for t in g]
+    assert sorted(t["apar"]["un"] for t in sent) == sorted(s.unit for s in specs)
+
+def test_rejected_group_is_reported_without_ids():
+    sk, addr = _account.generate_account()
+    specs = [AssetSpec(f"Token {i}", f"T{i}", 1) for i in range(6)]
+    results = create_assets(AssetACL(reject_group=1), addr, sk, specs, group_size=3, concurrency=1)
+    assert [r.status for r in results] == ["confirmed"] * 3 + ["failed"] * 3
+    assert results[3].asset_id is None and "overspend" in results[3].reason
+
+def test_gateway_error_after_accept_is_followed_not_failed():
+    sk, addr = _account.generate_account()
+    specs = [AssetSpec("Same", "SAME", 1)] * 4   # identical entries must still get distinct txids
+    acl = AssetACL(reject_group=1, code=502)
+    results = create_assets(acl, addr, sk, specs, group_size=1, concurrency=1)
+    assert [r.status for r in results] == ["confirmed"] * 4
+    assert len({r.txid for r in results}) == 4 and all(r.asset_id for r in results)
+
+def test_load_manifest_csv_and_validation(tmp_path):
+    good = tmp_path / "assets.csv"
+    good.write_text("name,unit,total,decimals,url,default_frozen\nGold,GLD,100,2,https://x.io/g.json,true\nSilver,SLV,50,,,\n")
+    assert load_manifest(str(good)) == [AssetSpec("Gold", "GLD", 100, 2, "https://x.io/g.json", True), AssetSpec("Silver", "SLV", 50)]
+    bad = tmp_path / "assets.json"
+    bad.write_text('[{"name": "Fine", "unit": "FINE", "total": 1}, {"name": "Far too long unit", "unit": "TOOLONGUNIT", "total": 0}]')
+    with pytest.raises(SystemExit):
+        load_manifest(str(bad))
@@ -0,0 +1,158 @@
+import os
+import sys
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from deposit_store import DepositStore, DepositSyncer
+
+ESCROW = "ESCROW"
+
+def pay(i, rnd, receiver=ESCROW, sender="S"):
+    return {"id": f"T{i}", "sender": sender, "confirmed-round": rnd, "round-time": 1000 + rnd,
+            "intra-round-offset": i, "payment-transaction": {"receiver": receiver, "amount": i * 10}}
+
+class FakeIndexer:
+    """Pages payments matching the address/round filters."""
+    def __init__(self, txns, current, page_size=2):
+        self.txns = txns
+        self.page_size = page_size
+        self.current = current
+        self.calls = []
+    async def health(self):
+        return {"round": self.current}
+    async def search_transactions(self, **params):
+        self.calls.append(params)
+        hits = [t for t in self.txns if params["min_round"] <= t["confirmed-round"] <= (params.get("max_round") or self.current)
+                and params.get("address") in (None, t["payment-transaction"]["receiver"])]
+        start = int(params.get("next_page") or 0)
+        page = hits[start:start + self.page_size]
+        resp = {"current-round": self.current, "transactions": page}
+        if start + self.page_size < len(hits):
+            resp["next-token"] = str(start + self.page_size)
+        return resp
+
+def test_sync_pages_incrementally_and_serves_latest_from_memory(tmp_path, monkeypatch):
+    import deposit_store
+    monkeypatch.setattr(deposit_store, "PAGE_LIMIT", 2)
+    store = DepositStore(str(tmp_path / "d.sqlite"))
+    idx = FakeIndexer([pay(1, 5), pay(2, 5), pay(3, 6, receiver="OTHER"), pay(4, 7)], current=8)
+    syncer = DepositSyncer(idx, store, [ESCROW])
+    assert asyncio.run(syncer.sync_once()) == 3
+    assert [d["txid"] for d in store.latest(ESCROW, 10)] == ["T4", "T2", "T1"]
+    assert store.latest(ESCROW, 1) == [{"txid": "T4", "sender": "S", "amount": 40, "round": 7}]
+    assert store.synced_round(ESCROW) == 8
+    # the next sync only asks for rounds after the last synced one
+    idx.txns.append(pay(5, 9))
+    idx.current = 9
+    assert asyncio.run(syncer.sync_once()) == 1
+    assert (idx.calls[-1]["min_round"], idx.calls[-1]["max_round"]) == (9, 9)
+    assert store.count() == 4
+    store.close()
+    # a restarted backend serves the stored rows before its first sync
+    reopened = DepositStore(str(tmp_path / "d.sqlite"))
+    assert reopened.latest(ESCROW, 1)[0]["txid"] == "T5"
+
+def test_failed_sync_keeps_serving_stored_deposits(tmp_path):
+    store = DepositStore(str(tmp_path / "d.sqlite"))
+    asyncio.run(DepositSyncer(FakeIndexer([pay(1, 5)], current=5), store, [ESCROW]).sync_once())
+    class Down:
+        async def health(self):
+            raise ConnectionError("indexer down")
+    syncer = DepositSyncer(Down(), store, interval=0.01)
+    async def run():
+        syncer.start()
+        for _ in range(100):
+            if syncer.last_error:
+                break
+            await asyncio.sleep(0.01)
+        status = syncer.status()
+        await syncer.close()
+        return status
+    status = asyncio.run(run())
+    assert "indexer down" in syncer.last_error
+    assert [d["txid"] for d in store.latest(ESCROW, 10)] == ["T1"]
+    # health is reported from the follower's own passes
+    assert status["running"] and status["error_rate"] == 1.0 and status["synced_round"] == 5
+    assert status["last_sync_age"] is None and not syncer.status()["running"]
+
+def test_keyset_pages_walk_history_with_filters(tmp_path):
+    from deposit_store import DepositRow, encode_cursor, decode_cursor
+    store = DepositStore(str(tmp_path / "d.sqlite"))
+    store.add([DepositRow(f"T{r}-{i}", ESCROW, "A" if i % 2 else "B", 1, r, 1000 + r * 4, i) for r in range(1, 51) for i in range(3)])
+    store.add([DepositRow("X", "OTHER", "A", 1, 10, 1040, 9)])
+    seen, after = [], None
+    while True:
+        rows, after = store.page(ESCROW, 7, after=after)
+        seen.extend(rows)
+        if after is None:
+            break
+        after = decode_cursor(encode_cursor(*after))
+    keys = [(r.round, r.intra) for r in seen]
+    assert len(seen) == 150 and keys == sorted(keys, reverse=True)
+    rows, _ = store.page(ESCROW, 100, min_round=10, max_round=12, sender="A", ascending=True)
+    assert [(r.round, r.intra) for r in rows] == [(10, 1), (11, 1), (12, 1)]
+    # round_time 1080..1088 covers rounds 20..22
+    rows, _ = store.page(ESCROW, 100, start_time=1080, end_time=1088)
+    assert {r.round for r in rows} == {20, 21, 22}
+    assert store.page(ESCROW, 10, start_time=99999) == ([], None)
+
+def test_rollups_track_inserts_and_match_a_rebuild(tmp_path):
+    from deposit_store import DepositRow, ROUND_BUCKET
+    store = DepositStore(str(tmp_path / "d.sqlite"))
+    rows = [DepositRow(f"T{i}", ESCROW, "AB"[i % 2], 10 * (i + 1), i * 400, 0, 0) for i in range(6)]
+    store.add(rows[:4])
+    store.add(rows[2:])          # overlap is not counted twice
+    store.add([DepositRow("X", "OTHER", "A", 5, 1, 0, 0)])
+    stats = store.stats(ESCROW, sender="A", buckets=10, top=1)
+    assert (stats["count"], stats["total"], stats["senders"]) == (6, 210, 2)
+    assert (stats["first_round"], stats["last_round"]) == (0, 2000)
+    assert stats["top_senders"] == [{"sender": "B", "count": 3, "total": 120, "first_round": 400, "last_round": 2000}]
+    assert stats["sender"] == {"sender": "A", "count": 3, "total": 90, "first_round": 0, "last_round": 1600}
+    assert [(b["first_round"], b["count"], b["total"]) for b in stats["buckets"]] == \
+        [(2 * ROUND_BUCKET, 1, 60), (ROUND_BUCKET, 2, 90), (0, 3, 60)]
+    store.rebuild_stats()
+    assert store.stats(ESCROW, sender="A", buckets=10, top=1) == stats
+
+def test_one_search_per_pass_serves_every_followed_escrow(tmp_path, monkeypatch):
+    import deposit_store
+    monkeypatch.setattr(deposit_store, "PAGE_LIMIT", 10)
+    store = DepositStore(str(tmp_path / "d.sqlite"))
+    escrows = [f"E{i}" for i in range(5)]
+    idx = FakeIndexer([pay(i, 10 + i, receiver=e) for i, e in enumerate(escrows)], current=20, page_size=10)
+    syncer = DepositSyncer(idx, store, escrows, scan_min=5)
+    asyncio.run(syncer.sync_once())                  # first pass backfills each escrow by address
+    assert store.count() == 5 and len(idx.calls) == 5
+    idx.calls.clear()
+    idx.txns += [pay(10 + i, 21, receiver=e) for i, e in enumerate(escrows)] + [pay(99, 21, receiver="STRANGER")]
+    idx.current = 21
+    assert asyncio.run(syncer.sync_once()) == 5
+    assert len(idx.calls) == 1 and "address" not in idx.calls[0]
+    assert [store.latest(e, 1)[0]["round"] for e in escrows] == [21] * 5
+    # escrows can be added and removed at runtime; a new one catches up on its own
+    idx.txns.append(pay(50, 3, receiver="NEW"))
+    assert store.track("NEW") and store.untrack("E0") and not store.untrack("E0")
+    idx.calls.clear()
+    asyncio.run(syncer.sync_once())
+    assert [c.get("address") for c in idx.calls] == ["NEW"]   # the others are already at the tip
+    assert store.latest("NEW", 5)[0]["txid"] == "T50" and "E0" not in store.escrows
+
+def test_few_escrows_follow_by_address(tmp_path, monkeypatch):
+    import deposit_store
+    monkeypatch.setattr(deposit_store, "PAGE_LIMIT", 10)
+    store = DepositStore(str(tmp_path / "d.sqlite"))
+    idx = FakeIndexer([pay(1, 5)], current=8, page_size=10)
+    syncer = DepositSyncer(idx, store, [ESCROW])
+    asyncio.run(syncer.sync_once())
+    idx.calls.clear()
+    idx.txns += [pay(2, 9), pay(3, 9, receiver="OTHER")]
+    idx.current = 9
+    assert asyncio.run(syncer.sync_once()) == 1
+    assert [(c.get("address"), c["min_round"], c.get("max_round")) for c in idx.calls] == [(ESCROW, 9, 9)]
+    idx.calls.clear()
+    assert asyncio.run(syncer.sync_once()) == 0 and idx.calls == []  # already at the tip
+
+def test_short_pages_with_a_next_token_keep_paging(tmp_path):
+    store = DepositStore(str(tmp_path / "d.sqlite"))
+    idx = FakeIndexer([pay(i, 5 + i) for i in range(1, 6)], current=20, page_size=2)  # capped far below PAGE_LIMIT
+    syncer = DepositSyncer(idx, store, [ESCROW])
+    assert asyncio.run(syncer.sync_once()) == 5
+    assert len(idx.calls) == 3 and store.count() == 5
@@ -0,0 +1,60 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from algosdk.future.transaction import PaymentTxn, AssetTransferTxn, SuggestedParams
+from escrow_eval import EscrowProgram, UnsupportedProgram, ZERO_ADDRESS
+import pytest
+
+ADMIN = "TZX4JBXBLO6JDAGQX4XTGZ5F77CR4PEU6L3IK6CELKEIML3HKXTR4CKYXM"
+OTHER = "LDVQXDDKSFHPAEEZA2HES6V5GGHT4LZJAGJBBTZT7CA2VOKSZ6CTV3XIA4"
+SP = SuggestedParams(1000, 1, 100, "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=", flat_fee=True)
+
+PROGRAM = f"""#pragma version 5
+txn TypeEnum
+int pay
+==
+txn GroupIndex
+int 0
+==
+&&
+txn RekeyTo
+global ZeroAddress
+==
+&&
+txn Receiver
+addr {ADMIN}
+==
+txn CloseRemainderTo
+global ZeroAddress
+==
+txn CloseRemainderTo
+addr {ADMIN}
+==
+||
+&&
+&&
+return
+"""
+
+def test_reports_each_failed_condition():
+    prog = EscrowProgram(PROGRAM)
+    assert prog.check(PaymentTxn(OTHER, SP, ADMIN, 5))
+    assert prog.check(PaymentTxn(OTHER, SP, ADMIN, 5, close_remainder_to=ADMIN))
+    bad = prog.check(PaymentTxn(OTHER, SP, OTHER, 5, rekey_to=OTHER), group_index=1)
+    assert not bad and bad.error is None
+    assert bad.failed == ("line 7: txn GroupIndex == int 0", "line 11: txn RekeyTo == global ZeroAddress",
+                          f"line 15: txn Receiver == addr {ADMIN}")
+    close = prog.check(PaymentTxn(OTHER, SP, ADMIN, 5, close_remainder_to=OTHER))
+    assert len(close.failed) == 1 and "||" in close.failed[0]
+    # an asset transfer has no pay Receiver, so that reads as the zero address too
+    assert prog.check(AssetTransferTxn(OTHER, SP, ADMIN, 1, 7)).failed == ("line 4: txn TypeEnum == int pay",
+                                                                          f"line 15: txn Receiver == addr {ADMIN}")
+    assert [v.approved for v in prog.check_many([{"TypeEnum": 1, "Receiver": ADMIN}, {"TypeEnum": 1, "Receiver": ZERO_ADDRESS}])] == [True, False]
+
+def test_program_errors_and_unsupported_opcodes():
+    underflow = EscrowProgram("#pragma version 5\nint 1\n&&\n")
+    assert underflow.check(PaymentTxn(OTHER, SP, ADMIN, 5)).error == "line 3: stack underflow at &&"
+    mismatch = EscrowProgram(f"txn Receiver\nint 1\n==\n")
+    assert "type mismatch" in mismatch.check({"Receiver": ADMIN}).error
+    with pytest.raises(UnsupportedProgram):
+        EscrowProgram("int 1\nsha256\n")
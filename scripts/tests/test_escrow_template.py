@@ -0,0 +1,41 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from algosdk import logic
+from algosdk.future.transaction import PaymentTxn, SuggestedParams
+from escrow_eval import ESCROW_TEAL, EscrowProgram, UnsupportedProgram
+from escrow_template import assemble, build_escrow, derive_escrows, parse_sales, render_escrow
+import pytest
+
+ADMIN = "TZX4JBXBLO6JDAGQX4XTGZ5F77CR4PEU6L3IK6CELKEIML3HKXTR4CKYXM"
+PAYOUT = "LDVQXDDKSFHPAEEZA2HES6V5GGHT4LZJAGJBBTZT7CA2VOKSZ6CTV3XIA4"
+SP = SuggestedParams(1000, 1, 100, "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=", flat_fee=True)
+
+def test_shipped_escrow_is_the_rendered_template():
+    with open(ESCROW_TEAL, encoding="utf-8") as f:
+        assert f.read() == render_escrow(ADMIN)
+    prog = EscrowProgram.from_file()
+    assert prog.check(PaymentTxn(PAYOUT, SP, ADMIN, 5))
+    assert not prog.check(PaymentTxn(PAYOUT, SP, PAYOUT, 5))
+
+def test_per_sale_escrows_have_distinct_valid_programs():
+    escrows = derive_escrows(ADMIN, parse_sales("1-3,10"), receivers=[PAYOUT])
+    assert [e.sale for e in escrows] == [1, 2, 3, 10]
+    assert len({e.address for e in escrows}) == 4
+    for e in escrows:
+        assert logic.check_program(e.program)
+        assert logic.address(e.program) == e.address
+        prog = EscrowProgram(e.source)
+        assert prog.check(PaymentTxn(e.address, SP, PAYOUT, 1)) and prog.check(PaymentTxn(e.address, SP, ADMIN, 1))
+        assert prog.check(PaymentTxn(e.address, SP, PAYOUT, 1, close_remainder_to=PAYOUT)).failed
+    # the same inputs always give the same address
+    assert build_escrow(ADMIN, [PAYOUT], sale=2).address == escrows[1].address
+
+def test_assembler_encoding_and_errors():
+    assert assemble("#pragma version 5\nint 1\nreturn\n") == bytes([5, 0x20, 1, 1, 0x22, 0x43])
+    with pytest.raises(UnsupportedProgram):
+        assemble("#pragma version 2\nint 1\nassert\nint 1\n")   # assert is v3+
+    with pytest.raises(UnsupportedProgram):
+        assemble("int 1\n")
+    with pytest.raises(ValueError):
+        render_escrow("not-an-address")
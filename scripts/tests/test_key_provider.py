@@ -0,0 +1,51 @@
+import os
+import sys
+import json
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from algosdk import account, mnemonic
+from algosdk.future.transaction import PaymentTxn, SuggestedParams
+from key_provider import KeyProvider, MnemonicKeyProvider, load_key_provider
+
+PARAMS = SuggestedParams(fee=1000, first=1, last=1000, gh="SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=", flat_fee=True)
+
+def _accounts(n):
+    return [account.generate_account() for _ in range(n)]
+
+def test_mnemonic_file_with_comments(tmp_path):
+    accts = _accounts(2)
+    path = tmp_path / "custodial.keys"
+    path.write_text("# sub-accounts\n" + "\n".join(mnemonic.from_private_key(sk) + "  # hot" for sk, _ in accts) + "\n\n")
+    keys = load_key_provider(str(path))
+    assert sorted(keys.addresses()) == sorted(a for _, a in accts)
+    assert not keys.has(account.generate_account()[1])
+    sk, addr = accts[0]
+    txn = PaymentTxn(addr, PARAMS, addr, 0)
+    assert keys.sign(txn).signature == txn.sign(sk).signature
+
+def test_json_object_must_match_addresses(tmp_path):
+    (sk1, a1), (sk2, a2) = _accounts(2)
+    ok = tmp_path / "ok.json"
+    ok.write_text(json.dumps({a1: mnemonic.from_private_key(sk1)}))
+    assert load_key_provider(str(ok)).has(a1)
+    bad = tmp_path / "bad.json"
+    bad.write_text(json.dumps({a2: mnemonic.from_private_key(sk1)}))
+    with pytest.raises(ValueError):
+        load_key_provider(str(bad))
+
+def test_factory_spec(monkeypatch):
+    sk, addr = account.generate_account()
+    mod = type(sys)("custodial_signer")
+    mod.make = lambda: MnemonicKeyProvider({addr: sk})
+    monkeypatch.setitem(sys.modules, "custodial_signer", mod)
+    assert load_key_provider("custodial_signer:make").has(addr)
+    mod.bogus = lambda: object()
+    with pytest.raises(ValueError):
+        load_key_provider("custodial_signer:bogus")
+
+def test_incomplete_provider_fails_when_created():
+    class NoSign(KeyProvider):
+        def addresses(self):
+            return []
+    with pytest.raises(TypeError):
+        NoSign()
@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from metrics import Registry, route
+from ratelimit import REQUEST_FAILURES, REQUEST_RETRIES, REQUEST_SECONDS, RetryPolicy, TokenBucket, Limits, call_with_retries
+
+class Throttled(Exception):
+    code = 429
+    retry_after = None
+
+def test_text_exposition_and_json_dump(tmp_path):
+    reg = Registry()
+    calls = reg.counter("calls_total", "Calls", ("host",))
+    latency = reg.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    live = reg.gauge("live", "Live")
+    calls.inc(host='a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+    reg.register_collector(lambda: live.set(3))
+    text = reg.render_text()
+    assert 'calls_total{host="a\\"b"} 1' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text and "latency_seconds_sum 5.55" in text
+    assert "live 3" in text
+    path = str(tmp_path / "m.json")
+    reg.write(path)
+    snap = json.load(open(path))
+    assert snap["latency_seconds"][0]["count"] == 3 and snap["live"][0]["value"] == 3
+
+def test_route_collapses_ids():
+    assert route("/v2/accounts/" + "A" * 58 + "?format=msgpack") == "/v2/accounts/:id"
+    assert route("/status/wait-for-block-after/1234") == "/status/wait-for-block-after/:id"
+    assert route("/transactions/params") == "/transactions/params"
+
+def test_retries_and_failures_are_counted():
+    bucket = TokenBucket(Limits(1000, 1000, 1000), name="metrics-test")
+    attempts = []
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Throttled()
+        return "ok"
+    assert call_with_retries(flaky, bucket, RetryPolicy(max_retries=3, base=0, cap=0), call="GET /status") == "ok"
+    assert REQUEST_RETRIES.value(host="metrics-test", reason="429") == 2
+    assert REQUEST_SECONDS.count(host="metrics-test", call="GET /status") == 3
+    try:
+        call_with_retries(lambda: (_ for _ in ()).throw(ValueError("bad")), bucket, call="POST /transactions")
+    except ValueError:
+        pass
+    assert REQUEST_FAILURES.value(host="metrics-test", call="POST /transactions") == 1
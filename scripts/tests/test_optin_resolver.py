@@ -0,0 +1,58 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from optin_resolver import resolve_optins
+
+class CountingACL:
+    def __init__(self, opted, last_round=100):
+        self.opted = set(opted)
+        self.last_round = last_round
+        self.calls = []
+    def status(self):
+        return {"last-round": self.last_round}
+    def account_info(self, addr):
+        self.calls.append(addr)
+        if addr == "BROKEN":
+            raise RuntimeError("boom")
+        assets = [{"asset-id": 7, "amount": 0}] if addr in self.opted else []
+        return {"round": self.last_round, "assets": assets}
+
+def test_resolve_optins_dedups_and_preserves_order():
+    acl = CountingACL({"A", "C"})
+    rows = [("A", 1), ("B", 2), ("A", 3), ("C", 4), ("BROKEN", 5)]
+    will_send, skipped = resolve_optins(acl, rows, 7, workers=4)
+    assert will_send == [("A", 1), ("A", 3), ("C", 4)]
+    assert skipped == [("B", 2), ("BROKEN", 5)]
+    assert sorted(acl.calls) == ["A", "B", "BROKEN", "C"]
+
+def test_resolve_optins_reuses_cached_optins(tmp_path):
+    cache = str(tmp_path / "optin.sqlite")
+    rows = [("A", 1), ("B", 2)]
+    resolve_optins(CountingACL({"A"}), rows, 7, cache_path=cache)
+
+    # rerun: A is served from the cache, B (not opted in last time) is re-checked
+    acl = CountingACL({"A", "B"}, last_round=150)
+    will_send, skipped = resolve_optins(acl, rows, 7, cache_path=cache, max_age_rounds=100)
+    assert acl.calls == ["B"]
+    assert will_send == rows and skipped == []
+
+    # too old for the age window: looked up again
+    acl = CountingACL({"A", "B"}, last_round=5000)
+    resolve_optins(acl, rows, 7, cache_path=cache, max_age_rounds=100)
+    assert sorted(acl.calls) == ["A", "B"]
+
+def test_shared_cache_reads_only_the_chunks_addresses(tmp_path):
+    from optin_resolver import OptinCache, QUERY_CHUNK
+    cache = OptinCache(str(tmp_path / "optin.sqlite"))
+    many = [f"ADDR{i}" for i in range(QUERY_CHUNK * 2 + 5)]
+    cache.put_many(7, [(a, 100, True) for a in many] + [("OTHER", 100, True), ("OLD", 10, True)])
+    assert cache.opted_in_since(7, 50, many[:3] + ["OLD", "NEW"]) == set(many[:3])
+    assert cache.opted_in_since(7, 50, many) == set(many)  # spans several IN (...) batches
+
+    acl = CountingACL({"NEW"}, last_round=100)
+    acl.status = None  # `now` is passed in, so no status call is made
+    will_send, skipped = resolve_optins(acl, [(many[0], 1), ("NEW", 2), ("NONE", 3)], 7, cache=cache, now=100)
+    assert sorted(acl.calls) == ["NEW", "NONE"]
+    assert will_send == [(many[0], 1), ("NEW", 2)] and skipped == [("NONE", 3)]
+    assert cache.opted_in_since(7, 50, ["NEW"]) == {"NEW"}  # still open and written to
+    cache.close()
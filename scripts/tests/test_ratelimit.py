@@ -0,0 +1,63 @@
+import os
+import sys
+import urllib.error
+from email.message import Message
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import ratelimit
+from ratelimit import Limits, TokenBucket, RetryPolicy, call_with_retries, http_status, limits_for, parse_limits
+
+def sdk_error(code, retry_after=None):
+    """Raise the way algosdk does: its own error while handling urllib's HTTPError."""
+    hdrs = Message()
+    if retry_after is not None:
+        hdrs["Retry-After"] = str(retry_after)
+    try:
+        try:
+            raise urllib.error.HTTPError("http://node/v2/x", code, "err", hdrs, None)
+        except urllib.error.HTTPError:
+            raise RuntimeError("indexer said no")
+    except RuntimeError as e:
+        return e
+
+def test_http_status_reads_code_and_retry_after_through_sdk_errors():
+    assert http_status(sdk_error(429, 7)) == (429, 7.0)
+    assert http_status(sdk_error(404)) == (404, None)
+    assert http_status(ValueError("x")) == (None, None)
+
+def test_call_with_retries_backs_off_on_429_and_only_retries_safe_failures(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(ratelimit.time, "sleep", sleeps.append)
+    bucket = TokenBucket(Limits(rate=1000, burst=1000, max_rate=1000))
+    errors = [sdk_error(429, 3), sdk_error(503)]
+    def flaky():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    assert call_with_retries(flaky, bucket, RetryPolicy(max_retries=3)) == "ok"
+    assert sleeps[0] >= 3 and bucket.throttled == 1 and bucket.rate < 1000
+    # a rejected transaction or unknown txid is not retried
+    with pytest.raises(RuntimeError):
+        call_with_retries(lambda: (_ for _ in ()).throw(sdk_error(404)), bucket)
+    # a POST that failed server-side may have been applied, so it is not repeated
+    calls = []
+    def post():
+        calls.append(1)
+        raise sdk_error(500)
+    with pytest.raises(RuntimeError):
+        call_with_retries(post, bucket, idempotent=False)
+    assert len(calls) == 1
+
+def test_limits_per_endpoint_and_rate_recovers(monkeypatch):
+    monkeypatch.setenv("ALGO_RATE_LIMITS", "node.internal=200:50")
+    assert limits_for("https://testnet-algorand.api.purestake.io/ps2") == ratelimit.ENDPOINT_LIMITS["purestake.io"]
+    assert limits_for("http://node.internal:4001") == Limits(200.0, 50, 200.0)
+    assert limits_for("http://127.0.0.1:4001") == ratelimit.DEFAULT_LIMITS
+    with pytest.raises(ValueError):
+        parse_limits("host=fast")
+    bucket = TokenBucket(Limits(rate=4, burst=2, max_rate=5))
+    bucket.on_throttled()
+    assert bucket.rate == 2
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 5
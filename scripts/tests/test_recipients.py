@@ -0,0 +1,65 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from recipients import iter_recipients, batched, summarize
+
+REPO_CSV = os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "data", "recipients.csv")
+
+def test_iter_recipients_reads_utf16_bom_file():
+    rows = list(iter_recipients(REPO_CSV))
+    assert rows == [("RECIPIENT_ADDR_1", 100), ("RECIPIENT_ADDR_2", 200)]
+
+def test_iter_recipients_utf8_bom_and_bad_rows(tmp_path):
+    p = tmp_path / "rec.csv"
+    p.write_bytes(b"\xef\xbb\xbfADDR1,100\r\nADDR2,-5\nADDR3,abc\n\nADDR4,7\n")
+    assert list(iter_recipients(str(p))) == [("ADDR1", 100), ("ADDR4", 7)]
+
+def test_batched_and_summarize_are_lazy():
+    rows = ((f"A{i}", i) for i in range(10))
+    chunks = batched(rows, 4)
+    assert next(chunks) == [("A0", 0), ("A1", 1), ("A2", 2), ("A3", 3)]
+    assert summarize((r for c in chunks for r in c), asset_id=5) == (6, 0, sum(range(4, 10)))
+
+from algosdk import account
+from recipients import RecipientTable, NO_OPTIN, INVALID
+
+def test_recipient_table_flags_totals_and_views():
+    addrs = [account.generate_account()[1] for _ in range(5)]
+    rows = [(i, a, (i + 1) * 10) for i, a in enumerate(addrs)] + [(5, "NOT_AN_ADDRESS", 99)]
+    table = RecipientTable.from_rows(rows)
+    assert len(table) == 6 and len(table.keys) == 6 * 32
+    assert table.count(INVALID) == 1
+    assert table.address(2) == addrs[2]
+
+    table.mark(1, NO_OPTIN)
+    assert table.count() == 4
+    assert list(table.flagged(NO_OPTIN)) == [1]
+    assert table.total() == 10 + 30 + 40 + 50
+
+    sendable = table.compact()
+    batches = list(sendable.batches(3))
+    assert [len(b) for b in batches] == [3, 1]
+    assert isinstance(batches[0].keys, memoryview)
+    assert list(batches[0]) == [(0, addrs[0], 10), (2, addrs[2], 30), (3, addrs[3], 40)]
+    assert list(batches[1]) == [(4, addrs[4], 50)]
+
+from recipients import decode_addresses, ZERO_AMOUNT, DUPLICATE
+from algosdk import encoding
+
+def test_decode_addresses_batch_matches_sdk_and_rejects_bad_rows():
+    addrs = [account.generate_account()[1] for _ in range(3)]
+    flipped = addrs[0][:-2] + ("B" if addrs[0][-2] == "A" else "A") + addrs[0][-1]
+    keys, bad = decode_addresses(addrs + [flipped, "SHORT", addrs[1].lower()])
+    assert bad == [3, 4, 5]
+    assert [keys[i*32:(i+1)*32] for i in range(3)] == [encoding.decode_address(a) for a in addrs]
+    assert keys[3*32:] == bytes(3 * 32)
+
+def test_merge_duplicates_and_zero_amounts():
+    a, b = account.generate_account()[1], account.generate_account()[1]
+    table = RecipientTable.from_rows([(0, a, 10), (1, b, 0), (2, a, 5), (3, b, 7), (4, a, 2 ** 64)])
+    assert table.count(ZERO_AMOUNT) == 1 and table.count(INVALID) == 1
+    dups = table.find_duplicates()
+    assert sorted(dups.values()) == [[0, 2, 4], [1, 3]]
+    assert table.merge_duplicates(dups) == 2
+    assert list(table.compact().batches(16))[0].pairs() == [(a, 15), (b, 7)]
+    assert table.count(DUPLICATE) == 2
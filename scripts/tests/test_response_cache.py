@@ -0,0 +1,67 @@
+import os
+import sys
+import asyncio
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from response_cache import RoundCache
+
+def test_concurrent_identical_requests_share_one_computation():
+    calls = []
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+    async def run():
+        cache = RoundCache()
+        first = await asyncio.gather(*(cache.get(("latest", 10), 5, compute) for _ in range(50)))
+        again = await cache.get(("latest", 10), 5, compute)
+        newer = await cache.get(("latest", 10), 6, compute)
+        return cache, first, again, newer
+    cache, first, again, newer = asyncio.run(run())
+    assert first == [1] * 50 and again == 1 and newer == 2
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2, "coalesced": 49, "evictions": 0}
+
+def test_lru_eviction_ttl_and_failures_not_cached(monkeypatch):
+    import response_cache
+    clock = [0.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: clock[0])
+    async def value(v):
+        return v
+    async def boom():
+        raise RuntimeError("store busy")
+    async def run():
+        cache = RoundCache(maxsize=2, ttl=10)
+        await cache.get("a", 1, lambda: value("a"))
+        await cache.get("b", 1, lambda: value("b"))
+        await cache.get("a", 1, lambda: value("x"))        # hit, refreshes a
+        await cache.get("c", 1, lambda: value("c"))        # evicts b
+        assert await cache.get("b", 1, lambda: value("b2")) == "b2"
+        clock[0] = 11
+        assert await cache.get("b", 1, lambda: value("b3")) == "b3"   # expired
+        with pytest.raises(RuntimeError):
+            await cache.get("d", 1, boom)
+        assert await cache.get("d", 1, lambda: value("d")) == "d"
+        return cache
+    cache = asyncio.run(run())
+    assert cache.evictions >= 1 and cache.hits == 1
+
+def test_cancelled_leader_does_not_fail_its_waiters():
+    calls = []
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "body"
+    async def run():
+        cache = RoundCache()
+        leader = asyncio.ensure_future(cache.get("latest", 5, compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get("latest", 5, compute))
+        await asyncio.sleep(0)
+        leader.cancel()   # its client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await waiter == "body"
+        assert await cache.get("latest", 5, compute) == "body"
+        return cache
+    cache = asyncio.run(run())
+    assert calls == [1] and cache.stats()["coalesced"] == 1 and cache.hits == 1
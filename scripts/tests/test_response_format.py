@@ -0,0 +1,23 @@
+import os
+import sys
+import json
+import msgpack
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from response_format import JSON, MSGPACK, negotiate, render
+
+def test_negotiate_prefers_msgpack_only_when_asked():
+    assert negotiate(None) == JSON
+    assert negotiate("*/*") == JSON
+    assert negotiate("application/json") == JSON
+    assert negotiate("application/msgpack") == MSGPACK
+    assert negotiate("application/x-msgpack, application/json;q=0.5") == MSGPACK
+    assert negotiate("application/msgpack;q=0.2, application/json") == JSON
+    assert negotiate("text/html") == JSON
+
+def test_render_round_trips_both_formats():
+    payload = {"deposits": [{"txid": "T", "sender": "S", "amount": 2**40, "round": 7}], "count": 1, "next_cursor": None}
+    body, media_type = render(payload, None)
+    assert media_type == JSON and json.loads(body) == payload
+    assert b" " not in body  # compact separators
+    body, media_type = render(payload, "application/msgpack")
+    assert media_type == MSGPACK and msgpack.unpackb(body, raw=False) == payload
@@ -0,0 +1,45 @@
+import os
+import sys
+import base64
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from algosdk import logic
+from teal_cache import TealCache, cache_key, pragma_version
+
+PROGRAM = b"\x05\x81\x01"  # "#pragma version 5; int 1"
+
+class FakeAlgod:
+    algod_address = "http://node:4001"
+    def __init__(self, build=(3, 20, 1)):
+        self.build = build
+        self.compiles = 0
+        self.version_calls = 0
+    def versions(self):
+        self.version_calls += 1
+        return {"build": dict(zip(("major", "minor", "build_number"), self.build))}
+    def compile(self, source):
+        self.compiles += 1
+        return {"result": base64.b64encode(PROGRAM).decode(), "hash": logic.address(PROGRAM)}
+
+def test_second_compile_is_served_from_disk(tmp_path):
+    src = "#pragma version 5\nint 1\n"
+    algod = FakeAlgod()
+    first = TealCache(str(tmp_path)).compile(algod, src)
+    again = TealCache(str(tmp_path)).compile(algod, src)   # a fresh process
+    assert not first.cached and again.cached
+    assert again.program == PROGRAM and again.address == logic.address(PROGRAM) and again.pragma == 5
+    assert (algod.compiles, algod.version_calls) == (1, 1)
+    # changed source or a different node build compile again
+    TealCache(str(tmp_path)).compile(algod, src + "// edit\n")
+    assert algod.compiles == 2
+    assert cache_key(src, "3.20.1") != cache_key(src, "3.21.0")
+
+def test_corrupt_entry_is_recompiled(tmp_path):
+    src = "#pragma version 5\nint 1\n"
+    algod = FakeAlgod()
+    cache = TealCache(str(tmp_path))
+    cache.compile(algod, src)
+    entry = tmp_path / (cache_key(src, "3.20.1") + ".json")
+    entry.write_text(entry.read_text().replace(logic.address(PROGRAM), "X" * 58))
+    assert not cache.compile(algod, src).cached
+    assert algod.compiles == 2
+    assert pragma_version("// no pragma\nint 1") is None
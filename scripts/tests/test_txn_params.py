@@ -0,0 +1,41 @@
+import os
+import sys
+from types import SimpleNamespace
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import txn_params
+from txn_params import ParamsCache
+
+class ParamsACL:
+    def __init__(self, last_round=100, validity=1000):
+        self.calls = 0
+        self.last_round = last_round
+        self.validity = validity
+    def suggested_params(self):
+        self.calls += 1
+        return SimpleNamespace(fee=0, min_fee=1000, first=self.last_round, last=self.last_round + self.validity)
+
+def test_params_cache_reuses_until_validity_runs_low(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(txn_params.time, "monotonic", lambda: now[0])
+    acl = ParamsACL()
+    cache = ParamsCache(acl, min_validity=300, refresh_interval=1e9)
+    first = cache.get()
+    for _ in range(100):
+        assert cache.get() is first
+    assert acl.calls == 1
+
+    # ~700 rounds later only ~300 rounds of validity remain: refetch
+    now[0] += 701 * txn_params.ROUND_SECONDS
+    acl.last_round = 801
+    assert cache.get() is not first
+    assert acl.calls == 2
+
+def test_params_cache_refreshes_on_interval_without_background(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(txn_params.time, "monotonic", lambda: now[0])
+    acl = ParamsACL()
+    cache = ParamsCache(acl, refresh_interval=30)
+    cache.get()
+    now[0] += 31
+    cache.get()
+    assert acl.calls == 2
@@ -0,0 +1,82 @@
+"""
+Suggested-params cache shared by the scripts that build transactions.
+
+One `suggested_params()` result stays usable for many groups: it is only
+replaced when the estimated current round gets within `min_validity` rounds
+of its last valid round, or by a periodic refresh that also picks up fee
+changes. After `start()` that refresh runs on a daemon thread, so `get()`
+never waits on the network once the first params are in.
+"""
+from __future__ import annotations
+import logging, threading, time
+from typing import Optional
+
+ROUND_SECONDS = 3.3            # approximate block time, only used to estimate rounds elapsed
+DEFAULT_MIN_VALIDITY = 300     # rounds a txn built from cached params must still be valid for
+DEFAULT_REFRESH_SECONDS = 30.0
+
+class ParamsCache:
+    def __init__(self, acl, min_validity: int = DEFAULT_MIN_VALIDITY, refresh_interval: float = DEFAULT_REFRESH_SECONDS):
+        self.acl = acl
+        self.min_validity = min_validity
+        self.refresh_interval = refresh_interval
+        self.fetches = 0
+        self._params = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ParamsCache":
+        """Refresh on a background thread from now on instead of inside get()."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name="params-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def rounds_left(self) -> int:
+        """Estimated rounds until the cached params reach their last valid round."""
+        p = self._params
+        if p is None:
+            return 0
+        first, last = getattr(p, "first", None), getattr(p, "last", None)
+        if first is None or last is None:
+            return self.min_validity  # no validity window to track; rely on the refresh interval
+        elapsed = int((time.monotonic() - self._fetched_at) / ROUND_SECONDS)
+        return int(last) - (int(first) + elapsed)
+
+    def get(self):
+        with self._lock:
+            if self._params is None or self.rounds_left() < self.min_validity:
+                self._fetch()
+            elif self._thread is None and time.monotonic() - self._fetched_at > self.refresh_interval:
+                self._fetch()
+            return self._params
+
+    def refresh(self):
+        with self._lock:
+            self._fetch()
+            return self._params
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _fetch(self) -> None:
+        params = self.acl.suggested_params()
+        old = self._params
+        if old is not None and (getattr(old, "fee", None), getattr(old, "min_fee", None)) != (getattr(params, "fee", None), getattr(params, "min_fee", None)):
+            logging.info("Suggested fee changed: fee=%s min_fee=%s", getattr(params, "fee", None), getattr(params, "min_fee", None))
+        self._params = params
+        self._fetched_at = time.monotonic()
+        self.fetches += 1
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning("Suggested params refresh failed, keeping cached params: %s", e)